@@ -0,0 +1,3 @@
+"""
+Benchmarks for RetroChat, run against an in-process OpenAI-compatible stand-in server.
+"""
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Load test of the `rchat serve` gateway.
+
+Starts the stand-in server from `mock_server.py`, runs the gateway (as an
+`rchat serve` subprocess, or in-process with `--in-process`) with the LM
+Studio provider pointed at it, and sends the same streaming completions
+with a pool of keep-alive clients first straight to the stand-in server and
+then through the gateway. Reports requests/sec, time to first token and
+request latency for both, and the latency the gateway adds.
+
+    python benchmarks/load_gateway.py --requests 500 --concurrency 16
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any
+from urllib.parse import urlparse
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from benchmarks.mock_server import MockOpenAIServer
+from benchmarks.run_benchmarks import MODEL, summarize, git_revision, write_config
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"Gateway did not start listening on port {port}")
+
+
+def load(base_url: str, model: str, requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    Send `requests` streaming completions from `concurrency` keep-alive clients.
+
+    Returns:
+        requests_per_sec, ttft_ms and latency_ms summaries, and the error count
+    """
+    url = urlparse(base_url)
+    body = json.dumps({'model': model, 'stream': True,
+                       'messages': [{'role': 'user', 'content': 'Load test prompt'}]})
+    local = threading.local()
+    ttfts, latencies, errors = [], [], []
+
+    def one(_):
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        started = time.perf_counter()
+        try:
+            connection.request('POST', f"{url.path}/chat/completions", body, {'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            if response.status != 200:
+                response.read()
+                errors.append(response.status)
+                return
+            first = None
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                if first is None and line.startswith(b'data:'):
+                    first = time.perf_counter()
+            ttfts.append(first - started)
+            latencies.append(time.perf_counter() - started)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            local.connection = None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        'requests_per_sec': round(len(latencies) / wall, 2),
+        'ttft_ms': summarize(ttfts) if ttfts else None,
+        'latency_ms': summarize(latencies) if latencies else None,
+        'errors': len(errors),
+    }
+
+
+def run_load_test(requests: int, concurrency: int, tokens: int, token_rate: float, latency: float,
+                  in_process: bool = False) -> Dict[str, Any]:
+    """Measure the stand-in server directly and through the gateway."""
+    workdir = tempfile.mkdtemp(prefix='rchat-load-')
+    cwd = os.getcwd()
+    server = MockOpenAIServer(tokens=tokens, token_rate=token_rate, latency=latency, models=[MODEL]).start()
+    gateway = process = None
+    try:
+        os.chdir(workdir)
+        config_path = os.path.join(workdir, 'config.json')
+        write_config(config_path, 'lmstudio', server.base_url, True, tokens, token_rate, latency)
+        if in_process:
+            from src.core.config_manager import ConfigManager
+            from src.core.gateway import Gateway
+            gateway = Gateway(ConfigManager(config_path), port=0).start()
+            gateway_url = gateway.base_url
+        else:
+            port = free_port()
+            process = subprocess.Popen([sys.executable, os.path.join(project_root, 'main.py'), 'serve',
+                                        '--port', str(port)], cwd=workdir, stdout=subprocess.DEVNULL)
+            wait_for_port(port)
+            gateway_url = f"http://127.0.0.1:{port}/v1"
+
+        # Warm up connections and the gateway's provider
+        load(server.base_url, MODEL, concurrency, concurrency)
+        load(gateway_url, f"lmstudio:{MODEL}", concurrency, concurrency)
+
+        direct = load(server.base_url, MODEL, requests, concurrency)
+        print(format_result('direct', direct))
+        through_gateway = load(gateway_url, f"lmstudio:{MODEL}", requests, concurrency)
+        print(format_result('gateway', through_gateway))
+    finally:
+        if gateway is not None:
+            gateway.stop()
+        if process is not None:
+            process.terminate()
+            process.wait()
+        server.stop()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    added = {}
+    if direct['latency_ms'] and through_gateway['latency_ms']:
+        for metric in ('ttft_ms', 'latency_ms'):
+            added[metric] = {key: round(through_gateway[metric][key] - direct[metric][key], 4)
+                             for key in ('mean', 'p50', 'p95')}
+        print(f"gateway adds: ttft p50 {added['ttft_ms']['p50']:.2f}ms, "
+              f"latency p50 {added['latency_ms']['p50']:.2f}ms, p95 {added['latency_ms']['p95']:.2f}ms")
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'requests': requests, 'concurrency': concurrency, 'tokens': tokens,
+                     'token_rate': token_rate, 'latency': latency, 'in_process': in_process},
+        'direct': direct,
+        'gateway': through_gateway,
+        'added_ms': added,
+    }
+
+
+def format_result(label: str, result: Dict[str, Any]) -> str:
+    if not result['latency_ms']:
+        return f"{label:>8}: no successful requests, {result['errors']} errors"
+    return (f"{label:>8}: {result['requests_per_sec']:.1f} req/s, ttft p50 {result['ttft_ms']['p50']:.2f}ms, "
+            f"latency p50 {result['latency_ms']['p50']:.2f}ms, p95 {result['latency_ms']['p95']:.2f}ms, "
+            f"{result['errors']} errors")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the rchat serve gateway against a stand-in server")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per run (default: 500)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Concurrent clients (default: 16)")
+    parser.add_argument('--tokens', type=int, default=32, help="Tokens per reply (default: 32)")
+    parser.add_argument('--token-rate', type=float, default=0.0,
+                        help="Server token rate per second, 0 for unthrottled (default: 0)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Server delay before the first token in seconds (default: 0)")
+    parser.add_argument('--in-process', action='store_true',
+                        help="Run the gateway on a thread of this process instead of as `rchat serve`")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.requests, args.concurrency, args.tokens, args.token_rate, args.latency,
+                           args.in_process)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
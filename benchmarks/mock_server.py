@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+In-process OpenAI-compatible stand-in server.
+
+Serves `/v1/models` and `/v1/chat/completions` (plain JSON or SSE streaming
+over chunked transfer encoding) with a configurable first-token latency and
+token rate, so providers can be exercised end to end without LM Studio or
+OpenRouter. Replies are made of numbered tokens; the final stream chunk
+carries token usage when the request asks for it. With a concurrency limit,
+completions beyond it are refused with a 429 and a Retry-After header, like
+a rate-limited API.
+
+Run it on its own with:
+
+    python benchmarks/mock_server.py --port 1234 --token-rate 50
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Request handler; settings are read from the owning MockOpenAIServer."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+        self.wfile.flush()
+
+    def _send_event(self, payload: Any):
+        data = payload if isinstance(payload, str) else json.dumps(payload)
+        self._write_chunk(f"data: {data}\n\n".encode('utf-8'))
+
+    def do_GET(self):
+        mock = self.server.mock
+        if self.path.rstrip('/') != '/v1/models':
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+        mock.count_request()
+        self._send_json(200, {'object': 'list', 'data': [
+            {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'mock'} for model in mock.models
+        ]})
+
+    def do_POST(self):
+        mock = self.server.mock
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+        try:
+            request = json.loads(body)
+        except json.JSONDecodeError:
+            self._send_json(400, {'error': {'message': "Request body is not JSON"}})
+            return
+        mock.count_request()
+        if not mock.begin_completion():
+            self._send_json(429, {'error': {'message': "Too many concurrent requests", 'type': 'rate_limit'}},
+                            {'Retry-After': f"{mock.retry_after:g}"})
+            return
+        try:
+            self._complete(mock, request)
+        finally:
+            mock.end_completion()
+
+    def _complete(self, mock: 'MockOpenAIServer', request: Dict[str, Any]):
+        model = request.get('model') or mock.models[0]
+        tokens = mock.reply_tokens(request)
+        usage = {'prompt_tokens': mock.prompt_tokens(request), 'completion_tokens': len(tokens)}
+        usage['total_tokens'] = usage['prompt_tokens'] + usage['completion_tokens']
+        if mock.latency:
+            time.sleep(mock.latency)
+
+        if not request.get('stream'):
+            time.sleep(mock.token_delay * len(tokens))
+            self._send_json(200, {
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': ''.join(tokens)},
+                             'finish_reason': 'stop'}],
+                'usage': usage,
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        chunk = {'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                 'model': model}
+        for token in tokens:
+            if mock.token_delay:
+                time.sleep(mock.token_delay)
+            self._send_event(dict(chunk, choices=[{'index': 0, 'delta': {'content': token},
+                                                   'finish_reason': None}]))
+        self._send_event(dict(chunk, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))
+        if (request.get('stream_options') or {}).get('include_usage'):
+            self._send_event(dict(chunk, choices=[], usage=usage))
+        self._send_event('[DONE]')
+        self._write_chunk(b'')
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing pooled keep-alive connections is expected
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+class MockOpenAIServer:
+    """OpenAI-compatible server running on a background thread."""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, models: Optional[List[str]] = None,
+                 tokens: int = 64, token_rate: float = 0.0, latency: float = 0.0,
+                 max_concurrent: int = 0, retry_after: float = 0.1):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            models: Model ids listed by /v1/models
+            tokens: Tokens per reply, unless the request sets max_tokens lower
+            token_rate: Streamed tokens per second (0 sends them as fast as possible)
+            latency: Seconds before the first token
+            max_concurrent: Completions served at once; more get a 429 (0 for no limit)
+            retry_after: Retry-After seconds sent with a 429
+        """
+        self.models = models or ['mock-model']
+        self.tokens = tokens
+        self.token_rate = token_rate
+        self.latency = latency
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.requests = 0
+        self.active = 0
+        self.peak_active = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._httpd = _HTTPServer((host, port), MockOpenAIHandler)
+        self._httpd.mock = self
+        self._thread = None
+
+    @property
+    def token_delay(self) -> float:
+        return 1.0 / self.token_rate if self.token_rate else 0.0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def begin_completion(self) -> bool:
+        """Count a completion as running; False if the concurrency limit refuses it."""
+        with self._lock:
+            if self.max_concurrent and self.active >= self.max_concurrent:
+                self.rejected += 1
+                return False
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+            return True
+
+    def end_completion(self):
+        with self._lock:
+            self.active -= 1
+
+    def reply_tokens(self, request: Dict[str, Any]) -> List[str]:
+        """The tokens of the reply to a request."""
+        count = self.tokens
+        if request.get('max_tokens'):
+            count = min(count, int(request['max_tokens']))
+        return [f"tok{i} " for i in range(count)]
+
+    def prompt_tokens(self, request: Dict[str, Any]) -> int:
+        """Rough prompt size: one token per word of every message."""
+        return sum(len(str(msg.get('content', '')).split()) for msg in request.get('messages', []))
+
+    def start(self) -> 'MockOpenAIServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='mock-openai', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def serve_forever(self):
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an OpenAI-compatible stand-in server")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (default: 127.0.0.1)")
+    parser.add_argument('--port', type=int, default=1234, help="Port to listen on (default: 1234)")
+    parser.add_argument('--model', action='append', dest='models', help="Model id to serve (repeatable)")
+    parser.add_argument('--tokens', type=int, default=64, help="Tokens per reply (default: 64)")
+    parser.add_argument('--token-rate', type=float, default=0.0,
+                        help="Streamed tokens per second, 0 for unthrottled (default: 0)")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before the first token (default: 0)")
+    parser.add_argument('--max-concurrent', type=int, default=0,
+                        help="Completions served at once; more get a 429 (default: 0, no limit)")
+    parser.add_argument('--retry-after', type=float, default=0.1,
+                        help="Retry-After seconds sent with a 429 (default: 0.1)")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.models, args.tokens, args.token_rate, args.latency,
+                              args.max_concurrent, args.retry_after)
+    print(f"Serving {', '.join(server.models)} at {server.base_url} (Ctrl-C to stop)")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+End-to-end streaming benchmarks.
+
+Starts the stand-in server from `mock_server.py`, points the LM Studio
+provider at it (or uses the in-process replay provider) and sends chat turns
+through `Chat.send_message` (context fitting, provider, response pipeline and
+reply checkpointing, as in the app) with histories of increasing size. Each
+turn is followed by a save through ChatManager for every storage format.
+Results are written as JSON so runs of different versions can be compared
+with `--baseline`.
+
+    python benchmarks/run_benchmarks.py --output bench_results.json
+    python benchmarks/run_benchmarks.py --baseline bench_results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.join(project_root, 'src'))
+
+from benchmarks.mock_server import MockOpenAIServer
+from src.core.config_manager import ConfigManager
+from src.core.chat import Chat
+from src.core.chat_manager import ChatManager
+from src.core.storage import STORAGE_ENGINES
+from src.core.stream_pipeline import MetricsStage, PersistStage
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+MODEL = 'mock-model'
+# Roughly the length of a chat message (about 60 tokens)
+MESSAGE_TEXT = ("This is a benchmark message with enough words to look like a normal chat turn, "
+                "asking about something and getting a reasonably detailed answer back. ") * 2
+
+
+def make_history(size: int) -> List[Dict[str, Any]]:
+    """A conversation of `size` messages: a system prompt and alternating turns."""
+    history = [{"role": "system", "content": "You are a benchmark."}]
+    for i in range(size - 1):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({"role": role, "content": f"{i}: {MESSAGE_TEXT}"})
+    return history
+
+
+def summarize(values: List[float], scale: float = 1000.0) -> Dict[str, float]:
+    """Mean, median, p95, min and max of timings in seconds, scaled (default: to ms)."""
+    ordered = sorted(value * scale for value in values)
+    p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+    return {
+        'mean': round(statistics.mean(ordered), 4),
+        'p50': round(statistics.median(ordered), 4),
+        'p95': round(p95, 4),
+        'min': round(ordered[0], 4),
+        'max': round(ordered[-1], 4),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=project_root,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def write_config(path: str, provider: str, base_url: Optional[str], stream: bool, tokens: int,
+                 token_rate: float, latency: float):
+    provider_config = {
+        "default_model": MODEL,
+        "stream": stream,
+        "system_prompt": "You are a benchmark.",
+        # Send the whole history so its size is what is being measured
+        "context_budget": 10 ** 9,
+    }
+    if provider == 'replay':
+        # Replies are generated in-process, without HTTP
+        provider_config.update({"models": [MODEL], "reply_tokens": tokens, "token_rate": token_rate,
+                                "latency": latency})
+    else:
+        provider_config.update({"api_base": base_url, "api_key": "lm-studio"})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"current_provider": provider, "providers": {provider: provider_config}}, f)
+
+
+def benchmark_size(chat: Chat, metrics: MetricsStage, managers: Dict[str, ChatManager],
+                   size: int, turns: int) -> Dict[str, Any]:
+    """Run `turns` turns on a history of `size` messages, saving after each one."""
+    history = make_history(size)
+    chat_name = f"bench_{size}"
+    result = {'history_size': size, 'turns': turns, 'first_save_ms': {}, 'save_ms': {}}
+
+    for storage_format, manager in managers.items():
+        start = time.perf_counter()
+        manager.save_chat(chat_name, history)
+        result['first_save_ms'][storage_format] = round((time.perf_counter() - start) * 1000, 4)
+
+    turn_times, chunk_times, ttfts = [], [], []
+    save_times = {storage_format: [] for storage_format in managers}
+    for turn in range(turns):
+        start = time.perf_counter()
+        response = chat.send_message(f"Turn {turn}: {MESSAGE_TEXT}", history, echo=False)
+        elapsed = time.perf_counter() - start
+        if response.startswith("Error:"):
+            raise RuntimeError(response)
+        turn_times.append(elapsed)
+        m = metrics.metrics
+        ttfts.append(m['ttft'] or 0.0)
+        if m['chunks'] > 1:
+            chunk_times.append((m['duration'] - m['ttft']) / (m['chunks'] - 1))
+
+        for storage_format, manager in managers.items():
+            start = time.perf_counter()
+            manager.save_chat(chat_name, history)
+            save_times[storage_format].append(time.perf_counter() - start)
+
+    result['turn_ms'] = summarize(turn_times)
+    result['ttft_ms'] = summarize(ttfts)
+    result['chunk_us'] = summarize(chunk_times, scale=1e6) if chunk_times else None
+    result['chunks_per_turn'] = metrics.metrics['chunks']
+    for storage_format, times in save_times.items():
+        result['save_ms'][storage_format] = summarize(times)
+    return result
+
+
+def run_benchmarks(sizes: List[int], turns: int, tokens: int, token_rate: float, latency: float,
+                   formats: List[str], stream: bool = True, provider: str = 'lmstudio') -> Dict[str, Any]:
+    """
+    Run the suite in a scratch directory.
+
+    With the lmstudio provider replies come from a fresh stand-in server; with
+    the replay provider they are generated in-process, leaving only the cost
+    of Chat, the pipeline and ChatManager.
+    """
+    workdir = tempfile.mkdtemp(prefix='rchat-bench-')
+    cwd = os.getcwd()
+    server = None
+    if provider != 'replay':
+        server = MockOpenAIServer(tokens=tokens, token_rate=token_rate, latency=latency, models=[MODEL]).start()
+    managers = {}
+    try:
+        # Model catalogs and other relative paths land in the scratch directory
+        os.chdir(workdir)
+        config_path = os.path.join(workdir, 'config.json')
+        write_config(config_path, provider, server.base_url if server else None, stream,
+                     tokens, token_rate, latency)
+        chat = Chat(ConfigManager(config_path))
+        metrics = MetricsStage()
+
+        for storage_format in formats:
+            chats_dir = os.path.join(workdir, f"chats_{storage_format}")
+            managers[storage_format] = ChatManager(chats_dir, storage_format=storage_format)
+        first_manager = next(iter(managers.values()))
+        chat.add_stream_stage(PersistStage(first_manager, 'bench_checkpoint'))
+        chat.add_stream_stage(metrics)
+
+        # Warm up: provider creation, client connection and imports
+        chat.send_message("warm up", [], echo=False)
+
+        results = []
+        for size in sizes:
+            result = benchmark_size(chat, metrics, managers, size, turns)
+            results.append(result)
+            print(format_result(result, formats))
+    finally:
+        for manager in managers.values():
+            manager.close()
+        if server is not None:
+            server.stop()
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {'provider': provider, 'sizes': sizes, 'turns': turns, 'tokens': tokens, 'token_rate': token_rate,
+                     'latency': latency, 'formats': formats, 'stream': stream},
+        'results': results,
+    }
+
+
+def format_result(result: Dict[str, Any], formats: List[str]) -> str:
+    chunk = f"{result['chunk_us']['p50']:.1f}us" if result['chunk_us'] else '-'
+    saves = ', '.join(f"{fmt} {result['save_ms'][fmt]['p50']:.2f}ms" for fmt in formats)
+    return (f"{result['history_size']:>6} messages: turn {result['turn_ms']['p50']:.2f}ms, "
+            f"ttft {result['ttft_ms']['p50']:.2f}ms, chunk {chunk}, save {saves}")
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Median changes from a baseline run, one line per history size and metric."""
+    lines = []
+    previous = {r['history_size']: r for r in baseline.get('results', [])}
+    for result in current['results']:
+        old = previous.get(result['history_size'])
+        if old is None:
+            continue
+        metrics = [('turn_ms', result['turn_ms'], old.get('turn_ms')),
+                   ('chunk_us', result['chunk_us'], old.get('chunk_us'))]
+        metrics += [(f"save_ms[{fmt}]", stats, old.get('save_ms', {}).get(fmt))
+                    for fmt, stats in result['save_ms'].items()]
+        for name, new_stats, old_stats in metrics:
+            if not new_stats or not old_stats or not old_stats['p50']:
+                continue
+            change = (new_stats['p50'] - old_stats['p50']) / old_stats['p50'] * 100
+            lines.append(f"{result['history_size']:>6} {name:<16} {old_stats['p50']:>10.3f} -> "
+                         f"{new_stats['p50']:>10.3f} ({change:+.1f}%)")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark RetroChat end to end against a stand-in server")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated history sizes in messages (default: 10,100,1000,10000)")
+    parser.add_argument('--turns', type=int, default=5, help="Measured turns per history size (default: 5)")
+    parser.add_argument('--tokens', type=int, default=128, help="Tokens per reply (default: 128)")
+    parser.add_argument('--token-rate', type=float, default=0.0,
+                        help="Server token rate per second, 0 for unthrottled (default: 0)")
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="Server delay before the first token in seconds (default: 0)")
+    parser.add_argument('--formats', default=','.join(STORAGE_ENGINES),
+                        help="Comma-separated chat storage formats to save with (default: all)")
+    parser.add_argument('--provider', choices=['lmstudio', 'replay'], default='lmstudio',
+                        help="lmstudio against the stand-in server, or the in-process replay provider "
+                             "(default: lmstudio)")
+    parser.add_argument('--no-stream', action='store_true', help="Request whole replies instead of streams")
+    parser.add_argument('--output', help="Write the results as JSON to this file")
+    parser.add_argument('--baseline', help="Results JSON of an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    formats = [fmt for fmt in args.formats.split(',') if fmt]
+    report = run_benchmarks(sizes, args.turns, args.tokens, args.token_rate, args.latency,
+                            formats, stream=not args.no_stream, provider=args.provider)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"Median change from {args.baseline} ({baseline.get('revision')}):")
+        for line in compare(report, baseline):
+            print(line)
+    return report
+
+
+if __name__ == '__main__':
+    main()
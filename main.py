@@ -4,41 +4,100 @@ RetroChat v3 - Multi-Provider AI Chat Application
 Main entry point for the application.
 """
 
+import argparse
+import logging
 import sys
 import os
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.core.config_manager import ConfigManager
-from src.core.model_manager import ModelManager
-from src.core.chat import Chat
-from src.core.chat_manager import ChatManager
-from src.ui.command_registry import CommandRegistry
-from src.ui.commands import CommandHandlers, generate_chat_id
-from src.utils.terminal_colors import yellow_text
+from src.utils.startup_profile import StartupProfiler
 
+# Imports are timed so `--startup-profile` can report them
+startup_profiler = StartupProfiler()
+with startup_profiler.phase("Import core"):
+    from src.core.config_manager import ConfigManager
+    from src.core.model_manager import ModelManager
+    from src.core.chat import Chat
+    from src.core.chat_manager import ChatManager
+    from src.core.storage import DEFAULT_CHAT_FORMAT
+    from src.core.stream_pipeline import PersistStage, CHECKPOINT_INTERVAL
+    from src.core.telemetry import TelemetryStore
+with startup_profiler.phase("Import UI"):
+    from src.ui.command_registry import CommandRegistry
+    from src.ui.commands import CommandHandlers
+    from src.utils.terminal_colors import yellow_text
 
-def main():
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(prog="rchat", description="RetroChat - Multi-Provider AI Chat Application")
+    parser.add_argument("command", nargs="?", choices=["serve"],
+                        help="serve: run an OpenAI-compatible HTTP gateway instead of the interactive prompt")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Print an import/initialization time breakdown before the prompt")
+    parser.add_argument("--batch", metavar="PROMPTS_JSONL",
+                        help="Run the prompts in a JSONL file without the interactive prompt")
+    parser.add_argument("--output", metavar="RESULTS_JSONL",
+                        help="Batch results file (default: <prompts>.results.jsonl); rerun to resume")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Batch prompts sent at the same time (default: 4)")
+    parser.add_argument("--provider", help="Batch provider for prompts that name none (default: current)")
+    parser.add_argument("--model", help="Batch model for prompts that name none (default: provider default)")
+    parser.add_argument("--host", default="127.0.0.1", help="Gateway interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="Gateway port (default: 8080)")
+    parser.add_argument("--sessions", action="store_true",
+                        help="Gateway: keep per-session history (X-Session-Id header) in saved chats")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Log internal decisions (e.g. context window trimming) to stderr")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main application entry point."""
+    args = parse_args(argv)
+    if args.log_level:
+        logging.basicConfig(level=args.log_level, format="%(levelname)s %(name)s: %(message)s")
+    profiler = startup_profiler
+    if args.command == "serve":
+        from src.core.gateway import run_gateway
+        try:
+            run_gateway(ConfigManager(), args.host, args.port, args.sessions)
+        except OSError as e:
+            print(f"Could not start the gateway: {e}")
+        return
+    if args.batch:
+        from src.core.batch import run_batch
+        try:
+            run_batch(ConfigManager(), args.batch, args.output, args.concurrency, args.provider, args.model)
+        except (OSError, KeyboardInterrupt) as e:
+            print(f"Batch stopped: {e or 'interrupted'}. Rerun the same command to resume.")
+        return
     try:
-        # Initialize core components
-        print("Initializing configuration manager...")
-        config_manager = ConfigManager()
-        
-        print("Initializing model manager...")
-        model_manager = ModelManager(config_manager)
+        # Initialize core components. Providers and their clients are created
+        # on first use, so nothing here touches the network.
+        with profiler.phase("Config manager"):
+            config_manager = ConfigManager()
         
-        print("Initializing chat...")
-        chat = Chat(config_manager)
+        with profiler.phase("Model manager and chat"):
+            model_manager = ModelManager(config_manager)
+            chat = Chat(config_manager)
+            if config_manager.get('telemetry', True):
+                chat.telemetry = TelemetryStore()
         
-        print("Initializing chat manager...")
-        chat_manager = ChatManager()
+        with profiler.phase("Chat manager"):
+            chat_manager = ChatManager(storage_format=config_manager.get('chat_format', DEFAULT_CHAT_FORMAT),
+                                       write_behind=config_manager.get('write_behind', False))
         
         # Initialize UI components
         cmd_registry = CommandRegistry()
         cmd_handlers = CommandHandlers(config_manager, model_manager, chat, chat_manager)
         
+        # Checkpoint streaming replies so a crash or Ctrl-C doesn't lose them
+        chat.add_stream_stage(PersistStage(chat_manager, lambda: cmd_handlers.current_chat,
+                                           config_manager.get('checkpoint_interval', CHECKPOINT_INTERVAL)))
+        
         # Display welcome message
         current_provider = model_manager.get_current_provider_name()
         current_model = model_manager.get_default_model() or "No model selected"
@@ -57,25 +116,28 @@ def main():
         return
     
     # Load the last used chat or create a new one
-    existing_chats = chat_manager.list_chats()
-    if existing_chats:
-        # Load the most recent chat (first in the sorted list)
-        current_chat = existing_chats[0]
-        history = chat_manager.load_chat(current_chat) or []
-        print(f"Loaded last used chat: {current_chat}")
-        if history:
-            # Show recent messages for context  
-            from src.ui.commands import display_chat_history
-            display_chat_history(history, show_all=False, max_recent=6)
-    else:
-        # No existing chats, create a new one
-        current_chat = generate_chat_id()
-        history = []
-        print("Starting with a new chat session")
+    with profiler.phase("Load last chat"):
+        current_chat = chat_manager.most_recent_chat()
+        if current_chat:
+            # Load the most recent chat
+            history = cmd_handlers.sessions.get(current_chat) or []
+            print(f"Loaded last used chat: {current_chat}")
+            if history:
+                # Show recent messages for context  
+                from src.ui.commands import display_chat_history
+                display_chat_history(history, show_all=False, max_recent=6)
+        else:
+            # No existing chats, create a new one
+            current_chat = chat_manager.generate_chat_id()
+            history = []
+            print("Starting with a new chat session")
     
     # Set the current chat in command handlers
     cmd_handlers.set_current_chat(current_chat, history)
     
+    # Offer to recover replies that were cut off last time
+    cmd_handlers.recover_interrupted_replies()
+    
     print()
     
     # Register all commands
@@ -92,9 +154,18 @@ def main():
     cmd_registry.register("/chat delete", "Delete a saved chat", cmd_handlers.cmd_chat_delete)
     cmd_registry.register("/chat reset", "Clear the current chat's conversation history", cmd_handlers.cmd_chat_reset)
     cmd_registry.register("/chat list", "List all saved chats", cmd_handlers.cmd_chat_list)
+    cmd_registry.register("/chat cache", "Show the chats held in memory and what they cost", cmd_handlers.cmd_chat_cache)
+    cmd_registry.register("/chat search", "Search the messages of all saved chats", cmd_handlers.cmd_chat_search)
+    cmd_registry.register("/compare", "Send one prompt to several models at once (model1,model2,... prompt)", cmd_handlers.cmd_compare)
+    cmd_registry.register("/stats", "Show latency, throughput and error statistics per model", cmd_handlers.cmd_stats)
     cmd_registry.register("/help", "Show this help message with all available commands", lambda: cmd_handlers.cmd_help(cmd_registry))
     cmd_registry.register("/exit", "Exit the chat application", cmd_handlers.cmd_exit)
 
+    if args.startup_profile:
+        print(profiler.report())
+        print()
+    provider_profiled = False
+
     # Main application loop
     while True:
         user_input = input("> ")
@@ -156,6 +227,28 @@ def main():
             elif user_input.strip() == "/chat list":
                 cmd_registry.execute_command("/chat list")
                 command_handled = True
+            elif user_input.strip() == "/chat cache":
+                cmd_registry.execute_command("/chat cache")
+                command_handled = True
+            elif user_input.startswith("/chat search "):
+                try:
+                    query = user_input.split(" ", 2)[2]
+                    cmd_registry.execute_command("/chat search", query)
+                    command_handled = True
+                except IndexError:
+                    print("Invalid command. Use /chat search <terms>")
+                    command_handled = True
+            elif user_input.startswith("/compare "):
+                try:
+                    compare_args = user_input.split(" ", 1)[1]
+                    cmd_registry.execute_command("/compare", compare_args)
+                    command_handled = True
+                except IndexError:
+                    print("Invalid command. Use /compare <model1,model2,...> <prompt>")
+                    command_handled = True
+            elif user_input.strip() == "/stats":
+                cmd_registry.execute_command("/stats")
+                command_handled = True
             elif user_input.strip() == "/help":
                 cmd_registry.execute_command("/help")
                 command_handled = True
@@ -191,8 +284,22 @@ def main():
                 print(f"Command '{user_input}' does not exist. Type /help to see available commands.")
         else:
             # Regular message, send to AI
-            chat.send_message(user_input, cmd_handlers.history)
-            chat_manager.save_chat(cmd_handlers.current_chat, cmd_handlers.history)
+            if args.startup_profile and not provider_profiled:
+                with profiler.phase("Provider (first message)"):
+                    chat.chat_interface
+                print(profiler.format_phase(*profiler.phases[-1]))
+                provider_profiled = True
+            try:
+                chat.send_message(user_input, cmd_handlers.history)
+            except KeyboardInterrupt:
+                print("\nReply interrupted.")
+                cmd_handlers.recover_interrupted_replies()
+                continue
+            cmd_handlers.sessions.save(cmd_handlers.current_chat)
+
+    # Write out chats with unsaved changes and any saves still queued by the write-behind writer
+    cmd_handlers.sessions.flush()
+    chat_manager.close()
 
 
 if __name__ == "__main__":
@@ -16,14 +16,39 @@ a = Analysis(
         'src.core.config_manager',
         'src.core.model_manager', 
         'src.core.chat',
+        'src.core.history',
+        'src.core.message',
+        'src.core.session_manager',
         'src.core.chat_manager',
+        'src.core.write_behind',
+        'src.core.search_index',
+        'src.core.compare',
+        'src.core.batch',
+        'src.core.gateway',
+        'src.core.context_window',
+        'src.core.stream_pipeline',
+        'src.core.telemetry',
+        'src.core.storage',
+        'src.core.storage.base_storage',
+        'src.core.storage.json_storage',
+        'src.core.storage.jsonl_storage',
+        'src.core.storage.sqlite_storage',
+        'src.core.storage.partial_replies',
         'src.ui.command_registry',
         'src.ui.commands',
         'src.utils.terminal_colors',
+        'src.utils.file_utils',
+        'src.utils.startup_profile',
+        'src.utils.stream_renderer',
         'src.providers.lmstudio_provider',
         'src.providers.openrouter_provider',
+        'src.providers.replay_provider',
+        'src.providers.response_cache',
+        'src.providers.rate_limiter',
         'src.providers.provider_factory',
         'src.providers.base_provider',
+        'src.providers.model_catalog',
+        'src.providers.client_pool',
         'src.providers',
         'src.core',
         'src.ui',
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Chat Storage Migration Tool
+
+Imports existing JSON/JSONL chats from the chats directory into the SQLite
+chat store, keeping each chat's modification time so listing order is
+preserved.
+"""
+
+import argparse
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from src.core.storage import JsonlChatStorage, SqliteChatStorage
+from src.core.storage.json_storage import CHAT_FILE_EXTENSIONS
+
+
+def migrate_chats(chats_dir='chats', db_path=None, remove_files=False):
+    source = JsonlChatStorage(chats_dir)
+    target = SqliteChatStorage(chats_dir, db_path)
+
+    chat_names = source.list_chats()
+    if not chat_names:
+        print(f"No JSON chats found in {chats_dir}")
+        return 0
+
+    migrated = 0
+    for chat_name in chat_names:
+        history = source.load_chat(chat_name)
+        if history is None:
+            print(f"✗ Could not read {chat_name}, skipping")
+            continue
+
+        paths = [os.path.join(chats_dir, chat_name + ext) for ext in CHAT_FILE_EXTENSIONS]
+        updated_at = max(os.path.getmtime(path) for path in paths if os.path.exists(path))
+        target.import_chat(chat_name, history, updated_at)
+        migrated += 1
+        print(f"✓ {chat_name} ({len(history)} messages)")
+
+        if remove_files:
+            source.delete_chat(chat_name)
+
+    target.close()
+    print()
+    print(f"Migrated {migrated} of {len(chat_names)} chats into {target.db_path}")
+    print('Set "chat_format": "sqlite" in config.json to use the SQLite store.')
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import JSON/JSONL chats into the SQLite chat store")
+    parser.add_argument('--chats-dir', default='chats', help="Directory holding the chat files (default: chats)")
+    parser.add_argument('--db', default=None, help="SQLite database path (default: <chats-dir>/chats.db)")
+    parser.add_argument('--remove', action='store_true', help="Delete the JSON files after importing them")
+    args = parser.parse_args()
+    migrate_chats(args.chats_dir, args.db, args.remove)
+
+
+if __name__ == "__main__":
+    main()
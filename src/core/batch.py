@@ -0,0 +1,213 @@
+"""
+Non-interactive batch mode (`rchat --batch prompts.jsonl`).
+
+Each input line is a JSON object with a `prompt` and optionally an `id`,
+`provider`, `model`, `system_prompt`, `history` and sampling parameters
+(`temperature`, `top_p`, `max_tokens`). A pool of async workers sends the
+prompts through the providers' async interfaces and every result is
+appended to the output JSONL as soon as it completes, tagged with the
+prompt's `index` (its line number, from 0). Rerunning with the same output
+file skips the prompts that already succeeded; failed ones are retried and
+the last line written for an index is its result.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from .config_manager import ConfigManager
+from .context_window import ContextWindow
+from .chat import create_async_chat
+
+DEFAULT_CONCURRENCY = 4
+SAMPLING_KEYS = ('temperature', 'top_p', 'max_tokens')
+
+
+def _is_message(msg: Any) -> bool:
+    return isinstance(msg, dict) and isinstance(msg.get('role'), str) and isinstance(msg.get('content'), str)
+
+
+def load_prompts(path: str) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    Read a prompts file.
+
+    Returns:
+        (index, item) pairs; lines that are not a JSON object with a prompt
+        become items with an `error`, as do items whose `history` is not a
+        list of messages with string `role` and `content`
+    """
+    items = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for index, line in enumerate(f):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as e:
+                items.append((index, {'error': f"Invalid JSON: {e}"}))
+                continue
+            if not isinstance(item, dict) or not isinstance(item.get('prompt'), str):
+                items.append((index, {'error': "Each line needs a \"prompt\" string"}))
+                continue
+            history = item.get('history')
+            if history is not None and not (isinstance(history, list) and all(map(_is_message, history))):
+                items.append((index, {'id': item.get('id'),
+                                      'error': "\"history\" must be a list of messages with string "
+                                               "\"role\" and \"content\""}))
+                continue
+            items.append((index, item))
+    return items
+
+
+def completed_indexes(path: str) -> Dict[int, bool]:
+    """
+    Indexes found in an existing output file and whether their last result succeeded.
+
+    A torn last line (from an interrupted run) is cut off so new results
+    start on a fresh line.
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+            data = data[:data.rfind(b'\n') + 1]
+    for line in data.decode('utf-8').splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(record, dict) and isinstance(record.get('index'), int):
+            results[record['index']] = not record.get('error')
+    return results
+
+
+class BatchRunner:
+    """Runs a prompts file through a pool of concurrent workers."""
+
+    def __init__(self, config_manager: ConfigManager, concurrency: int = DEFAULT_CONCURRENCY,
+                 provider_name: Optional[str] = None, model: Optional[str] = None, echo: bool = True):
+        """
+        Args:
+            config_manager: Source of provider settings
+            concurrency: Number of prompts in flight at once
+            provider_name: Provider for items that name none (default: the current provider)
+            model: Model for items that name none (default: the provider's default model)
+            echo: Print a progress line per result
+        """
+        self.config_manager = config_manager
+        self.concurrency = max(1, concurrency)
+        self.provider_name = provider_name or config_manager.get_current_provider()
+        self.model = model
+        self.echo = echo
+        self._chats = {}
+
+    def _async_chat(self, provider_name: str):
+        """The async chat of a provider, shared by all workers."""
+        if provider_name not in self._chats:
+            self._chats[provider_name] = create_async_chat(
+                provider_name, self.config_manager.get_provider_config(provider_name), 'batch')
+        return self._chats[provider_name]
+
+    async def _run_item(self, index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        provider_name = item.get('provider') or self.provider_name
+        result = {'index': index, 'id': item.get('id'), 'provider': provider_name,
+                  'model': item.get('model') or self.model, 'response': None, 'error': item.get('error'),
+                  'ttft': None, 'duration': None, 'usage': None}
+        if result['error']:
+            return result
+
+        usage = {}
+        chunks = []
+        started = time.perf_counter()
+        try:
+            # Anything wrong with one item fails that item, never the whole run
+            provider_config = self.config_manager.get_provider_config(provider_name)
+            model = result['model'] = result['model'] or provider_config.get('default_model')
+            chat = self._async_chat(provider_name)
+            if chat is None:
+                result['error'] = f"Provider '{provider_name}' is not available"
+                return result
+
+            history = list(item.get('history') or [])
+            if item.get('system_prompt'):
+                # An explicit system message replaces the provider's system prompt
+                history = [{"role": "system", "content": item['system_prompt']}] + \
+                          [msg for msg in history if msg.get('role') != 'system']
+            history = ContextWindow.from_config(provider_config).fit(
+                item['prompt'], history, provider_config.get('system_prompt'))
+
+            kwargs = {key: item[key] for key in SAMPLING_KEYS if key in item}
+            started = time.perf_counter()
+            async for chunk in chat.send_message_stream(item['prompt'], history, model=model,
+                                                        usage=usage, **kwargs):
+                if result['ttft'] is None:
+                    result['ttft'] = round(time.perf_counter() - started, 4)
+                chunks.append(chunk)
+        except Exception as e:
+            result['error'] = str(e) or type(e).__name__
+        result['duration'] = round(time.perf_counter() - started, 4)
+        result['response'] = ''.join(chunks)
+        result['usage'] = usage or None
+        if result['error'] is None and result['response'].startswith('Error:'):
+            result['error'] = result['response'][len('Error:'):].strip()
+        return result
+
+    async def run(self, items: List[Tuple[int, Dict[str, Any]]], output_path: str) -> Dict[str, Any]:
+        """
+        Run the items not yet completed in output_path, appending results as they finish.
+
+        Returns:
+            Summary with total, skipped, succeeded, failed and wall_time (seconds)
+        """
+        done = completed_indexes(output_path)
+        pending = [(index, item) for index, item in items if not done.get(index)]
+        summary = {'total': len(items), 'skipped': len(items) - len(pending), 'succeeded': 0, 'failed': 0}
+        started = time.perf_counter()
+
+        queue = asyncio.Queue()
+        for entry in pending:
+            queue.put_nowait(entry)
+
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(output_path, 'a', encoding='utf-8') as output:
+            async def worker():
+                while True:
+                    try:
+                        index, item = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    result = await self._run_item(index, item)
+                    # Written from the event loop thread, so lines never interleave
+                    output.write(json.dumps(result, ensure_ascii=False) + '\n')
+                    output.flush()
+                    summary['failed' if result['error'] else 'succeeded'] += 1
+                    if self.echo:
+                        finished = summary['succeeded'] + summary['failed']
+                        status = f"error: {result['error']}" if result['error'] else f"{result['duration']:.2f}s"
+                        print(f"[{finished}/{len(pending)}] #{index} {result['model']}: {status}")
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)) or 1)))
+
+        summary['wall_time'] = time.perf_counter() - started
+        return summary
+
+
+def run_batch(config_manager: ConfigManager, prompts_path: str, output_path: Optional[str] = None,
+              concurrency: int = DEFAULT_CONCURRENCY, provider_name: Optional[str] = None,
+              model: Optional[str] = None) -> Dict[str, Any]:
+    """Run a prompts file and print a summary. The output defaults to `<prompts>.results.jsonl`."""
+    if output_path is None:
+        output_path = f"{os.path.splitext(prompts_path)[0]}.results.jsonl"
+    items = load_prompts(prompts_path)
+    runner = BatchRunner(config_manager, concurrency, provider_name, model)
+    summary = asyncio.run(runner.run(items, output_path))
+    print(f"{summary['succeeded']} succeeded, {summary['failed']} failed, {summary['skipped']} already done "
+          f"of {summary['total']} prompts in {summary['wall_time']:.2f}s. Results: {output_path}")
+    return summary
@@ -1,7 +1,8 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from .config_manager import ConfigManager
 import sys
 import os
+import time
 
 # Import provider factory with proper path handling
 try:
@@ -14,7 +15,38 @@ except ImportError:
         sys.path.append(os.path.dirname(os.path.dirname(__file__)))
         from providers import provider_factory
 
-from src.utils.terminal_colors import yellow_text
+from src.providers.base_provider import AsyncBaseChat
+from src.providers.response_cache import response_cache, CachingChat, CachingAsyncChat
+from src.utils.stream_renderer import StreamRenderer
+from .context_window import ContextWindow
+from .message import Message
+from .telemetry import TelemetryStage
+from .stream_pipeline import StreamPipeline, StreamStage, RenderStage, single_chunk, single_chunk_async
+
+# Sent after an interrupted reply to have the model pick up where it stopped
+CONTINUE_PROMPT = "Continue your previous reply exactly where it stopped, without repeating anything."
+
+
+def create_async_chat(provider_name: str, provider_config: Dict[str, Any],
+                      caller: str = 'chat') -> Optional[AsyncBaseChat]:
+    """
+    Async chat of a provider, behind its rate limiter and (if enabled) the response cache.
+
+    Args:
+        provider_name: Provider to create the chat for
+        provider_config: That provider's configuration
+        caller: Name the provider's rate limiter queues the requests under
+
+    Returns:
+        The chat, or None if the provider could not be created
+    """
+    provider = provider_factory.create_provider(provider_name, provider_config)
+    if not provider:
+        return None
+    chat = provider.limit_chat(provider.create_async_chat(), caller)
+    if provider_config.get('response_cache'):
+        chat = CachingAsyncChat(chat, response_cache, provider_name, provider_config)
+    return chat
 
 
 class Chat:
@@ -22,7 +54,41 @@ class Chat:
         self.config_manager = config_manager
         self._current_provider = None
         self._chat = None
-        self._initialize_provider()
+        self._async_chat = None
+        self._provider_loaded = False
+        self._loop = None
+        self._context_lengths = {}
+        self.context_window = ContextWindow()
+        self.stream_stages: List[StreamStage] = []
+        # TelemetryStore that records every request, set when telemetry is enabled
+        self.telemetry = None
+        self.config_manager.add_listener(self._on_provider_config_changed)
+
+    @property
+    def provider(self):
+        """The current provider, created on first use."""
+        if not self._provider_loaded:
+            self._initialize_provider()
+        return self._current_provider
+
+    @property
+    def chat_interface(self):
+        """The current provider's chat interface, created on first use."""
+        if not self._provider_loaded:
+            self._initialize_provider()
+        return self._chat
+
+    def _on_provider_config_changed(self, provider_name: str):
+        """Rebind to the pooled provider when the current provider's settings change."""
+        if provider_name == self.config_manager.get_current_provider():
+            self._reset_provider()
+
+    def _reset_provider(self):
+        """Drop the current provider so it is recreated on next use."""
+        self._current_provider = None
+        self._chat = None
+        self._async_chat = None
+        self._provider_loaded = False
 
     def _initialize_provider(self):
         """Initialize the current provider and its chat interface."""
@@ -34,28 +100,147 @@ class Chat:
             current_provider_name, 
             provider_config
         )
+        self._async_chat = None
+        self._provider_loaded = True
         
         if self._current_provider:
-            self._chat = self._current_provider.create_chat()
+            self._chat = self._current_provider.limit_chat(self._current_provider.create_chat(), 'chat')
+            if provider_config.get('response_cache'):
+                self._chat = CachingChat(self._chat, response_cache, current_provider_name, provider_config)
             provider_factory.set_current_provider(self._current_provider)
         else:
+            self._chat = None
             print(f"Failed to initialize provider: {current_provider_name}")
             print("Please check your configuration and ensure the provider is properly configured.")
 
     def refresh_provider(self):
         """Refresh the current provider (useful after config changes)."""
-        self._initialize_provider()
+        self._reset_provider()
+
+    def _record_exchange(self, history: List[Dict[str, Any]], message: str, response: str,
+                         provider_config: Dict[str, Any], usage: Optional[Dict[str, Any]] = None):
+        """Append the user message and response (and the system prompt if missing) to history."""
+        now = round(time.time(), 3)
+        has_system_message = getattr(history, 'has_system_message', None)
+        if not (has_system_message() if has_system_message else
+                any(msg.get('role') == 'system' for msg in history)):
+            system_prompt = provider_config.get('system_prompt')
+            if system_prompt:
+                history.append(Message("system", system_prompt, now))
+        
+        history.append(Message("user", message, now))
+        history.append(Message("assistant", response, now, (usage or {}).get('completion_tokens'),
+                               provider_config.get('default_model')))
+
+    def _get_context_length(self, model: str) -> Optional[int]:
+        """
+        Context length of a model from the provider's cached catalog.
+
+        The catalog is never fetched here, so sending a message doesn't wait on
+        it. Until something (e.g. /models) has loaded it, or for providers that
+        don't report context lengths, None is returned and only `context_budget`
+        and `context_turns` limit the history.
+        """
+        key = (self.config_manager.get_current_provider(), model)
+        context_length = self._context_lengths.get(key)
+        if context_length is None:
+            provider = self.provider
+            if provider:
+                try:
+                    info = provider.create_model_manager().get_cached_model_info(model)
+                    context_length = info.get('context_length') or None
+                except Exception:
+                    pass
+            if context_length:
+                self._context_lengths[key] = context_length
+        return context_length
 
-    def send_message(self, message: str, history: List[Dict[str, Any]]) -> str:
+    def _fit_context(self, message: str, history: List[Dict[str, Any]],
+                     provider_config: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Trim the history sent with a message to the provider's token budget.
+
+        Returns:
+            The history to send and the window's decision for this request
+            (concurrent requests each get their own)
+        """
+        context_length = None
+        if not provider_config.get('context_budget'):
+            context_length = self._get_context_length(provider_config.get('default_model'))
+        window = ContextWindow.from_config(provider_config, context_length)
+        context = window.fit(message, history, provider_config.get('system_prompt'))
+        self.context_window = window
+        return context, window.last_decision
+
+    def add_stream_stage(self, stage: StreamStage):
+        """Register a stage that sees every response chunk (after rendering)."""
+        self.stream_stages.append(stage)
+
+    def create_pipeline(self, echo: bool = True) -> StreamPipeline:
+        """Build the response pipeline; without echo nothing is written to the terminal."""
+        stages = [RenderStage()] if echo else []
+        return StreamPipeline(stages + self.stream_stages)
+
+    def _pipeline_request(self, message: str, provider_config: Dict[str, Any]) -> Dict[str, Any]:
+        """Request details handed to the pipeline stages."""
+        return {
+            'message': message,
+            'provider': self.config_manager.get_current_provider(),
+            'model': provider_config.get('default_model'),
+            'stream': provider_config.get('stream', False),
+        }
+
+    def _add_telemetry(self, pipeline: StreamPipeline) -> Optional[TelemetryStage]:
+        """Add a telemetry stage to the pipeline when telemetry is enabled."""
+        if self.telemetry is None:
+            return None
+        stage = TelemetryStage()
+        pipeline.add_stage(stage)
+        return stage
+
+    def _record_telemetry(self, stage: Optional[TelemetryStage], response: str, usage: Dict[str, Any],
+                          decision: Dict[str, Any]):
+        """Store the measurements of a finished (or failed) request."""
+        if stage is None:
+            return
+        try:
+            prompt_tokens = decision.get('tokens', 0)
+            self.telemetry.record(stage.build_record(response, prompt_tokens, usage))
+        except Exception as e:
+            print(f"Error recording telemetry: {e}")
+
+    def _complete(self, chat, message: str, history: List[Dict[str, Any]],
+                  provider_config: Dict[str, Any], request: Dict[str, Any], echo: bool,
+                  usage: Optional[Dict[str, Any]] = None) -> str:
+        """Send a message with the fitted history and run the reply through the pipeline."""
+        context, decision = self._fit_context(message, history, provider_config)
+        request['context'] = decision
+        usage = {} if usage is None else usage
+        if provider_config.get('stream', False):
+            chunks = chat.send_message_stream(message, context, usage=usage)
+        else:
+            chunks = single_chunk(lambda: chat.send_message(message, context, usage=usage))
+        pipeline = self.create_pipeline(echo)
+        telemetry = self._add_telemetry(pipeline)
+        try:
+            response = pipeline.run(chunks, request)
+        except BaseException:
+            self._record_telemetry(telemetry, '', usage, decision)
+            raise
+        self._record_telemetry(telemetry, response, usage, decision)
+        return response
+
+    def send_message(self, message: str, history: List[Dict[str, Any]], echo: bool = True) -> str:
         """Send a message and get a response."""
-        if not self._chat:
-            print("No chat interface available. Please check provider configuration.")
+        chat = self.chat_interface
+        if not chat:
+            if echo:
+                print("No chat interface available. Please check provider configuration.")
             return "Error: No chat interface available"
 
         # Get current provider config for streaming setting
         current_provider = self.config_manager.get_current_provider()
         provider_config = self.config_manager.get_provider_config(current_provider)
-        is_streaming = provider_config.get('stream', False)
 
         # Check if default model is set
         default_model = provider_config.get('default_model')
@@ -63,43 +248,126 @@ class Chat:
             return "No default model selected. Please use /model list to select one."
 
         try:
-            if is_streaming:
-                # Handle streaming response
-                response = ''
-                for chunk in self._chat.send_message_stream(message, history):
-                    print(yellow_text(chunk), end='', flush=True)
-                    response += chunk
-                print()  # New line after streaming
+            request = self._pipeline_request(message, provider_config)
+            usage = {}
+            response = self._complete(chat, message, history, provider_config, request, echo, usage)
+            
+            # Add messages to history
+            self._record_exchange(history, message, response, provider_config, usage)
+            return response
                 
-                # Add messages to history
-                if not any(msg.get('role') == 'system' for msg in history):
-                    system_prompt = provider_config.get('system_prompt')
-                    if system_prompt:
-                        history.append({"role": "system", "content": system_prompt})
-                
-                history.append({"role": "user", "content": message})
-                history.append({"role": "assistant", "content": response})
-                return response
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            if echo:
+                print(error_msg)
+            return error_msg
+
+    def resume_reply(self, message: str, partial: str, history: List[Dict[str, Any]],
+                     echo: bool = True) -> str:
+        """
+        Finish a reply that was interrupted after `partial` was received.
+
+        The model is asked to continue from the partial text, and the message
+        and the joined reply are added to history as one exchange.
+        """
+        chat = self.chat_interface
+        if not chat:
+            if echo:
+                print("No chat interface available. Please check provider configuration.")
+            return "Error: No chat interface available"
+
+        provider_config = self.config_manager.get_current_provider_config()
+        if not provider_config.get('default_model'):
+            return "No default model selected. Please use /model list to select one."
+
+        if echo:
+            StreamRenderer().render(partial, end='')
+        interrupted = history + [{"role": "user", "content": message},
+                                 {"role": "assistant", "content": partial}]
+        try:
+            request = self._pipeline_request(message, provider_config)
+            request['prefix'] = partial
+            continuation = self._complete(chat, CONTINUE_PROMPT, interrupted, provider_config, request, echo)
+            response = partial + continuation
+            self._record_exchange(history, message, response, provider_config)
+            return response
+
+        except Exception as e:
+            error_msg = f"Error: {str(e)}"
+            if echo:
+                print(error_msg)
+            return error_msg
+
+    def get_async_chat(self) -> Optional[AsyncBaseChat]:
+        """Get the async chat interface of the current provider."""
+        provider = self.provider
+        if self._async_chat is None and provider:
+            self._async_chat = provider.limit_chat(provider.create_async_chat(), 'chat')
+            provider_config = self.config_manager.get_current_provider_config()
+            if provider_config.get('response_cache'):
+                self._async_chat = CachingAsyncChat(self._async_chat, response_cache,
+                                                    self.config_manager.get_current_provider(), provider_config)
+        return self._async_chat
+
+    async def send_message_async(self, message: str, history: List[Dict[str, Any]],
+                                 echo: bool = True) -> str:
+        """
+        Send a message through the provider's async interface.
+
+        Several calls can run concurrently on one event loop; each awaits the
+        network instead of blocking it.
+        """
+        async_chat = self.get_async_chat()
+        if not async_chat:
+            if echo:
+                print("No chat interface available. Please check provider configuration.")
+            return "Error: No chat interface available"
+
+        provider_config = self.config_manager.get_current_provider_config()
+        if not provider_config.get('default_model'):
+            return "No default model selected. Please use /model list to select one."
+
+        try:
+            context, decision = self._fit_context(message, history, provider_config)
+            request = self._pipeline_request(message, provider_config)
+            request['context'] = decision
+            usage = {}
+            if provider_config.get('stream', False):
+                chunks = async_chat.send_message_stream(message, context, usage=usage)
             else:
-                # Handle non-streaming response
-                response = self._chat.send_message(message, history)
-                print(yellow_text(response))
-                
-                # Add messages to history
-                if not any(msg.get('role') == 'system' for msg in history):
-                    system_prompt = provider_config.get('system_prompt')
-                    if system_prompt:
-                        history.append({"role": "system", "content": system_prompt})
-                
-                history.append({"role": "user", "content": message})
-                history.append({"role": "assistant", "content": response})
-                return response
-                
+                chunks = single_chunk_async(async_chat.send_message(message, context, usage=usage))
+            pipeline = self.create_pipeline(echo)
+            telemetry = self._add_telemetry(pipeline)
+            try:
+                response = await pipeline.run_async(chunks, request)
+            except BaseException:
+                self._record_telemetry(telemetry, '', usage, decision)
+                raise
+            self._record_telemetry(telemetry, response, usage, decision)
+
+            self._record_exchange(history, message, response, provider_config, usage)
+            return response
+
         except Exception as e:
             error_msg = f"Error: {str(e)}"
-            print(error_msg)
+            if echo:
+                print(error_msg)
             return error_msg
 
+    def run_async(self, coroutine):
+        """
+        Run a coroutine to completion on this chat's event loop.
+
+        The loop is kept between calls so pooled async clients stay usable.
+        """
+        import asyncio
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        result = self._loop.run_until_complete(coroutine)
+        # Let finalizers scheduled during the run (e.g. closing HTTP streams) complete
+        self._loop.run_until_complete(asyncio.sleep(0))
+        return result
+
     def get_current_provider_name(self) -> str:
         """Get the name of the current provider."""
         return self.config_manager.get_current_provider()
@@ -120,13 +388,14 @@ class Chat:
         
         # Switch to the new provider
         self.config_manager.set_current_provider(provider_name)
-        self._initialize_provider()
+        self._reset_provider()
         print(f"Switched to provider: {provider_name}")
         return True
 
     def test_current_provider(self) -> bool:
         """Test connection to the current provider."""
-        if not self._current_provider:
+        provider = self.provider
+        if not provider:
             return False
         
-        return self._current_provider.test_connection()
+        return provider.test_connection()
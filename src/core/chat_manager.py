@@ -1,31 +1,131 @@
-import os
-import json
+import threading
+import time
+
+from .storage import create_chat_storage, PartialReplyStore, DEFAULT_CHAT_FORMAT
+from .search_index import ChatSearchIndex
+from .write_behind import WriteBehindWriter
+from .message import Message
+
 
 class ChatManager:
-    def __init__(self, chats_dir='chats'):
+    def __init__(self, chats_dir='chats', storage_format=DEFAULT_CHAT_FORMAT, storage=None, search_index=None,
+                 write_behind=False):
         self.chats_dir = chats_dir
-        if not os.path.exists(self.chats_dir):
-            os.makedirs(self.chats_dir)
+        self.storage_format = storage_format
+        self.storage = storage or create_chat_storage(storage_format, chats_dir)
+        self._search_index = search_index
+        self._search_index_lock = threading.Lock()
+        self.partial_replies = PartialReplyStore(chats_dir)
+        # With write-behind, saves run on a background thread and return immediately
+        self._writer = WriteBehindWriter(self._write_chat) if write_behind else None
+
+    @property
+    def search_index(self):
+        """The full-text index over saved chats, opened on first use."""
+        with self._search_index_lock:
+            if self._search_index is None:
+                self._search_index = ChatSearchIndex(self.chats_dir)
+            return self._search_index
+
+    def _write_chat(self, chat_name, history):
+        self.storage.save_chat(chat_name, history)
+        self.search_index.update_chat(chat_name, history)
+        # The finished reply is now in the chat, so its checkpoint is no longer needed
+        self.partial_replies.discard_if_complete(chat_name)
 
     def save_chat(self, chat_name, history):
-        with open(os.path.join(self.chats_dir, f"{chat_name}.json"), 'w') as f:
-            json.dump(history, f, indent=2)
+        if self._writer is not None:
+            self._writer.submit(chat_name, history)
+        else:
+            self._write_chat(chat_name, history)
+
+    def flush(self):
+        """Wait for queued write-behind saves to reach storage."""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def write_stats(self):
+        """Write-behind queue depth and write latency, or None when saves are synchronous."""
+        return self._writer.stats() if self._writer is not None else None
 
     def load_chat(self, chat_name):
-        try:
-            with open(os.path.join(self.chats_dir, f"{chat_name}.json"), 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return None
+        if self._writer is not None:
+            pending = self._writer.pending(chat_name)
+            if pending is not None:
+                return pending
+        return self.storage.load_chat(chat_name)
 
     def delete_chat(self, chat_name):
-        try:
-            os.remove(os.path.join(self.chats_dir, f"{chat_name}.json"))
-            return True
-        except FileNotFoundError:
-            return False
+        if self._writer is not None:
+            self._writer.cancel(chat_name)
+        deleted = self.storage.delete_chat(chat_name)
+        self.search_index.remove_chat(chat_name)
+        self.partial_replies.discard(chat_name)
+        return deleted
 
     def list_chats(self):
-        chats = [f.replace(".json", "") for f in os.listdir(self.chats_dir) if f.endswith(".json")]
-        chats.sort(key=lambda x: os.path.getmtime(os.path.join(self.chats_dir, f"{x}.json")), reverse=True)
-        return chats
+        self.flush()
+        return self.storage.list_chats()
+
+    def most_recent_chat(self):
+        self.flush()
+        return self.storage.most_recent_chat()
+
+    def generate_chat_id(self):
+        self.flush()
+        return self.storage.generate_chat_id()
+
+    def search_chats(self, query, limit=10):
+        """Search all saved chats, indexing any chat saved before the index existed."""
+        self.flush()
+        missing = set(self.list_chats()) - set(self.search_index.indexed_chats())
+        if missing:
+            histories = ((chat_name, self.load_chat(chat_name)) for chat_name in missing)
+            self.search_index.update_chats((name, history) for name, history in histories if history is not None)
+        return self.search_index.search(query, limit)
+
+    def begin_partial_reply(self, chat_name, request, prefix=''):
+        """Start checkpointing a streaming reply for a chat."""
+        self.partial_replies.begin(chat_name, request, prefix)
+
+    def append_partial_reply(self, chat_name, text):
+        """Checkpoint more text of the streaming reply."""
+        self.partial_replies.append(chat_name, text)
+
+    def end_partial_reply(self, chat_name, complete=True):
+        """Stop checkpointing; an incomplete reply is kept for recovery."""
+        self.partial_replies.end(chat_name, complete)
+
+    def interrupted_replies(self):
+        """Replies that were cut off by a crash or interrupt, oldest first."""
+        return self.partial_replies.interrupted()
+
+    def keep_partial_reply(self, reply):
+        """Add an interrupted reply and its message to the chat as they are. Returns the history."""
+        history = self.load_chat(reply['chat_name']) or []
+        now = round(time.time(), 3)
+        history.append(Message("user", reply['message'], now))
+        if reply['text']:
+            history.append(Message("assistant", reply['text'], now, model=reply.get('model')))
+        self.save_chat(reply['chat_name'], history)
+        self.flush()
+        self.partial_replies.discard(reply['chat_name'])
+        return history
+
+    def discard_partial_reply(self, chat_name):
+        """Drop an interrupted reply."""
+        self.partial_replies.discard(chat_name)
+
+    def compact_chat(self, chat_name):
+        """Compact a chat's journal when the storage engine supports it."""
+        compact = getattr(self.storage, 'compact_chat', None)
+        if compact:
+            compact(chat_name)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self.storage.close()
+        if self._search_index is not None:
+            self._search_index.close()
@@ -0,0 +1,122 @@
+"""
+Side-by-side model comparison.
+
+Sends the same prompt and history to several models at once through the
+providers' async interfaces and interleaves their streamed output line by
+line, so the wall time is that of the slowest model rather than the sum.
+"""
+
+import asyncio
+import time
+from typing import List, Dict, Any, Tuple, Optional
+
+from .config_manager import ConfigManager
+from src.providers import provider_factory
+from src.utils.terminal_colors import yellow_text
+
+# Flush a pane's pending text once it grows past this many characters without a newline
+MAX_PENDING_LINE = 100
+
+
+def parse_targets(spec: str, config_manager: ConfigManager) -> List[Tuple[str, str]]:
+    """
+    Parse a comma-separated model list into (provider, model) pairs.
+
+    Each entry is either `model` (current provider) or `provider:model`. The
+    prefix is only treated as a provider when it names a configured provider,
+    so model ids that contain ':' (e.g. `vendor/model:free`) are kept intact.
+    """
+    configured = set(config_manager.list_configured_providers())
+    current = config_manager.get_current_provider()
+    targets = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        prefix, sep, rest = entry.partition(':')
+        if sep and prefix in configured and rest:
+            targets.append((prefix, rest))
+        else:
+            targets.append((current, entry))
+    return targets
+
+
+class ModelComparison:
+    """Runs one prompt against several models concurrently."""
+
+    def __init__(self, config_manager: ConfigManager, echo: bool = True):
+        self.config_manager = config_manager
+        self.echo = echo
+        self._pending: Dict[str, str] = {}
+
+    def _emit(self, label: str, text: str, final: bool = False):
+        """Print completed lines of a pane prefixed with its label."""
+        pending = self._pending.get(label, '') + text
+        lines = pending.split('\n')
+        pending = lines.pop()
+        if final or len(pending) > MAX_PENDING_LINE:
+            if pending:
+                lines.append(pending)
+            pending = ''
+        self._pending[label] = pending
+        if self.echo:
+            for line in lines:
+                print(f"[{label}] {yellow_text(line)}")
+
+    async def _run_one(self, provider_name: str, model: str, prompt: str,
+                       history: List[Dict[str, Any]], started: float) -> Dict[str, Any]:
+        label = f"{provider_name}:{model}"
+        result = {'label': label, 'provider': provider_name, 'model': model,
+                  'ttft': None, 'total': None, 'response': '', 'error': None}
+
+        provider_config = self.config_manager.get_provider_config(provider_name)
+        provider = provider_factory.create_provider(provider_name, provider_config)
+        if not provider:
+            result['error'] = f"Provider '{provider_name}' is not available"
+            return result
+
+        chat = provider.limit_chat(provider.create_async_chat(), 'compare')
+        chunks = []
+        try:
+            async for chunk in chat.send_message_stream(prompt, history, model=model):
+                if result['ttft'] is None:
+                    result['ttft'] = time.perf_counter() - started
+                chunks.append(chunk)
+                self._emit(label, chunk)
+        except Exception as e:
+            result['error'] = str(e)
+        result['total'] = time.perf_counter() - started
+        result['response'] = ''.join(chunks)
+        if result['error'] is None and result['response'].startswith('Error:'):
+            result['error'] = result['response'][len('Error:'):].strip()
+        self._emit(label, '', final=True)
+        return result
+
+    async def run(self, targets: List[Tuple[str, str]], prompt: str,
+                  history: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Stream the prompt to every target at the same time.
+
+        Returns:
+            One result per target with ttft, total (seconds), response and error
+        """
+        self._pending = {}
+        started = time.perf_counter()
+        return list(await asyncio.gather(
+            *(self._run_one(provider_name, model, prompt, history, started)
+              for provider_name, model in targets)
+        ))
+
+
+def format_summary(results: List[Dict[str, Any]], wall_time: Optional[float] = None) -> str:
+    """Format per-model latency results as a table."""
+    width = max([len(r['label']) for r in results] + [len('Model')])
+    lines = [f"{'Model':<{width}}  {'TTFT':>8}  {'Total':>8}  {'Chars':>6}  Status"]
+    for r in results:
+        ttft = f"{r['ttft']:.2f}s" if r['ttft'] is not None else '-'
+        total = f"{r['total']:.2f}s" if r['total'] is not None else '-'
+        status = f"error: {r['error']}" if r['error'] else 'ok'
+        lines.append(f"{r['label']:<{width}}  {ttft:>8}  {total:>8}  {len(r['response']):>6}  {status}")
+    if wall_time is not None:
+        lines.append(f"Wall time: {wall_time:.2f}s")
+    return '\n'.join(lines)
@@ -1,19 +1,129 @@
+import os
+import copy
 import json
-from typing import Dict, Any, Optional
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, List
+
+from src.utils.file_utils import atomic_write_text
+
 
 class ConfigManager:
     def __init__(self, config_path='config.json'):
         self.config_path = config_path
+        self._listeners: List[Callable[[str], None]] = []
+        # Serialized form and (mtime, size, inode) of config.json as last read or written
+        self._saved_text = None
+        self._file_stat = None
+        self._batch_depth = 0
+        self._batch_snapshot = None
+        self._dirty = False
+        self._changed_providers: List[str] = []
         self.config = self.load_config()
         self._migrate_legacy_config()
 
+    def add_listener(self, listener: Callable[[str], None]):
+        """Register a callback invoked with the provider name whenever its configuration changes."""
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[str], None]):
+        """Unregister a provider configuration listener."""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify_provider_changed(self, provider_name: str):
+        if self._batch_depth:
+            # Listeners run once the batch is written
+            if provider_name not in self._changed_providers:
+                self._changed_providers.append(provider_name)
+            return
+        for listener in list(self._listeners):
+            listener(provider_name)
+
+    def _stat_config(self):
+        try:
+            stat = os.stat(self.config_path)
+            # Atomic writes replace the file, so the inode changes even within one mtime tick
+            return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            return None
+
+    def _read_config(self):
+        """Parse config.json, recording its stat only once the contents parse."""
+        # Taken before reading, so a write that lands mid-read is seen as a change next time
+        stat = self._stat_config()
+        with open(self.config_path, 'r') as f:
+            text = f.read()
+        config = json.loads(text)
+        self._file_stat = stat
+        self._saved_text = json.dumps(config, indent=2)
+        return config
+
     def load_config(self):
         try:
-            with open(self.config_path, 'r') as f:
-                return json.load(f)
+            return self._read_config()
         except FileNotFoundError:
             return self._get_default_config()
 
+    def _reload_if_changed(self):
+        """Pick up edits made by another process (checked via mtime, size and inode)."""
+        if self._batch_depth or self._file_stat is None:
+            return
+        if self._stat_config() == self._file_stat:
+            return
+        previous = self.config
+        try:
+            config = self._read_config()
+        except (OSError, ValueError):
+            # Missing or half-written by a non-atomic writer; keep what we have
+            return
+        self.config = config
+        changed = [name for name in set(previous.get('providers', {})) | set(config.get('providers', {}))
+                   if previous.get('providers', {}).get(name) != config.get('providers', {}).get(name)]
+        if previous.get('current_provider') != config.get('current_provider'):
+            changed.append(self.get_current_provider())
+        for provider_name in dict.fromkeys(changed):
+            self._notify_provider_changed(provider_name)
+
+    @contextmanager
+    def batch(self):
+        """
+        Group several updates into one atomic write.
+
+        Listeners are notified after the write. If the block raises, the
+        configuration is rolled back and nothing is written.
+        """
+        if self._batch_depth == 0:
+            self._reload_if_changed()
+            self._batch_snapshot = copy.deepcopy(self.config)
+        self._batch_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.config = self._batch_snapshot
+                self._batch_snapshot = None
+                self._dirty = False
+                self._changed_providers = []
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._batch_snapshot = None
+            if self._dirty:
+                self._dirty = False
+                self.save_config()
+            changed, self._changed_providers = self._changed_providers, []
+            for provider_name in changed:
+                self._notify_provider_changed(provider_name)
+
+    def _changed(self):
+        """Persist a change now, or at the end of the current batch."""
+        if self._batch_depth:
+            self._dirty = True
+        else:
+            self.save_config()
+
     def _get_default_config(self) -> Dict[str, Any]:
         """Get default configuration structure."""
         return {
@@ -59,42 +169,55 @@ class ConfigManager:
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get a configuration value."""
+        self._reload_if_changed()
         return self.config.get(key, default)
 
     def set(self, key: str, value: Any):
         """Set a configuration value."""
+        self._reload_if_changed()
         self.config[key] = value
-        self.save_config()
+        self._changed()
 
     def get_current_provider(self) -> str:
         """Get the name of the current provider."""
+        self._reload_if_changed()
         return self.config.get('current_provider', 'lmstudio')
 
     def set_current_provider(self, provider_name: str):
         """Set the current provider."""
+        self._reload_if_changed()
         self.config['current_provider'] = provider_name
-        self.save_config()
+        self._changed()
 
     def get_provider_config(self, provider_name: str) -> Dict[str, Any]:
         """Get configuration for a specific provider."""
+        self._reload_if_changed()
         return self.config.get('providers', {}).get(provider_name, {})
 
     def set_provider_config(self, provider_name: str, provider_config: Dict[str, Any]):
         """Set configuration for a specific provider."""
+        self._reload_if_changed()
         if 'providers' not in self.config:
             self.config['providers'] = {}
         self.config['providers'][provider_name] = provider_config
-        self.save_config()
+        self._changed()
+        self._notify_provider_changed(provider_name)
 
     def update_provider_config(self, provider_name: str, updates: Dict[str, Any]):
         """Update specific keys in a provider's configuration."""
+        self._reload_if_changed()
         if 'providers' not in self.config:
             self.config['providers'] = {}
         if provider_name not in self.config['providers']:
             self.config['providers'][provider_name] = {}
         
-        self.config['providers'][provider_name].update(updates)
-        self.save_config()
+        provider_config = self.config['providers'][provider_name]
+        if all(key in provider_config and provider_config[key] == value for key, value in updates.items()):
+            # Nothing changes, so don't rewrite the file or rebuild providers
+            return
+        provider_config.update(updates)
+        self._changed()
+        self._notify_provider_changed(provider_name)
 
     def get_provider_value(self, provider_name: str, key: str, default: Any = None) -> Any:
         """Get a specific value from a provider's configuration."""
@@ -112,8 +235,14 @@ class ConfigManager:
 
     def list_configured_providers(self) -> list:
         """Get list of configured provider names."""
+        self._reload_if_changed()
         return list(self.config.get('providers', {}).keys())
 
     def save_config(self):
-        with open(self.config_path, 'w') as f:
-            json.dump(self.config, f, indent=2)
+        """Write config.json atomically, skipping the write when nothing changed."""
+        text = json.dumps(self.config, indent=2)
+        if text == self._saved_text and self._stat_config() == self._file_stat:
+            return
+        atomic_write_text(self.config_path, text)
+        self._saved_text = text
+        self._file_stat = self._stat_config()
@@ -0,0 +1,173 @@
+"""
+Token-budgeted context window.
+
+Sits between Chat and the provider and decides which part of the history is
+sent with a request. The system prompt and the new message are always kept;
+the most recent turns are added newest first until the token budget is used
+up, and the dropped middle is replaced by a short note in the system message.
+"""
+
+import logging
+from typing import List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate for English text with OpenAI-style tokenizers
+CHARS_PER_TOKEN = 4
+# Role and separator tokens added per message by chat templates
+MESSAGE_OVERHEAD_TOKENS = 4
+# Tokens left for the response when the budget comes from the model's context length
+DEFAULT_RESPONSE_RESERVE = 1024
+ELISION_NOTICE = "[{count} earlier messages were omitted to fit the context window.]"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a piece of text."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _content_tokens(message: Dict[str, Any]) -> int:
+    content = message.get('content') or ''
+    if not isinstance(content, str):
+        content = str(content)
+    return estimate_tokens(content)
+
+
+def message_tokens(message: Dict[str, Any]) -> int:
+    """
+    Estimate the tokens a message costs in a request.
+
+    A Message uses its reported token count when it has one, and otherwise
+    keeps the estimate on itself so each message is only measured once.
+    """
+    token_count = getattr(message, 'token_count', None)
+    if token_count is not None:
+        return token_count + MESSAGE_OVERHEAD_TOKENS
+    if hasattr(message, 'estimated_tokens'):
+        if message.estimated_tokens is None:
+            message.estimated_tokens = _content_tokens(message)
+        return message.estimated_tokens + MESSAGE_OVERHEAD_TOKENS
+    return _content_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+
+
+def resolve_budget(provider_config: Dict[str, Any], context_length: Optional[int] = None) -> Optional[int]:
+    """
+    Work out the prompt token budget for a provider.
+
+    An explicit `context_budget` wins; otherwise the model's context length
+    minus the response reserve (`max_tokens`) is used. None means unlimited.
+    """
+    budget = provider_config.get('context_budget')
+    if budget:
+        return int(budget)
+    if context_length:
+        reserve = provider_config.get('max_tokens') or DEFAULT_RESPONSE_RESERVE
+        return max(int(context_length) - int(reserve), 0)
+    return None
+
+
+class ContextWindow:
+    """Fits a conversation into a token budget."""
+
+    def __init__(self, budget: Optional[int] = None, max_turns: Optional[int] = None, elide: bool = True):
+        """
+        Args:
+            budget: Maximum prompt tokens, or None for no limit
+            max_turns: Keep at most this many recent turns, or None for no limit
+            elide: Mention dropped messages in the system message
+        """
+        self.budget = budget
+        self.max_turns = max_turns
+        self.elide = elide
+        self.last_decision: Dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, provider_config: Dict[str, Any], context_length: Optional[int] = None) -> 'ContextWindow':
+        """Create a window from provider settings (`context_budget`, `context_turns`)."""
+        return cls(resolve_budget(provider_config, context_length), provider_config.get('context_turns') or None)
+
+    def _recent_turns(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Cut the conversation down to the last max_turns turns."""
+        if not self.max_turns:
+            return messages
+        turns = 0
+        for index in range(len(messages) - 1, -1, -1):
+            if messages[index].get('role') == 'user':
+                turns += 1
+                if turns == self.max_turns:
+                    return messages[index:]
+        return messages
+
+    def fit(self, message: str, history: List[Dict[str, Any]],
+            system_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Select the history to send with a new message.
+
+        Args:
+            message: The new user message
+            history: Full conversation history (not modified)
+            system_prompt: System prompt the provider adds when the history has none
+
+        Returns:
+            The history to pass to the provider (without the new message); the
+            history itself when all of it is sent unchanged
+        """
+        system_messages = [msg for msg in history if msg.get('role') == 'system']
+        conversation = [msg for msg in history if msg.get('role') != 'system']
+
+        used = estimate_tokens(message) + MESSAGE_OVERHEAD_TOKENS
+        if system_messages:
+            used += sum(message_tokens(msg) for msg in system_messages)
+        elif system_prompt:
+            used += estimate_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+
+        candidates = self._recent_turns(conversation)
+        if self.budget is None:
+            kept = candidates
+        else:
+            costs = [message_tokens(msg) for msg in candidates]
+            available = self.budget - used
+            start = 0
+            if len(candidates) < len(conversation) or sum(costs) > available:
+                if self.elide:
+                    available -= estimate_tokens(ELISION_NOTICE) + 2
+                start = len(candidates)
+                for index in range(len(candidates) - 1, -1, -1):
+                    if costs[index] > available:
+                        break
+                    available -= costs[index]
+                    start = index
+            kept = candidates[start:]
+            # Don't open the window with an assistant reply whose question was dropped
+            while kept and kept[0].get('role') != 'user' and len(kept) < len(conversation):
+                kept = kept[1:]
+
+        dropped = len(conversation) - len(kept)
+        if dropped and self.elide:
+            notice = ELISION_NOTICE.format(count=dropped)
+            base = '\n\n'.join(msg.get('content') or '' for msg in system_messages) or system_prompt
+            system_messages = [{"role": "system", "content": f"{base}\n\n{notice}" if base else notice}]
+
+        selected = system_messages + kept
+        if len(selected) == len(history) and all(a is b for a, b in zip(selected, history)):
+            # Nothing changed: hand back the history itself so it keeps its fingerprints
+            selected = history
+        tokens = used + sum(message_tokens(msg) for msg in kept)
+        self.last_decision = {
+            'messages': len(history),
+            'sent': len(selected),
+            'dropped': dropped,
+            'tokens': tokens,
+            'budget': self.budget,
+            'max_turns': self.max_turns,
+        }
+        if dropped:
+            logger.info("Context window: sending %d of %d messages (~%d tokens, budget %s), dropped %d",
+                        len(selected), len(history), tokens, self.budget, dropped)
+        else:
+            logger.debug("Context window: sending all %d messages (~%d tokens, budget %s)",
+                         len(history), tokens, self.budget)
+        if self.budget is not None and tokens > self.budget:
+            logger.warning("Context window: request (~%d tokens) exceeds the budget of %d tokens",
+                           tokens, self.budget)
+        return selected
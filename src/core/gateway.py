@@ -0,0 +1,433 @@
+"""
+Headless OpenAI-compatible HTTP gateway (`rchat serve`).
+
+Serves `GET /v1/models` and `POST /v1/chat/completions` (JSON, or SSE when
+`stream` is set) on a local port with asyncio, so other tools can use
+RetroChat's providers, configuration, rate limits and response cache. The
+request's `model` picks the provider like `/compare` does: `provider:model`,
+or a bare model id (or none) for the current provider. Requests are served
+concurrently through the providers' async chats.
+
+With sessions enabled, a request carrying an `X-Session-Id` header only
+sends its new messages: the session's earlier messages are loaded from (and
+the exchange saved to) the chat of that name through ChatManager, so
+`/chat load <session>` opens it in the interactive client. Recently used
+sessions stay in memory (see SessionManager). Turns of one session run one
+at a time.
+"""
+
+import asyncio
+import json
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import List, Dict, Any, Optional, Tuple
+
+from .config_manager import ConfigManager
+from .chat_manager import ChatManager
+from .storage import DEFAULT_CHAT_FORMAT
+from .chat import create_async_chat
+from .compare import parse_targets
+from .context_window import ContextWindow
+from .session_manager import SessionManager
+from .message import Message
+from src.providers import provider_factory
+from src.providers.client_pool import fingerprint
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+MAX_BODY_BYTES = 16 * 1024 * 1024
+SESSION_HEADER = 'x-session-id'
+SESSION_NAME = re.compile(r'^[A-Za-z0-9_.-]{1,128}$')
+SAMPLING_KEYS = ('temperature', 'top_p', 'max_tokens')
+
+
+class GatewayError(Exception):
+    """A request the gateway answers with an OpenAI-style error."""
+
+    def __init__(self, status: int, message: str, error_type: str = 'invalid_request_error'):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+
+def error_body(message: str, error_type: str = 'invalid_request_error') -> Dict[str, Any]:
+    return {'error': {'message': message, 'type': error_type}}
+
+
+class Gateway:
+    """OpenAI-compatible HTTP front end for the configured providers."""
+
+    def __init__(self, config_manager: ConfigManager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 chat_manager: Optional[ChatManager] = None):
+        """
+        Args:
+            config_manager: Source of provider settings
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            chat_manager: Stores session histories; None disables sessions
+        """
+        self.config_manager = config_manager
+        self.host = host
+        self.port = port
+        self.chat_manager = chat_manager
+        self.sessions = SessionManager.from_config(chat_manager, config_manager) if chat_manager else None
+        self.requests = 0
+        self._chats = {}
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        # Chat storage is not shared between threads, so it gets one of its own
+        self._storage_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='gateway-chats')
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._writers = set()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    # Routing
+
+    def _route_model(self, model: Optional[str]) -> Tuple[str, Dict[str, Any], Optional[str]]:
+        """Provider name, its config and the model id a request's `model` refers to."""
+        targets = parse_targets(model, self.config_manager) if model else []
+        provider_name, model_id = targets[0] if targets else (self.config_manager.get_current_provider(), None)
+        provider_config = self.config_manager.get_provider_config(provider_name)
+        if not provider_config:
+            raise GatewayError(404, f"Provider '{provider_name}' is not configured", 'not_found_error')
+        return provider_name, provider_config, model_id or provider_config.get('default_model')
+
+    def _async_chat(self, provider_name: str, provider_config: Dict[str, Any]):
+        """The provider's async chat, recreated when its configuration changes."""
+        key = (provider_name, fingerprint({'config': json.dumps(provider_config, sort_keys=True)}))
+        if key not in self._chats:
+            chat = create_async_chat(provider_name, provider_config, 'serve')
+            if chat is None:
+                raise GatewayError(503, f"Provider '{provider_name}' is not available", 'server_error')
+            self._chats[key] = chat
+        return self._chats[key]
+
+    def _session_lock(self, session: str) -> asyncio.Lock:
+        lock = self._session_locks.get(session)
+        if lock is None:
+            lock = self._session_locks[session] = asyncio.Lock()
+        return lock
+
+    async def _storage(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._storage_executor, method, *args)
+
+    def _record_turn(self, session: str, messages: List[Dict[str, Any]]):
+        """Append a turn to a session's cached history and save it (runs on the storage thread)."""
+        history = self.sessions.get(session)
+        if history is None:
+            history = self.sessions.put(session, [])
+        now = round(time.time(), 3)
+        history.extend(Message(msg['role'], msg['content'], now) for msg in messages)
+        self.sessions.save(session)
+
+    # HTTP
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve the requests of one keep-alive connection."""
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                length = headers.get('content-length') or '0'
+                if len(parts) != 3 or not length.isdigit():
+                    await self._send_json(writer, 400, error_body("Malformed request"), close=True)
+                    break
+                length = int(length)
+                if length > MAX_BODY_BYTES:
+                    await self._send_json(writer, 413, error_body("Request body too large"), close=True)
+                    break
+                method, path, version = parts
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                self.requests += 1
+                try:
+                    await self._dispatch(method, path.split('?', 1)[0].rstrip('/'), headers, body, writer)
+                except GatewayError as e:
+                    await self._send_json(writer, e.status, error_body(str(e), e.error_type))
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception as e:
+                    # The response may be half written, so the connection can't be reused
+                    await self._send_json(writer, 500, error_body(str(e) or type(e).__name__, 'server_error'),
+                                          close=True)
+                    break
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, method: str, path: str, headers: Dict[str, str], body: bytes,
+                        writer: asyncio.StreamWriter):
+        if path == '/v1/models' and method == 'GET':
+            await self._send_json(writer, 200, {'object': 'list', 'data': await self._list_models()})
+        elif path == '/v1/chat/completions' and method == 'POST':
+            try:
+                request = json.loads(body or b'null')
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise GatewayError(400, "Request body is not valid JSON")
+            if not isinstance(request, dict):
+                raise GatewayError(400, "Request body must be a JSON object")
+            await self._chat_completion(request, headers.get(SESSION_HEADER), writer)
+        elif path in ('/v1/models', '/v1/chat/completions'):
+            raise GatewayError(405, f"{method} is not supported for {path}")
+        else:
+            raise GatewayError(404, f"Unknown path {path}", 'not_found_error')
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: Dict[str, Any],
+                         close: bool = False):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"{'Connection: close' if close else 'Connection: keep-alive'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def _start_events(self, writer: asyncio.StreamWriter):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n"
+                     b"Transfer-Encoding: chunked\r\nConnection: keep-alive\r\n\r\n")
+
+    async def _send_event(self, writer: asyncio.StreamWriter, payload: Any):
+        data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        event = f"data: {data}\n\n".encode('utf-8')
+        writer.write(b'%x\r\n%s\r\n' % (len(event), event))
+        await writer.drain()
+
+    # Endpoints
+
+    async def _list_models(self) -> List[Dict[str, Any]]:
+        """Models of every configured provider, as `provider:model` ids."""
+        async def provider_models(provider_name):
+            provider = provider_factory.create_provider(provider_name,
+                                                        self.config_manager.get_provider_config(provider_name))
+            if not provider:
+                return []
+            try:
+                models = await provider.create_async_model_manager().get_models()
+            except Exception:
+                return []
+            return [{'id': f"{provider_name}:{model['id']}", 'object': 'model', 'created': model.get('created') or 0,
+                     'owned_by': model.get('owned_by') or provider_name} for model in models]
+
+        results = await asyncio.gather(*(provider_models(name)
+                                         for name in self.config_manager.list_configured_providers()))
+        return [model for models in results for model in models]
+
+    def _parse_messages(self, request: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Split the request's messages into the new user message and the history before it."""
+        messages = request.get('messages')
+        if not isinstance(messages, list) or not messages:
+            raise GatewayError(400, "'messages' must be a non-empty list")
+        history = []
+        for msg in messages:
+            if not isinstance(msg, dict) or msg.get('role') not in ('system', 'user', 'assistant'):
+                raise GatewayError(400, "Each message needs a role of system, user or assistant")
+            content = msg.get('content')
+            if isinstance(content, list):
+                # Content parts: keep the text
+                content = ''.join(part.get('text', '') for part in content if isinstance(part, dict))
+            if not isinstance(content, str):
+                raise GatewayError(400, "Message content must be a string")
+            history.append({'role': msg['role'], 'content': content})
+        last = history.pop()
+        if last['role'] != 'user':
+            raise GatewayError(400, "The last message must be from the user")
+        return last['content'], history
+
+    async def _chat_completion(self, request: Dict[str, Any], session: Optional[str],
+                               writer: asyncio.StreamWriter):
+        message, history = self._parse_messages(request)
+        provider_name, provider_config, model = self._route_model(request.get('model'))
+        if not model:
+            raise GatewayError(400, f"No model given and '{provider_name}' has no default model")
+        chat = self._async_chat(provider_name, provider_config)
+        kwargs = {key: request[key] for key in SAMPLING_KEYS if request.get(key) is not None}
+
+        if session is None or self.chat_manager is None:
+            await self._complete(chat, message, history, provider_name, provider_config, model, kwargs,
+                                 request, writer)
+            return
+        if not SESSION_NAME.match(session):
+            raise GatewayError(400, "X-Session-Id may only contain letters, digits, '.', '_' and '-'")
+        async with self._session_lock(session):
+            stored = await self._storage(self.sessions.get, session)
+            stored = list(stored) if stored else []
+            if any(msg.get('role') == 'system' for msg in stored):
+                history = [msg for msg in history if msg['role'] != 'system']
+            reply = await self._complete(chat, message, stored + history, provider_name, provider_config, model,
+                                         kwargs, request, writer)
+            if reply is not None:
+                history += [{'role': 'user', 'content': message}, {'role': 'assistant', 'content': reply}]
+                await self._storage(self._record_turn, session, history)
+
+    async def _complete(self, chat, message: str, history: List[Dict[str, Any]], provider_name: str,
+                        provider_config: Dict[str, Any], model: str, kwargs: Dict[str, Any],
+                        request: Dict[str, Any], writer: asyncio.StreamWriter) -> Optional[str]:
+        """
+        Send one request to the provider and write the response.
+
+        Returns:
+            The reply, or None if the provider failed or the client went away
+        """
+        window = ContextWindow.from_config(provider_config)
+        sent_history = window.fit(message, history, provider_config.get('system_prompt'))
+        usage = {}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        label = f"{provider_name}:{model}"
+        stream = chat.send_message_stream(message, sent_history, model=model, usage=usage, **kwargs)
+        try:
+            if not request.get('stream'):
+                reply = ''.join([chunk async for chunk in stream])
+                if reply.startswith('Error:'):
+                    raise GatewayError(502, reply[len('Error:'):].strip(), 'upstream_error')
+                await self._send_json(writer, 200, {
+                    'id': completion_id, 'object': 'chat.completion', 'created': created, 'model': label,
+                    'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': reply},
+                                 'finish_reason': 'stop'}],
+                    'usage': self._usage(usage),
+                })
+                return reply
+            return await self._stream(stream, writer, completion_id, created, label, usage,
+                                      (request.get('stream_options') or {}).get('include_usage'))
+        finally:
+            await stream.aclose()
+
+    async def _stream(self, stream, writer: asyncio.StreamWriter, completion_id: str, created: int,
+                      label: str, usage: Dict[str, Any], include_usage: bool) -> Optional[str]:
+        """Relay a reply as server-sent events; an upstream error before any text becomes a 502."""
+        base = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': label}
+        chunks = []
+        started = failed = False
+        async for chunk in stream:
+            if chunk.startswith('Error:'):
+                if not started:
+                    raise GatewayError(502, chunk[len('Error:'):].strip(), 'upstream_error')
+                await self._send_event(writer, error_body(chunk[len('Error:'):].strip(), 'upstream_error'))
+                failed = True
+                break
+            if not started:
+                await self._start_events(writer)
+                await self._send_event(writer, dict(base, choices=[
+                    {'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}]))
+                started = True
+            chunks.append(chunk)
+            await self._send_event(writer, dict(base, choices=[
+                {'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}]))
+
+        if not started:
+            await self._start_events(writer)
+        await self._send_event(writer, dict(base, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))
+        if include_usage:
+            await self._send_event(writer, dict(base, choices=[], usage=self._usage(usage)))
+        await self._send_event(writer, '[DONE]')
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+        return None if failed else ''.join(chunks)
+
+    def _usage(self, usage: Dict[str, Any]) -> Dict[str, int]:
+        prompt_tokens = usage.get('prompt_tokens') or 0
+        completion_tokens = usage.get('completion_tokens') or 0
+        return {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens}
+
+    # Lifecycle
+
+    async def serve(self, ready=None):
+        """
+        Listen and serve until cancelled.
+
+        Args:
+            ready: Called once the server is listening
+        """
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if ready:
+            ready()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self._storage_executor.shutdown(wait=True)
+            if self.sessions is not None:
+                self.sessions.flush()
+                self.chat_manager.flush()
+
+    def start(self) -> 'Gateway':
+        """Serve on a background thread; returns once the server is listening."""
+        import threading
+        listening = threading.Event()
+
+        def run():
+            try:
+                asyncio.run(self.serve(listening.set))
+            except asyncio.CancelledError:
+                pass
+
+        self._thread = threading.Thread(target=run, name='rchat-gateway', daemon=True)
+        self._thread.start()
+        listening.wait()
+        return self
+
+    def _shutdown(self):
+        self._server.close()
+        # Idle keep-alive connections would otherwise hold the server open
+        for writer in list(self._writers):
+            writer.close()
+
+    def stop(self):
+        """Stop a gateway started with start()."""
+        if self._server is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._shutdown)
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def run_gateway(config_manager: ConfigManager, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                sessions: bool = False):
+    """Serve until interrupted (`rchat serve`)."""
+    chat_manager = None
+    if sessions:
+        chat_manager = ChatManager(storage_format=config_manager.get('chat_format', DEFAULT_CHAT_FORMAT),
+                                   write_behind=config_manager.get('write_behind', False))
+    gateway = Gateway(config_manager, host, port, chat_manager)
+
+    def ready():
+        print(f"Serving {', '.join(config_manager.list_configured_providers())} at {gateway.base_url}"
+              f"{' with sessions' if sessions else ''} (Ctrl-C to stop)")
+
+    try:
+        asyncio.run(gateway.serve(ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if chat_manager is not None:
+            chat_manager.close()
@@ -0,0 +1,181 @@
+"""
+Conversation history with a rolling prefix hash.
+
+ConversationHistory is a list of message dictionaries that keeps a
+polynomial rolling hash (mod 2**61 - 1) of every prefix, built from a
+blake2b digest of each message's role and content. Appending extends the
+hash of the previous prefix, so the fingerprint of the whole history or of
+any prefix is O(1), and so is the fingerprint of the message list a provider
+sends (optional system prompt prepended, new user message appended).
+Other changes (reset, insert, replace, delete) rehash from the first changed
+message. Messages must not be edited in place once added.
+"""
+
+import hashlib
+from typing import Dict, Any, Iterable, Optional
+
+MODULUS = (1 << 61) - 1
+BASE = 0x5BD1E995_2F6C3A1B % MODULUS
+
+# BASE ** n mod MODULUS, grown on demand
+_powers = [1]
+
+
+def _power(n: int) -> int:
+    while len(_powers) <= n:
+        _powers.append(_powers[-1] * BASE % MODULUS)
+    return _powers[n]
+
+
+def message_digest(message: Dict[str, Any]) -> int:
+    """Digest of a message's role and content as a non-zero number below MODULUS."""
+    data = f"{message.get('role')}\0{message.get('content')}".encode('utf-8', 'surrogatepass')
+    value = int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+    return value % (MODULUS - 1) + 1
+
+
+def combine_fingerprints(left: int, right: int, right_length: int) -> int:
+    """Fingerprint of two message sequences joined, given the length of the right one."""
+    return (left * _power(right_length) + right) % MODULUS
+
+
+def fingerprint_messages(messages: Iterable[Dict[str, Any]]) -> int:
+    """Fingerprint of a plain list of messages (O(n); equal to ConversationHistory.fingerprint())."""
+    value = 0
+    for message in messages:
+        value = (value * BASE + message_digest(message)) % MODULUS
+    return value
+
+
+class ConversationHistory(list):
+    """List of messages that fingerprints every prefix in O(1)."""
+
+    __slots__ = ('_prefix', '_first_system')
+
+    def __init__(self, messages: Iterable[Dict[str, Any]] = ()):
+        super().__init__(messages)
+        # _prefix[i] is the fingerprint of the first i messages
+        self._prefix = [0]
+        self._first_system = None
+        self._rehash(0)
+
+    def _add(self, message: Dict[str, Any]):
+        if self._first_system is None and message.get('role') == 'system':
+            self._first_system = len(self._prefix) - 1
+        self._prefix.append((self._prefix[-1] * BASE + message_digest(message)) % MODULUS)
+
+    def _rehash(self, start: int):
+        """Recompute the prefix hashes from message `start` on."""
+        start = max(0, min(start, len(self._prefix) - 1, len(self)))
+        del self._prefix[start + 1:]
+        if self._first_system is not None and self._first_system >= start:
+            self._first_system = None
+        for index in range(start, len(self)):
+            self._add(list.__getitem__(self, index))
+
+    def _start(self, index) -> int:
+        """First position touched by an index or slice."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            return start if step > 0 else 0
+        return index + len(self) if index < 0 else index
+
+    # Mutations: appends are incremental, everything else rehashes from the change
+
+    def append(self, message: Dict[str, Any]):
+        super().append(message)
+        self._add(message)
+
+    def extend(self, messages: Iterable[Dict[str, Any]]):
+        start = len(self)
+        super().extend(messages)
+        for index in range(start, len(self)):
+            self._add(list.__getitem__(self, index))
+
+    def __iadd__(self, messages):
+        self.extend(messages)
+        return self
+
+    def __imul__(self, count):
+        super().__imul__(count)
+        self._rehash(0)
+        return self
+
+    def insert(self, index: int, message: Dict[str, Any]):
+        start = min(max(self._start(index), 0), len(self))
+        super().insert(index, message)
+        self._rehash(start)
+
+    def __setitem__(self, index, value):
+        start = self._start(index)
+        super().__setitem__(index, value)
+        self._rehash(start)
+
+    def __delitem__(self, index):
+        start = self._start(index)
+        super().__delitem__(index)
+        self._rehash(start)
+
+    def pop(self, index: int = -1) -> Dict[str, Any]:
+        start = self._start(index)
+        message = super().pop(index)
+        self._rehash(start)
+        return message
+
+    def remove(self, message: Dict[str, Any]):
+        del self[self.index(message)]
+
+    def clear(self):
+        super().clear()
+        self._rehash(0)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._rehash(0)
+
+    def reverse(self):
+        super().reverse()
+        self._rehash(0)
+
+    # Fingerprints
+
+    def _length(self, length: Optional[int]) -> int:
+        if length is None:
+            return len(self)
+        if not 0 <= length <= len(self):
+            raise IndexError(f"Prefix length {length} out of range for {len(self)} messages")
+        return length
+
+    def fingerprint(self, length: Optional[int] = None) -> int:
+        """Fingerprint of the first `length` messages (all of them by default)."""
+        return self._prefix[self._length(length)]
+
+    def has_system_message(self, length: Optional[int] = None) -> bool:
+        """Whether the first `length` messages include a system message."""
+        return self._first_system is not None and self._first_system < self._length(length)
+
+    def request_fingerprint(self, message: str, system_prompt: Optional[str] = None,
+                            length: Optional[int] = None) -> int:
+        """
+        Fingerprint of the messages a provider sends for a new user message.
+
+        Matches fingerprint_messages(build_chat_messages(message, history[:length], system_prompt)):
+        the system prompt is prepended when that prefix has no system message.
+
+        Args:
+            message: The new user message
+            system_prompt: System prompt the provider adds when the history has none
+            length: Use only the first `length` messages of the history
+        """
+        length = self._length(length)
+        value = self._prefix[length]
+        if system_prompt and not self.has_system_message(length):
+            value = combine_fingerprints(message_digest({"role": "system", "content": system_prompt}),
+                                         value, length)
+        return combine_fingerprints(value, message_digest({"role": "user", "content": message}), 1)
+
+    def copy(self) -> 'ConversationHistory':
+        return ConversationHistory(self)
+
+    def __reduce__(self):
+        return (ConversationHistory, (list(self),))
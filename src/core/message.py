@@ -0,0 +1,124 @@
+"""
+Compact chat message.
+
+Message holds one history entry in `__slots__` instead of a dictionary, with
+its role interned so the few role strings are shared by every message, and
+optional metadata: when it was added, its token count and the model that
+wrote it. It is a read-only mapping over the keys an API request needs
+(`role`, `content`, plus any other keys it was loaded with), so code that
+reads `msg.get('role')` keeps working and providers can send messages as
+they are. The metadata is left out of that view (it is not part of a chat
+request) but is written by to_dict(), which gives the JSON shape chats are
+stored in. The context window's token estimate is memoized on the message
+and never stored.
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Dict, Any, Optional
+
+METADATA_KEYS = ('timestamp', 'token_count', 'model')
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Message(Mapping):
+    """One chat message: role, content and optional metadata."""
+
+    __slots__ = ('role', 'content', 'timestamp', 'token_count', 'model', 'extra', 'estimated_tokens')
+
+    def __init__(self, role: str, content: Any, timestamp: Optional[float] = None,
+                 token_count: Optional[int] = None, model: Optional[str] = None,
+                 extra: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            role: system, user or assistant
+            content: Message text
+            timestamp: When the message was added (seconds since the epoch)
+            token_count: Tokens of the content, when the provider reported them
+            model: Model that wrote the message
+            extra: Any other keys of the stored message, kept as they are
+        """
+        self.role = _intern(role)
+        self.content = content
+        self.timestamp = timestamp
+        self.token_count = token_count
+        self.model = _intern(model)
+        self.extra = extra or None
+        # Set by the context window the first time it estimates the content
+        self.estimated_tokens = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Message':
+        """Build a message from its stored JSON shape (a Message is returned as it is)."""
+        if isinstance(data, Message):
+            return data
+        to_dict = getattr(data, 'to_dict', None)
+        if to_dict is not None:
+            # A Message of another copy of this module: its metadata is not in the mapping view
+            data = to_dict()
+        extra = {key: value for key, value in data.items()
+                 if key not in ('role', 'content') and key not in METADATA_KEYS}
+        return cls(data.get('role'), data.get('content'), data.get('timestamp'), data.get('token_count'),
+                   data.get('model'), extra)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The stored JSON shape: role, content, any other keys and the metadata that is set."""
+        data = {'role': self.role, 'content': self.content}
+        if self.extra:
+            data.update(self.extra)
+        for key in METADATA_KEYS:
+            value = getattr(self, key)
+            if value is not None:
+                data[key] = value
+        return data
+
+    # Mapping view: role, content and the extra keys
+
+    def __getitem__(self, key: str) -> Any:
+        if key == 'role':
+            return self.role
+        if key == 'content':
+            return self.content
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        # Called for every message by history fingerprints and the context window
+        if key == 'role':
+            return self.role
+        if key == 'content':
+            return self.content
+        return self.extra.get(key, default) if self.extra else default
+
+    def __iter__(self):
+        yield 'role'
+        yield 'content'
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return 2 + (len(self.extra) if self.extra else 0)
+
+    def __repr__(self) -> str:
+        return f"Message({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return (Message.from_dict, (self.to_dict(),))
+
+
+def message_to_json(value: Any) -> Dict[str, Any]:
+    """`default` hook for json.dump of histories holding Message objects."""
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is not None:
+        return to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def message_to_dict(message: Dict[str, Any]) -> Dict[str, Any]:
+    """The stored JSON shape of a Message or plain message dictionary."""
+    to_dict = getattr(message, 'to_dict', None)
+    return to_dict() if to_dict is not None else message
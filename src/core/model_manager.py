@@ -19,7 +19,33 @@ class ModelManager:
         self.config_manager = config_manager
         self._current_provider = None
         self._model_manager = None
-        self._initialize_provider()
+        self._provider_loaded = False
+        self.config_manager.add_listener(self._on_provider_config_changed)
+
+    @property
+    def provider(self):
+        """The current provider, created on first use."""
+        if not self._provider_loaded:
+            self._initialize_provider()
+        return self._current_provider
+
+    @property
+    def provider_model_manager(self):
+        """The current provider's model manager, created on first use."""
+        if not self._provider_loaded:
+            self._initialize_provider()
+        return self._model_manager
+
+    def _on_provider_config_changed(self, provider_name: str):
+        """Rebind to the pooled provider when the current provider's settings change."""
+        if provider_name == self.config_manager.get_current_provider():
+            self._reset_provider()
+
+    def _reset_provider(self):
+        """Drop the current provider so it is recreated on next use."""
+        self._current_provider = None
+        self._model_manager = None
+        self._provider_loaded = False
 
     def _initialize_provider(self):
         """Initialize the current provider and its model manager."""
@@ -31,25 +57,28 @@ class ModelManager:
             current_provider_name, 
             provider_config
         )
+        self._provider_loaded = True
         
         if self._current_provider:
             self._model_manager = self._current_provider.create_model_manager()
             provider_factory.set_current_provider(self._current_provider)
         else:
+            self._model_manager = None
             print(f"Failed to initialize provider: {current_provider_name}")
 
     def refresh_provider(self):
         """Refresh the current provider (useful after config changes)."""
-        self._initialize_provider()
+        self._reset_provider()
 
     def get_models(self) -> List[Dict[str, Any]]:
         """Get available models from the current provider."""
-        if not self._model_manager:
+        model_manager = self.provider_model_manager
+        if not model_manager:
             print("No model manager available. Please check provider configuration.")
             return []
         
         try:
-            models = self._model_manager.get_models()
+            models = model_manager.get_models()
             return models
         except Exception as e:
             print(f"Error fetching models: {e}")
@@ -57,11 +86,12 @@ class ModelManager:
 
     def get_model_info(self, model_id: str) -> Dict[str, Any]:
         """Get information about a specific model."""
-        if not self._model_manager:
+        model_manager = self.provider_model_manager
+        if not model_manager:
             return {}
         
         try:
-            return self._model_manager.get_model_info(model_id)
+            return model_manager.get_model_info(model_id)
         except Exception as e:
             print(f"Error fetching model info: {e}")
             return {}
@@ -96,16 +126,17 @@ class ModelManager:
         
         # Switch to the new provider
         self.config_manager.set_current_provider(provider_name)
-        self._initialize_provider()
+        self._reset_provider()
         print(f"Switched to provider: {provider_name}")
         return True
 
     def test_current_provider(self) -> bool:
         """Test connection to the current provider."""
-        if not self._current_provider:
+        provider = self.provider
+        if not provider:
             return False
         
-        return self._current_provider.test_connection()
+        return provider.test_connection()
 
     def get_available_providers(self) -> List[str]:
         """Get list of all available provider types."""
@@ -0,0 +1,198 @@
+"""
+Full-text search over saved chats.
+
+Messages are tokenized into a persistent inverted index (term -> message
+postings) stored in SQLite next to the chats. The index is updated
+incrementally from ChatManager.save_chat, so a search never opens chat files;
+hits are ranked with BM25 and returned with a snippet of the matching message.
+"""
+
+import os
+import re
+import math
+import sqlite3
+import hashlib
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Tuple
+
+INDEX_FILENAME = 'search_index.db'
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_RADIUS = 60
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indexed_chats (
+    chat_name TEXT PRIMARY KEY,
+    message_count INTEGER NOT NULL,
+    last_digest TEXT
+);
+CREATE TABLE IF NOT EXISTS documents (
+    chat_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (chat_name, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    chat_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, chat_name, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_chat ON postings (chat_name);
+"""
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _digest(message: Dict[str, Any]) -> str:
+    data = f"{message.get('role', '')}\0{message.get('content', '')}".encode('utf-8')
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def make_snippet(content: str, terms: Iterable[str], radius: int = SNIPPET_RADIUS) -> str:
+    """Cut a window of content around the first occurrence of any term."""
+    lowered = content.lower()
+    starts = [m.start() for m in (re.search(r'\b' + re.escape(term), lowered) for term in terms) if m]
+    center = min(starts) if starts else 0
+    start = max(0, center - radius)
+    end = min(len(content), center + radius)
+    snippet = ' '.join(content[start:end].split())
+    if start > 0:
+        snippet = '...' + snippet
+    if end < len(content):
+        snippet = snippet + '...'
+    return snippet
+
+
+class ChatSearchIndex:
+    """Persistent inverted index over the messages of all saved chats."""
+
+    def __init__(self, chats_dir: str = 'chats', index_path: str = None):
+        if not os.path.exists(chats_dir):
+            os.makedirs(chats_dir)
+        self.index_path = index_path or os.path.join(chats_dir, INDEX_FILENAME)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def update_chat(self, chat_name: str, history: List[Dict[str, Any]]):
+        """Index the messages of a chat that are not indexed yet."""
+        with self._lock, self._conn:
+            self._update_chat_rows(chat_name, history)
+
+    def update_chats(self, chats: Iterable[Tuple[str, List[Dict[str, Any]]]]):
+        """Index several (chat_name, history) pairs in a single transaction."""
+        with self._lock, self._conn:
+            for chat_name, history in chats:
+                self._update_chat_rows(chat_name, history)
+
+    def _update_chat_rows(self, chat_name, history):
+        row = self._conn.execute(
+            "SELECT message_count, last_digest FROM indexed_chats WHERE chat_name = ?",
+            (chat_name,)).fetchone()
+        indexed = row[0] if row else 0
+        if indexed and (indexed > len(history) or _digest(history[indexed - 1]) != row[1]):
+            # History was reset or rewritten: reindex the whole chat
+            self._delete_chat_rows(chat_name)
+            indexed = 0
+
+        documents = []
+        postings = []
+        for position in range(indexed, len(history)):
+            message = history[position]
+            role = message.get('role', '')
+            content = message.get('content') or ''
+            if role == 'system' or not content:
+                continue
+            terms = Counter(tokenize(content))
+            documents.append((chat_name, position, role, content, sum(terms.values())))
+            postings.extend((term, chat_name, position, tf) for term, tf in terms.items())
+
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO documents (chat_name, position, role, content, length) "
+            "VALUES (?, ?, ?, ?, ?)", documents)
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO postings (term, chat_name, position, tf) VALUES (?, ?, ?, ?)",
+            postings)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO indexed_chats (chat_name, message_count, last_digest) VALUES (?, ?, ?)",
+            (chat_name, len(history), _digest(history[-1]) if history else None))
+
+    def remove_chat(self, chat_name: str):
+        """Drop a chat from the index."""
+        with self._lock, self._conn:
+            self._delete_chat_rows(chat_name)
+            self._conn.execute("DELETE FROM indexed_chats WHERE chat_name = ?", (chat_name,))
+
+    def _delete_chat_rows(self, chat_name):
+        self._conn.execute("DELETE FROM postings WHERE chat_name = ?", (chat_name,))
+        self._conn.execute("DELETE FROM documents WHERE chat_name = ?", (chat_name,))
+
+    def indexed_chats(self) -> List[str]:
+        """Names of all chats present in the index."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT chat_name FROM indexed_chats")]
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Find the messages that best match the query terms.
+
+        Returns:
+            Hits ordered by BM25 score, each with chat_name, position, role, score and snippet
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            doc_count, total_length = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents").fetchone()
+            if not doc_count:
+                return []
+            avg_length = total_length / doc_count
+
+            scores = Counter()
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.chat_name, p.position, p.tf, d.length FROM postings p "
+                    "JOIN documents d ON d.chat_name = p.chat_name AND d.position = p.position "
+                    "WHERE p.term = ?", (term,)).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (doc_count - len(rows) + 0.5) / (len(rows) + 0.5))
+                for chat_name, position, tf, length in rows:
+                    norm = tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+                    scores[(chat_name, position)] += idf * norm
+
+            hits = []
+            for (chat_name, position), score in scores.most_common(limit):
+                role, content = self._conn.execute(
+                    "SELECT role, content FROM documents WHERE chat_name = ? AND position = ?",
+                    (chat_name, position)).fetchone()
+                hits.append({
+                    'chat_name': chat_name,
+                    'position': position,
+                    'role': role,
+                    'score': score,
+                    'snippet': make_snippet(content, terms),
+                })
+        return hits
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
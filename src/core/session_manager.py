@@ -0,0 +1,242 @@
+"""
+In-memory cache of chat histories for processes that juggle several chats.
+
+SessionManager keeps recently used histories (as ConversationHistory) in an
+LRU up to a byte and message budget, so switching back to a chat is a
+dictionary lookup instead of a load from storage. When the budget is
+exceeded the least recently used chats are dropped, after writing any
+unsaved changes to storage; the most recently used chat is never evicted.
+Sizes are estimated with sys.getsizeof and kept up to date incrementally
+as messages are appended.
+
+Configure the budget with `session_cache_mb` and `session_cache_messages`
+at the top level of config.json.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+from .history import ConversationHistory
+from .message import Message
+
+DEFAULT_MAX_MB = 64
+DEFAULT_MAX_MESSAGES = 100000
+# List slot plus rolling-hash entry per message in a ConversationHistory
+PER_MESSAGE_OVERHEAD = 8 + 8 + 32
+
+
+def message_bytes(message: Dict[str, Any]) -> int:
+    """Estimated memory of one message and its values."""
+    if isinstance(message, Message) or hasattr(message, 'token_count'):
+        # Roles and models are interned, so they are shared rather than held per message
+        size = sys.getsizeof(message) + sum(sys.getsizeof(value) for value in
+                                            (message.content, message.timestamp, message.token_count)
+                                            if value is not None)
+        if message.extra:
+            size += sys.getsizeof(message.extra) + sum(sys.getsizeof(value) for value in message.extra.values())
+        return size + PER_MESSAGE_OVERHEAD
+    return sys.getsizeof(message) + sum(sys.getsizeof(value) for value in message.values()) + PER_MESSAGE_OVERHEAD
+
+
+class _Session:
+    """A cached history, its size and the state last written to storage."""
+
+    __slots__ = ('history', 'bytes', 'counted', 'counted_fingerprint', 'saved', 'last_used')
+
+    def __init__(self, history: ConversationHistory, saved: bool):
+        self.history = history
+        self.bytes = 0
+        self.counted = 0
+        self.counted_fingerprint = history.fingerprint(0)
+        # (length, fingerprint) of the version in storage; a new empty chat has nothing to save
+        self.saved = self.state() if saved else (0, history.fingerprint(0))
+        self.last_used = time.time()
+
+    def state(self):
+        return len(self.history), self.history.fingerprint()
+
+    @property
+    def dirty(self) -> bool:
+        return self.state() != self.saved
+
+    def recount(self) -> int:
+        """Bring the size estimate up to date; returns the change in bytes."""
+        history = self.history
+        before = self.bytes
+        if self.counted <= len(history) and history.fingerprint(self.counted) == self.counted_fingerprint:
+            # Only appended since the last count
+            self.bytes += sum(message_bytes(msg) for msg in history[self.counted:])
+        else:
+            self.bytes = sum(message_bytes(msg) for msg in history)
+        self.counted = len(history)
+        self.counted_fingerprint = history.fingerprint()
+        return self.bytes - before
+
+
+class SessionManager:
+    """LRU of chat histories in front of a ChatManager."""
+
+    def __init__(self, chat_manager, max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+                 max_messages: int = DEFAULT_MAX_MESSAGES):
+        """
+        Args:
+            chat_manager: ChatManager used to load, save and evict chats
+            max_bytes: Estimated memory the cached histories may use
+            max_messages: Messages the cached histories may hold
+        """
+        self.chat_manager = chat_manager
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self._sessions: 'OrderedDict[str, _Session]' = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'writebacks': 0}
+
+    @classmethod
+    def from_config(cls, chat_manager, config_manager) -> 'SessionManager':
+        """Build a session manager with the budget from config.json."""
+        return cls(chat_manager,
+                   int(config_manager.get('session_cache_mb', DEFAULT_MAX_MB) * 1024 * 1024),
+                   int(config_manager.get('session_cache_messages', DEFAULT_MAX_MESSAGES)))
+
+    def _touch(self, name: str, session: _Session):
+        self._sessions.move_to_end(name)
+        session.last_used = time.time()
+
+    def _add(self, name: str, session: _Session):
+        old = self._sessions.pop(name, None)
+        if old is not None:
+            self._bytes -= old.bytes
+        self._sessions[name] = session
+        self._bytes += session.recount()
+
+    def _write(self, name: str, session: _Session):
+        self.chat_manager.save_chat(name, session.history)
+        session.saved = session.state()
+
+    def _enforce_budget(self):
+        """Evict least recently used chats (all but the newest) until the budget holds."""
+        for session in self._sessions.values():
+            self._bytes += session.recount()
+        messages = sum(len(session.history) for session in self._sessions.values())
+        while len(self._sessions) > 1 and (self._bytes > self.max_bytes or messages > self.max_messages):
+            name, session = self._sessions.popitem(last=False)
+            if session.dirty:
+                self._write(name, session)
+                self._stats['writebacks'] += 1
+            self._bytes -= session.bytes
+            messages -= len(session.history)
+            self._stats['evictions'] += 1
+
+    def get(self, name: str) -> Optional[ConversationHistory]:
+        """
+        The history of a chat, from memory or else from storage.
+
+        Returns:
+            The cached ConversationHistory (edit it in place), or None if the chat doesn't exist
+        """
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is not None:
+                self._stats['hits'] += 1
+                self._touch(name, session)
+                return session.history
+            self._stats['misses'] += 1
+            messages = self.chat_manager.load_chat(name)
+            if messages is None:
+                return None
+            history = messages if isinstance(messages, ConversationHistory) else ConversationHistory(messages)
+            self._add(name, _Session(history, saved=True))
+            self._enforce_budget()
+            return history
+
+    def put(self, name: str, history: List[Dict[str, Any]], saved: bool = False) -> ConversationHistory:
+        """
+        Make `history` the cached history of a chat.
+
+        Args:
+            name: Chat name
+            history: Its messages (wrapped in a ConversationHistory if needed)
+            saved: Whether storage already holds exactly these messages
+
+        Returns:
+            The cached ConversationHistory
+        """
+        if not isinstance(history, ConversationHistory):
+            history = ConversationHistory(history)
+        with self._lock:
+            session = self._sessions.get(name)
+            if session is not None and session.history is history:
+                if saved:
+                    session.saved = session.state()
+                self._touch(name, session)
+                return history
+            replacement = _Session(history, saved)
+            if session is not None and not saved:
+                # What storage holds hasn't changed
+                replacement.saved = session.saved
+            self._add(name, replacement)
+            self._enforce_budget()
+            return history
+
+    def save(self, name: str, history: Optional[List[Dict[str, Any]]] = None):
+        """Write a chat to storage (caching `history` for it first, if given)."""
+        with self._lock:
+            if history is not None:
+                self.put(name, history)
+            session = self._sessions.get(name)
+            if session is None:
+                return
+            self._write(name, session)
+            self._touch(name, session)
+            self._enforce_budget()
+
+    def rename(self, old_name: str, new_name: str):
+        """Cache a chat's history under a new name (storage is not touched)."""
+        with self._lock:
+            session = self._sessions.pop(old_name, None)
+            if session is not None:
+                self._bytes -= session.bytes
+                # Nothing is stored under the new name yet
+                session.saved = (0, session.history.fingerprint(0))
+                self._add(new_name, session)
+
+    def discard(self, name: str):
+        """Drop a chat from the cache without saving it."""
+        with self._lock:
+            session = self._sessions.pop(name, None)
+            if session is not None:
+                self._bytes -= session.bytes
+
+    def flush(self):
+        """Write every chat with unsaved changes to storage."""
+        with self._lock:
+            for name, session in self._sessions.items():
+                if session.dirty:
+                    self._write(name, session)
+                    self._stats['writebacks'] += 1
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._sessions
+
+    def sessions(self) -> List[Dict[str, Any]]:
+        """Cached chats, most recently used first, with their size and whether they have unsaved changes."""
+        with self._lock:
+            result = []
+            for name, session in reversed(self._sessions.items()):
+                self._bytes += session.recount()
+                result.append({'name': name, 'messages': len(session.history), 'bytes': session.bytes,
+                               'dirty': session.dirty, 'last_used': session.last_used})
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache totals against the budget, plus hits, misses, evictions and write-backs."""
+        with self._lock:
+            for session in self._sessions.values():
+                self._bytes += session.recount()
+            return dict(self._stats, sessions=len(self._sessions), bytes=self._bytes, max_bytes=self.max_bytes,
+                        messages=sum(len(session.history) for session in self._sessions.values()),
+                        max_messages=self.max_messages)
@@ -0,0 +1,41 @@
+"""
+Chat storage engines for RetroChat.
+
+ChatManager delegates persistence to one of these engines, selected by the
+`chat_format` configuration value. Whole-file JSON (`chats/<name>.json`) is
+the default; the journal and SQLite engines are opt-in.
+"""
+
+from .base_storage import BaseChatStorage
+from .json_storage import JsonChatStorage
+from .jsonl_storage import JsonlChatStorage
+from .sqlite_storage import SqliteChatStorage
+from .partial_replies import PartialReplyStore
+
+DEFAULT_CHAT_FORMAT = 'json'
+
+STORAGE_ENGINES = {
+    'json': JsonChatStorage,
+    'jsonl': JsonlChatStorage,
+    'sqlite': SqliteChatStorage,
+}
+
+
+def create_chat_storage(storage_format, chats_dir):
+    """Create the storage engine registered under storage_format."""
+    engine = STORAGE_ENGINES.get(storage_format)
+    if engine is None:
+        raise ValueError(f"Unknown chat storage format: {storage_format}")
+    return engine(chats_dir)
+
+
+__all__ = [
+    'BaseChatStorage',
+    'JsonChatStorage',
+    'JsonlChatStorage',
+    'SqliteChatStorage',
+    'PartialReplyStore',
+    'STORAGE_ENGINES',
+    'DEFAULT_CHAT_FORMAT',
+    'create_chat_storage'
+]
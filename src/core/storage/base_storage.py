@@ -0,0 +1,82 @@
+"""
+Base interface for chat storage engines.
+"""
+
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional
+
+CHAT_ID_PATTERN = re.compile(r'^chat_(\d+)$')
+
+
+class BaseChatStorage(ABC):
+    """Abstract base class for chat storage engines."""
+
+    def __init__(self, chats_dir: str):
+        self.chats_dir = chats_dir
+        if not os.path.exists(self.chats_dir):
+            os.makedirs(self.chats_dir)
+
+    @abstractmethod
+    def save_chat(self, chat_name: str, history: List[Dict[str, Any]]):
+        """
+        Persist a chat's full history.
+
+        Args:
+            chat_name: Name of the chat
+            history: Conversation history as list of message dictionaries
+        """
+        pass
+
+    @abstractmethod
+    def load_chat(self, chat_name: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Load a chat's history.
+
+        Returns:
+            The history, or None if the chat does not exist
+        """
+        pass
+
+    @abstractmethod
+    def delete_chat(self, chat_name: str) -> bool:
+        """
+        Delete a chat.
+
+        Returns:
+            True if the chat existed and was deleted
+        """
+        pass
+
+    @abstractmethod
+    def list_chats(self) -> List[str]:
+        """
+        List chat names, most recently updated first.
+        """
+        pass
+
+    def most_recent_chat(self) -> Optional[str]:
+        """Get the most recently updated chat name, if any."""
+        chats = self.list_chats()
+        return chats[0] if chats else None
+
+    def _chat_names(self) -> List[str]:
+        """Chat names in any order; engines override this when ordering is costly."""
+        return self.list_chats()
+
+    def generate_chat_id(self) -> str:
+        """Generate an unused chat_<n> name."""
+        existing = set()
+        for name in self._chat_names():
+            m = CHAT_ID_PATTERN.match(name)
+            if m:
+                existing.add(int(m.group(1)))
+        n = 1
+        while n in existing:
+            n += 1
+        return f'chat_{n}'
+
+    def close(self):
+        """Release any resources held by the engine."""
+        pass
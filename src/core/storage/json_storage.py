@@ -0,0 +1,66 @@
+"""
+Whole-file JSON chat storage (one `<name>.json` file per chat).
+"""
+
+import os
+import json
+import threading
+from typing import List, Dict, Any, Optional
+
+from src.utils.file_utils import atomic_write_text
+from .base_storage import BaseChatStorage
+from ..message import Message, message_to_json
+
+CHAT_FILE_EXTENSIONS = ('.json', '.jsonl')
+
+
+class JsonChatStorage(BaseChatStorage):
+    """Stores each chat as a single indented JSON document."""
+
+    def __init__(self, chats_dir: str):
+        super().__init__(chats_dir)
+        self._lock = threading.RLock()
+
+    def _json_path(self, chat_name: str) -> str:
+        return os.path.join(self.chats_dir, f"{chat_name}.json")
+
+    def _journal_path(self, chat_name: str) -> str:
+        return os.path.join(self.chats_dir, f"{chat_name}.jsonl")
+
+    def save_chat(self, chat_name: str, history: List[Dict[str, Any]]):
+        with self._lock:
+            atomic_write_text(self._json_path(chat_name), json.dumps(history, indent=2, default=message_to_json))
+            if os.path.exists(self._journal_path(chat_name)):
+                # A stale journal would shadow the JSON file on the next load
+                os.remove(self._journal_path(chat_name))
+
+    def load_chat(self, chat_name: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._json_path(chat_name), 'r') as f:
+                return [Message.from_dict(message) for message in json.load(f)]
+        except FileNotFoundError:
+            return None
+
+    def delete_chat(self, chat_name: str) -> bool:
+        deleted = False
+        with self._lock:
+            for path in (self._journal_path(chat_name), self._json_path(chat_name)):
+                try:
+                    os.remove(path)
+                    deleted = True
+                except FileNotFoundError:
+                    pass
+        return deleted
+
+    def _chat_names(self) -> List[str]:
+        return list({os.path.splitext(f)[0] for f in os.listdir(self.chats_dir)
+                     if os.path.splitext(f)[1] in CHAT_FILE_EXTENSIONS})
+
+    def list_chats(self) -> List[str]:
+        mtimes = {}
+        for f in os.listdir(self.chats_dir):
+            name, ext = os.path.splitext(f)
+            if ext in CHAT_FILE_EXTENSIONS:
+                mtime = os.path.getmtime(os.path.join(self.chats_dir, f))
+                mtimes[name] = max(mtime, mtimes.get(name, mtime))
+        return sorted(mtimes, key=mtimes.get, reverse=True)
@@ -0,0 +1,150 @@
+"""
+Append-only JSONL journal chat storage (one `<name>.jsonl` file per chat).
+
+Each line is one message. Saving a turn only appends the messages that are not
+yet in the journal; a reset or rewrite appends a rewind record instead of
+rewriting the file. Journals are replayed on load and compacted in the
+background once they hold more dead records than live messages. Legacy
+`<name>.json` chats are still read and are converted on their next save:
+the journal gets the full history and the `.json` file is removed only once
+a compaction has rewritten the journal successfully.
+"""
+
+import os
+import json
+import threading
+from typing import List, Dict, Any, Optional
+
+from src.utils.file_utils import atomic_write_text
+from .json_storage import JsonChatStorage
+from ..message import Message, message_to_json
+
+# Journal control record marking that the history was rewound to `length` messages
+JOURNAL_OP_KEY = '__journal__'
+# Compact once the journal holds this many dead records and more dead than live ones
+COMPACT_MIN_DEAD_RECORDS = 64
+
+
+class JsonlChatStorage(JsonChatStorage):
+    """Stores each chat as an append-only journal of messages."""
+
+    def __init__(self, chats_dir: str):
+        super().__init__(chats_dir)
+        # chat_name -> (persisted message count, last persisted message, journal record count)
+        self._journal_state = {}
+        self._compacting = set()
+
+    def save_chat(self, chat_name: str, history: List[Dict[str, Any]]):
+        """Append only the messages that are not yet in the chat's journal."""
+        with self._lock:
+            state = self._journal_state.get(chat_name)
+            if state is None:
+                state = self._load_journal_state(chat_name)
+            persisted, last, records = state
+
+            if persisted <= len(history) and (persisted == 0 or history[persisted - 1] == last):
+                lines = history[persisted:]
+            else:
+                # History was reset or rewritten: rewind the journal instead of rewriting it
+                lines = [{JOURNAL_OP_KEY: 'truncate', 'length': 0}] + list(history)
+
+            if lines:
+                with open(self._journal_path(chat_name), 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(line, default=message_to_json) + '\n' for line in lines))
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._remember_journal_state(chat_name, history, records + len(lines))
+
+            if os.path.exists(self._json_path(chat_name)) or self._needs_compaction(chat_name):
+                # A converted chat keeps its legacy copy until the compacted journal is in place
+                self._schedule_compaction(chat_name)
+
+    def load_chat(self, chat_name: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            if os.path.exists(self._journal_path(chat_name)):
+                history, records, torn = self._replay_journal(chat_name)
+                self._remember_journal_state(chat_name, history, records)
+                if torn:
+                    # Repair before anything is appended after the partial line
+                    self._compact(chat_name)
+                elif self._needs_compaction(chat_name):
+                    self._schedule_compaction(chat_name)
+                return history
+        return super().load_chat(chat_name)
+
+    def delete_chat(self, chat_name: str) -> bool:
+        with self._lock:
+            self._journal_state.pop(chat_name, None)
+            return super().delete_chat(chat_name)
+
+    def compact_chat(self, chat_name: str):
+        """Compact a chat's journal synchronously."""
+        self._compact(chat_name)
+
+    def _load_journal_state(self, chat_name):
+        if not os.path.exists(self._journal_path(chat_name)):
+            # A legacy .json chat (or a new chat) gets a fresh journal on first save
+            return (0, None, 0)
+        history, records, torn = self._replay_journal(chat_name)
+        if torn:
+            self._compact(chat_name)
+            records = len(history)
+        return (len(history), history[-1] if history else None, records)
+
+    def _remember_journal_state(self, chat_name, history, records):
+        self._journal_state[chat_name] = (len(history), history[-1] if history else None, records)
+
+    def _replay_journal(self, chat_name):
+        """Rebuild a history from its journal. Returns (history, record count, torn tail)."""
+        history = []
+        records = 0
+        torn = False
+        with open(self._journal_path(chat_name), 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves a partial last line; everything before it is intact
+                    torn = True
+                    continue
+                records += 1
+                if isinstance(record, dict) and JOURNAL_OP_KEY in record:
+                    if record[JOURNAL_OP_KEY] == 'truncate':
+                        del history[record.get('length', 0):]
+                else:
+                    history.append(Message.from_dict(record))
+        return history, records, torn
+
+    def _needs_compaction(self, chat_name):
+        persisted, _, records = self._journal_state.get(chat_name, (0, None, 0))
+        dead = records - persisted
+        return dead >= COMPACT_MIN_DEAD_RECORDS and dead > persisted
+
+    def _schedule_compaction(self, chat_name):
+        if chat_name in self._compacting:
+            return
+        self._compacting.add(chat_name)
+        thread = threading.Thread(target=self._compact, args=(chat_name,),
+                                  name=f"compact-{chat_name}", daemon=True)
+        thread.start()
+
+    def _compact(self, chat_name):
+        """Rewrite a journal so it only holds the live messages."""
+        try:
+            with self._lock:
+                if not os.path.exists(self._journal_path(chat_name)):
+                    return
+                history, _, _ = self._replay_journal(chat_name)
+                atomic_write_text(self._journal_path(chat_name),
+                                  ''.join(json.dumps(message, default=message_to_json) + '\n'
+                                          for message in history))
+                self._remember_journal_state(chat_name, history, len(history))
+                legacy_path = self._json_path(chat_name)
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+        except OSError as e:
+            print(f"Error compacting chat {chat_name}: {e}")
+        finally:
+            self._compacting.discard(chat_name)
@@ -0,0 +1,139 @@
+"""
+Crash-safe checkpoints of replies that are still streaming.
+
+While a reply streams, its text is appended to `<chat>.partial` in the chats
+directory (one JSON record per line: a start record with the request, text
+records for each checkpoint, and an end record once the reply is complete).
+The file is removed when the chat is saved with the finished reply, so a
+`.partial` file without an end record on startup is an interrupted reply.
+"""
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+PARTIAL_EXTENSION = '.partial'
+
+
+class PartialReplyStore:
+    """Append-only partial reply files, one per chat."""
+
+    def __init__(self, chats_dir: str):
+        self.chats_dir = chats_dir
+        self._files = {}
+        self._lock = threading.RLock()
+
+    def _path(self, chat_name: str) -> str:
+        return os.path.join(self.chats_dir, f"{chat_name}{PARTIAL_EXTENSION}")
+
+    def _write(self, chat_name: str, record: Dict[str, Any]):
+        f = self._files.get(chat_name)
+        if f is None:
+            return
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+
+    def begin(self, chat_name: str, request: Dict[str, Any], prefix: str = ''):
+        """Start a new partial reply for a chat, replacing any previous one."""
+        with self._lock:
+            self._close(chat_name)
+            os.makedirs(self.chats_dir, exist_ok=True)
+            self._files[chat_name] = open(self._path(chat_name), 'w', encoding='utf-8')
+            self._write(chat_name, {
+                'type': 'start',
+                'message': request.get('message'),
+                'provider': request.get('provider'),
+                'model': request.get('model'),
+                'started': datetime.now().isoformat(timespec='seconds'),
+            })
+            if prefix:
+                self._write(chat_name, {'type': 'text', 'text': prefix})
+
+    def append(self, chat_name: str, text: str):
+        """Checkpoint more reply text (flushed and fsynced)."""
+        if text:
+            with self._lock:
+                self._write(chat_name, {'type': 'text', 'text': text})
+
+    def end(self, chat_name: str, complete: bool = True):
+        """Close a partial reply, marking it complete unless it was interrupted."""
+        with self._lock:
+            if complete:
+                self._write(chat_name, {'type': 'end'})
+            self._close(chat_name)
+
+    def _close(self, chat_name: str):
+        f = self._files.pop(chat_name, None)
+        if f is not None:
+            f.close()
+
+    def load(self, chat_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Read a partial reply.
+
+        Returns:
+            Dictionary with chat_name, message, provider, model, started, text
+            and complete, or None if the chat has no partial reply
+        """
+        try:
+            with open(self._path(chat_name), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+
+        reply = None
+        texts = []
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line from a crash mid-write
+                break
+            if record.get('type') == 'start':
+                reply = {key: record.get(key) for key in ('message', 'provider', 'model', 'started')}
+                reply.update({'chat_name': chat_name, 'complete': False})
+            elif record.get('type') == 'text':
+                texts.append(record.get('text', ''))
+            elif record.get('type') == 'end' and reply is not None:
+                reply['complete'] = True
+        if reply is None:
+            return None
+        reply['text'] = ''.join(texts)
+        return reply
+
+    def discard(self, chat_name: str):
+        """Remove a chat's partial reply."""
+        with self._lock:
+            self._close(chat_name)
+            try:
+                os.remove(self._path(chat_name))
+            except FileNotFoundError:
+                pass
+
+    def discard_if_complete(self, chat_name: str):
+        """Remove a chat's partial reply once it has been finished and saved."""
+        with self._lock:
+            if chat_name in self._files:
+                # A newer reply is streaming into the file
+                return
+            reply = self.load(chat_name)
+            if reply is not None and reply['complete']:
+                self.discard(chat_name)
+
+    def interrupted(self) -> List[Dict[str, Any]]:
+        """Partial replies that never finished, oldest first."""
+        if not os.path.isdir(self.chats_dir):
+            return []
+        replies = []
+        for filename in os.listdir(self.chats_dir):
+            if filename.endswith(PARTIAL_EXTENSION):
+                chat_name = filename[:-len(PARTIAL_EXTENSION)]
+                if chat_name in self._files:
+                    continue
+                reply = self.load(chat_name)
+                if reply is not None and not reply['complete']:
+                    replies.append(reply)
+        return sorted(replies, key=lambda reply: reply['started'] or '')
@@ -0,0 +1,159 @@
+"""
+SQLite chat storage (a single `chats.db` database in the chats directory).
+
+Chats and messages live in separate tables. Listing is served by an index on
+`chats.updated_at`, saving a turn only inserts the new message rows, and chat
+ids are allocated from a counter row instead of scanning existing names.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Any, Optional
+
+from .base_storage import BaseChatStorage, CHAT_ID_PATTERN
+from ..message import Message, message_to_dict
+
+DATABASE_FILENAME = 'chats.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    name TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_chats_updated_at ON chats (updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    chat_name TEXT NOT NULL REFERENCES chats (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT,
+    extra TEXT,
+    PRIMARY KEY (chat_name, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def _message_to_row(chat_name, position, message):
+    message = message_to_dict(message)
+    extra = {k: v for k, v in message.items() if k not in ('role', 'content')}
+    return (chat_name, position, message.get('role', ''), message.get('content'),
+            json.dumps(extra) if extra else None)
+
+
+def _row_to_message(role, content, extra):
+    message = {"role": role, "content": content}
+    if extra:
+        message.update(json.loads(extra))
+    return Message.from_dict(message)
+
+
+class SqliteChatStorage(BaseChatStorage):
+    """Stores chats in an indexed SQLite database."""
+
+    def __init__(self, chats_dir: str, db_path: Optional[str] = None):
+        super().__init__(chats_dir)
+        self.db_path = db_path or os.path.join(chats_dir, DATABASE_FILENAME)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def save_chat(self, chat_name: str, history: List[Dict[str, Any]]):
+        with self._lock, self._conn:
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT message_count FROM chats WHERE name = ?", (chat_name,)).fetchone()
+            if row is None:
+                self._conn.execute(
+                    "INSERT INTO chats (name, created_at, updated_at, message_count) VALUES (?, ?, ?, 0)",
+                    (chat_name, now, now))
+                persisted = 0
+            else:
+                persisted = row[0]
+
+            if persisted and (persisted > len(history) or not self._matches(chat_name, persisted, history)):
+                # History was reset or rewritten: replace every row
+                self._conn.execute("DELETE FROM messages WHERE chat_name = ?", (chat_name,))
+                persisted = 0
+
+            self._conn.executemany(
+                "INSERT INTO messages (chat_name, position, role, content, extra) VALUES (?, ?, ?, ?, ?)",
+                [_message_to_row(chat_name, i, history[i]) for i in range(persisted, len(history))])
+            self._conn.execute(
+                "UPDATE chats SET updated_at = ?, message_count = ? WHERE name = ?",
+                (now, len(history), chat_name))
+            self._bump_counter(chat_name)
+
+    def import_chat(self, chat_name: str, history: List[Dict[str, Any]], updated_at: float):
+        """Store a chat and keep its original modification time for listing order."""
+        self.save_chat(chat_name, history)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE chats SET created_at = MIN(created_at, ?), updated_at = ? WHERE name = ?",
+                (updated_at, updated_at, chat_name))
+
+    def _matches(self, chat_name, persisted, history):
+        """Check that the last stored message still matches the in-memory history."""
+        row = self._conn.execute(
+            "SELECT role, content, extra FROM messages WHERE chat_name = ? AND position = ?",
+            (chat_name, persisted - 1)).fetchone()
+        return row is not None and _row_to_message(*row) == history[persisted - 1]
+
+    def load_chat(self, chat_name: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM chats WHERE name = ?", (chat_name,)).fetchone() is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT role, content, extra FROM messages WHERE chat_name = ? ORDER BY position",
+                (chat_name,)).fetchall()
+        return [_row_to_message(*row) for row in rows]
+
+    def delete_chat(self, chat_name: str) -> bool:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE chat_name = ?", (chat_name,))
+            cursor = self._conn.execute("DELETE FROM chats WHERE name = ?", (chat_name,))
+            return cursor.rowcount > 0
+
+    def list_chats(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM chats ORDER BY updated_at DESC").fetchall()
+        return [row[0] for row in rows]
+
+    def most_recent_chat(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name FROM chats ORDER BY updated_at DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def generate_chat_id(self) -> str:
+        """Allocate the next chat_<n> name from the id counter (bumped when chats are saved)."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM counters WHERE name = 'chat_id'").fetchone()
+            n = (row[0] if row else 0) + 1
+            while self._conn.execute("SELECT 1 FROM chats WHERE name = ?", (f'chat_{n}',)).fetchone():
+                n += 1
+        return f'chat_{n}'
+
+    def _bump_counter(self, chat_name):
+        """Keep the id counter ahead of explicitly saved chat_<n> names."""
+        m = CHAT_ID_PATTERN.match(chat_name)
+        if m:
+            self._conn.execute(
+                "INSERT INTO counters (name, value) VALUES ('chat_id', ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)",
+                (int(m.group(1)),))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,235 @@
+"""
+Composable response pipeline.
+
+A provider yields response chunks; the pipeline hands each chunk to its
+registered stages (terminal rendering, accumulation, persistence, metrics).
+Stages only implement the hooks they need, and the hot loop only calls the
+stages that override on_chunk, so a headless run without rendering does no
+terminal work at all.
+"""
+
+import time
+from typing import List, Dict, Any, Optional, Iterable, AsyncIterable
+
+from src.utils.stream_renderer import StreamRenderer
+
+# Seconds between checkpoints of a streaming reply
+CHECKPOINT_INTERVAL = 1.0
+
+
+class StreamStage:
+    """
+    Base class for pipeline stages. All hooks are optional.
+
+    on_start is called before the first chunk of every response and should
+    reset any per-response state, so one stage instance can be reused.
+    """
+
+    def on_start(self, request: Dict[str, Any]):
+        """Called before the first chunk with the request details (message, provider, model, stream, context)."""
+        pass
+
+    def on_chunk(self, chunk: str):
+        """Called for every chunk of the response."""
+        pass
+
+    def on_end(self, response: str):
+        """Called with the full response after the last chunk."""
+        pass
+
+    def on_error(self, error: Exception):
+        """Called instead of on_end when the provider fails mid-response."""
+        pass
+
+
+class RenderStage(StreamStage):
+    """Writes the response to the terminal through a StreamRenderer."""
+
+    def __init__(self, stream=None, color=None):
+        self.stream = stream
+        self.color = color
+        self.renderer = None
+
+    def on_start(self, request: Dict[str, Any]):
+        self.renderer = StreamRenderer(self.stream, self.color)
+
+    def on_chunk(self, chunk: str):
+        self.renderer.write(chunk)
+
+    def on_end(self, response: str):
+        self.renderer.finish()
+
+    def on_error(self, error: Exception):
+        self.renderer.finish()
+
+
+class AccumulateStage(StreamStage):
+    """Collects chunks in a list and joins them once."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+
+    def on_start(self, request: Dict[str, Any]):
+        self.chunks = []
+
+    def on_chunk(self, chunk: str):
+        self.chunks.append(chunk)
+
+    @property
+    def text(self) -> str:
+        """The response received so far."""
+        return ''.join(self.chunks)
+
+
+class MetricsStage(StreamStage):
+    """Measures time to first chunk, total duration and chunk/character counts."""
+
+    def __init__(self):
+        self.metrics: Dict[str, Any] = {}
+        self._started = 0.0
+
+    def on_start(self, request: Dict[str, Any]):
+        self._started = time.perf_counter()
+        self.metrics = {'provider': request.get('provider'), 'model': request.get('model'),
+                        'ttft': None, 'duration': None, 'chunks': 0, 'chars': 0, 'error': None}
+
+    def on_chunk(self, chunk: str):
+        metrics = self.metrics
+        if metrics['ttft'] is None:
+            metrics['ttft'] = time.perf_counter() - self._started
+        metrics['chunks'] += 1
+        metrics['chars'] += len(chunk)
+
+    def on_end(self, response: str):
+        self.metrics['duration'] = time.perf_counter() - self._started
+
+    def on_error(self, error: Exception):
+        self.metrics['duration'] = time.perf_counter() - self._started
+        self.metrics['error'] = str(error)
+
+
+class PersistStage(StreamStage):
+    """
+    Checkpoints the reply to the chat's partial reply file.
+
+    Chunks are buffered and written (with fsync) at most once per interval,
+    so a crash loses at most one interval of text.
+    """
+
+    def __init__(self, chat_manager, chat_name, interval: float = CHECKPOINT_INTERVAL):
+        """
+        Args:
+            chat_manager: ChatManager that owns the partial reply files
+            chat_name: Chat name, or a callable returning the current chat name
+            interval: Minimum seconds between checkpoints
+        """
+        self.chat_manager = chat_manager
+        self.chat_name = chat_name
+        self.interval = interval
+        self._chat = None
+        self._pending: List[str] = []
+        self._last_checkpoint = 0.0
+
+    def on_start(self, request: Dict[str, Any]):
+        self._chat = self.chat_name() if callable(self.chat_name) else self.chat_name
+        self._pending = []
+        self._last_checkpoint = time.monotonic()
+        self.chat_manager.begin_partial_reply(self._chat, request, request.get('prefix', ''))
+
+    def on_chunk(self, chunk: str):
+        self._pending.append(chunk)
+        now = time.monotonic()
+        if now - self._last_checkpoint >= self.interval:
+            self._checkpoint(now)
+
+    def _checkpoint(self, now: float):
+        if self._pending:
+            self.chat_manager.append_partial_reply(self._chat, ''.join(self._pending))
+            self._pending = []
+        self._last_checkpoint = now
+
+    def on_end(self, response: str):
+        self._checkpoint(time.monotonic())
+        self.chat_manager.end_partial_reply(self._chat, complete=True)
+
+    def on_error(self, error: BaseException):
+        self._checkpoint(time.monotonic())
+        self.chat_manager.end_partial_reply(self._chat, complete=False)
+
+
+class StreamPipeline:
+    """Runs response chunks through a list of stages."""
+
+    def __init__(self, stages: Optional[List[StreamStage]] = None):
+        """
+        Args:
+            stages: Stages in the order they see each chunk. An AccumulateStage
+                is added when none is given, since the full response is always needed.
+        """
+        self.stages = list(stages or [])
+        self.accumulator = next((stage for stage in self.stages if isinstance(stage, AccumulateStage)), None)
+        if self.accumulator is None:
+            self.accumulator = AccumulateStage()
+            self.stages.append(self.accumulator)
+
+    def add_stage(self, stage: StreamStage):
+        """Append a stage to the pipeline."""
+        self.stages.append(stage)
+
+    def _chunk_handlers(self):
+        """Bound on_chunk methods of the stages that override it."""
+        return [stage.on_chunk for stage in self.stages
+                if type(stage).on_chunk is not StreamStage.on_chunk]
+
+    def _start(self, request: Dict[str, Any]):
+        for stage in self.stages:
+            stage.on_start(request)
+
+    def _end(self) -> str:
+        response = self.accumulator.text
+        for stage in self.stages:
+            stage.on_end(response)
+        return response
+
+    def _fail(self, error: Exception):
+        for stage in self.stages:
+            try:
+                stage.on_error(error)
+            except Exception:
+                pass
+
+    def run(self, chunks: Iterable[str], request: Dict[str, Any]) -> str:
+        """Consume a chunk iterator and return the full response."""
+        self._start(request)
+        handlers = self._chunk_handlers()
+        try:
+            for chunk in chunks:
+                for handler in handlers:
+                    handler(chunk)
+        except BaseException as e:
+            self._fail(e)
+            raise
+        return self._end()
+
+    async def run_async(self, chunks: AsyncIterable[str], request: Dict[str, Any]) -> str:
+        """Consume an async chunk iterator and return the full response."""
+        self._start(request)
+        handlers = self._chunk_handlers()
+        try:
+            async for chunk in chunks:
+                for handler in handlers:
+                    handler(chunk)
+        except BaseException as e:
+            self._fail(e)
+            raise
+        return self._end()
+
+
+def single_chunk(send):
+    """Yield a non-streamed response as one chunk; send is called when iteration starts."""
+    yield send()
+
+
+async def single_chunk_async(awaitable):
+    """Async counterpart of single_chunk."""
+    yield await awaitable
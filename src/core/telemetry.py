@@ -0,0 +1,191 @@
+"""
+Request telemetry.
+
+Every reply sent through Chat is measured by a TelemetryStage in the response
+pipeline (time to first chunk, gaps between chunks, duration) and recorded
+with its token counts, provider and model in a rolling local store
+(`stats/requests.jsonl`). `/stats` summarizes the records per model.
+"""
+
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from typing import List, Dict, Any, Optional, Tuple
+
+from src.utils.file_utils import atomic_write_text
+from .stream_pipeline import MetricsStage
+from .context_window import estimate_tokens
+
+DEFAULT_STATS_PATH = os.path.join('stats', 'requests.jsonl')
+# Records kept in the rolling store
+DEFAULT_MAX_RECORDS = 1000
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100.0 * len(ordered))
+    return ordered[min(max(rank, 1), len(ordered)) - 1]
+
+
+class TelemetryStage(MetricsStage):
+    """MetricsStage that also tracks the gaps between chunks."""
+
+    def on_start(self, request: Dict[str, Any]):
+        super().on_start(request)
+        self._last_chunk = None
+        self._gaps: List[float] = []
+
+    def on_chunk(self, chunk: str):
+        now = time.perf_counter()
+        if self._last_chunk is not None:
+            self._gaps.append(now - self._last_chunk)
+        self._last_chunk = now
+        super().on_chunk(chunk)
+
+    def on_error(self, error: BaseException):
+        super().on_error(error)
+        # KeyboardInterrupt and friends have no message
+        self.metrics['error'] = self.metrics['error'] or type(error).__name__
+
+    def build_record(self, response: str, prompt_tokens: int,
+                     usage: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Build the telemetry record for the finished request.
+
+        Args:
+            response: The full response text
+            prompt_tokens: Estimated prompt tokens, used when the API reported no usage
+            usage: Token usage reported by the provider, if any
+        """
+        metrics = self.metrics
+        usage = usage or {}
+        completion_tokens = usage.get('completion_tokens')
+        estimated = completion_tokens is None
+        if estimated:
+            completion_tokens = estimate_tokens(response)
+        error = metrics['error']
+        if error is None and response.startswith('Error:'):
+            # Providers report request failures as an error reply
+            error = response[len('Error:'):].strip()
+
+        duration = metrics['duration'] or 0.0
+        generation_time = duration - (metrics['ttft'] or 0.0)
+        return {
+            'time': time.time(),
+            'provider': metrics['provider'],
+            'model': metrics['model'],
+            'ttft': metrics['ttft'],
+            'duration': duration,
+            'chunks': metrics['chunks'],
+            'gap_avg': sum(self._gaps) / len(self._gaps) if self._gaps else None,
+            'gap_max': max(self._gaps) if self._gaps else None,
+            'prompt_tokens': usage.get('prompt_tokens', prompt_tokens),
+            'completion_tokens': completion_tokens,
+            'tokens_estimated': estimated,
+            'tokens_per_sec': completion_tokens / generation_time if generation_time > 0 and not error else None,
+            'error': error,
+        }
+
+
+class TelemetryStore:
+    """Rolling store of the most recent request records."""
+
+    def __init__(self, path: str = DEFAULT_STATS_PATH, max_records: int = DEFAULT_MAX_RECORDS):
+        self.path = path
+        self.max_records = max_records
+        self._records = None
+        self._lines_on_disk = 0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Read the stored records on first use."""
+        if self._records is not None:
+            return
+        self._records = deque(maxlen=self.max_records)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._lines_on_disk += 1
+                    try:
+                        self._records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def record(self, record: Dict[str, Any]):
+        """Add a record, appending it to the file and trimming the file when it doubles."""
+        with self._lock:
+            self._load()
+            self._records.append(record)
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if self._lines_on_disk >= 2 * self.max_records:
+                atomic_write_text(self.path, ''.join(json.dumps(r) + '\n' for r in self._records))
+                self._lines_on_disk = len(self._records)
+            else:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record) + '\n')
+                self._lines_on_disk += 1
+
+    def records(self) -> List[Dict[str, Any]]:
+        """All kept records, oldest first."""
+        with self._lock:
+            self._load()
+            return list(self._records)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Per provider/model latency and throughput percentiles.
+
+        Returns:
+            One dict per model with provider, model, requests, errors and
+            ttft/duration/tokens_per_sec mappings of percentile -> value
+        """
+        groups: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for record in self.records():
+            groups.setdefault((record.get('provider'), record.get('model')), []).append(record)
+
+        summary = []
+        for (provider, model), records in sorted(groups.items(), key=lambda item: str(item[0])):
+            ok = [r for r in records if not r.get('error')]
+            entry = {'provider': provider, 'model': model, 'requests': len(records),
+                     'errors': len(records) - len(ok)}
+            for field in ('ttft', 'duration', 'tokens_per_sec'):
+                values = [r[field] for r in ok if r.get(field) is not None]
+                entry[field] = {pct: percentile(values, pct) for pct in PERCENTILES}
+            summary.append(entry)
+        return summary
+
+
+def format_stats(summary: List[Dict[str, Any]]) -> str:
+    """Format a telemetry summary as a table."""
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else '-'
+
+    def rate(value):
+        return f"{value:.1f}" if value is not None else '-'
+
+    def label(entry):
+        # Records made while no provider was set have none
+        return f"{entry.get('provider') or '?'}:{entry.get('model')}"
+
+    width = max([len(label(e)) for e in summary] + [len('Model')])
+    header = (f"{'Model':<{width}}  {'Reqs':>5}  {'Errs':>4}  {'TTFT p50/p95/p99':>22}  "
+              f"{'Duration p50/p95/p99':>22}  {'Tok/s p50/p95/p99':>19}")
+    lines = [header]
+    for e in summary:
+        ttft = '/'.join(seconds(e['ttft'][p]) for p in PERCENTILES)
+        duration = '/'.join(seconds(e['duration'][p]) for p in PERCENTILES)
+        tps = '/'.join(rate(e['tokens_per_sec'][p]) for p in PERCENTILES)
+        lines.append(f"{label(e):<{width}}  {e['requests']:>5}  {e['errors']:>4}  "
+                     f"{ttft:>22}  {duration:>22}  {tps:>19}")
+    return '\n'.join(lines)
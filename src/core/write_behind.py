@@ -0,0 +1,135 @@
+"""
+Write-behind persistence for chat saves.
+
+Saves are handed to a single background writer thread so the input loop
+doesn't wait on the disk. Only the latest snapshot of each chat is kept in
+the queue, so several saves of the same chat made while the writer is busy
+turn into one write. Pending saves are flushed on close and at interpreter
+shutdown.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindWriter:
+    """Single background thread that runs coalesced chat saves."""
+
+    def __init__(self, write: Callable[[str, List[Dict[str, Any]]], None]):
+        """
+        Args:
+            write: Function that persists one chat, called as write(chat_name, history)
+        """
+        self._write = write
+        self._pending: 'OrderedDict[str, List[Dict[str, Any]]]' = OrderedDict()
+        self._writing: Optional[str] = None
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._stats = {'submitted': 0, 'coalesced': 0, 'writes': 0, 'errors': 0,
+                       'max_queue_depth': 0, 'total_latency': 0.0, 'max_latency': 0.0,
+                       'last_latency': 0.0}
+        atexit.register(self.close)
+
+    def submit(self, chat_name: str, history: List[Dict[str, Any]]):
+        """Queue a save of a snapshot of history, replacing any pending save of the same chat."""
+        snapshot = list(history)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Write-behind writer is closed")
+            self._stats['submitted'] += 1
+            if chat_name in self._pending:
+                self._stats['coalesced'] += 1
+            self._pending[chat_name] = snapshot
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._queue_depth())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='chat-writer', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def pending(self, chat_name: str) -> Optional[List[Dict[str, Any]]]:
+        """The snapshot waiting to be written for a chat, if any."""
+        with self._cond:
+            snapshot = self._pending.get(chat_name)
+            return list(snapshot) if snapshot is not None else None
+
+    def cancel(self, chat_name: str):
+        """Drop a chat's pending save and wait until it is not being written."""
+        with self._cond:
+            self._pending.pop(chat_name, None)
+            while self._writing == chat_name:
+                self._cond.wait()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued save has been written. Returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and self._writing is None, timeout)
+
+    def close(self):
+        """Flush pending saves and stop the writer thread."""
+        with self._cond:
+            if self._closed:
+                return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        atexit.unregister(self.close)
+
+    def _queue_depth(self) -> int:
+        return len(self._pending) + (1 if self._writing is not None else 0)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                chat_name, history = self._pending.popitem(last=False)
+                self._writing = chat_name
+
+            start = time.perf_counter()
+            try:
+                self._write(chat_name, history)
+                failed = False
+            except Exception as e:
+                print(f"Error saving chat {chat_name}: {e}")
+                failed = True
+            latency = time.perf_counter() - start
+
+            with self._cond:
+                self._writing = None
+                stats = self._stats
+                stats['errors' if failed else 'writes'] += 1
+                stats['total_latency'] += latency
+                stats['max_latency'] = max(stats['max_latency'], latency)
+                stats['last_latency'] = latency
+                depth = self._queue_depth()
+                self._cond.notify_all()
+            logger.debug("Saved chat %s in %.1fms (queue depth %d)", chat_name, latency * 1000, depth)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Writer metrics.
+
+        Returns:
+            Dictionary with queue_depth, max_queue_depth, submitted, coalesced,
+            writes, errors and last/avg/max write latency in milliseconds
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._queue_depth()
+        completed = stats['writes'] + stats['errors']
+        total_latency = stats.pop('total_latency')
+        stats['avg_latency_ms'] = total_latency * 1000 / completed if completed else 0.0
+        stats['max_latency_ms'] = stats.pop('max_latency') * 1000
+        stats['last_latency_ms'] = stats.pop('last_latency') * 1000
+        return stats
@@ -5,8 +5,12 @@ This module defines the abstract interfaces that all AI providers must implement
 to be compatible with the retrochat application.
 """
 
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Iterator
+from typing import List, Dict, Any, Optional, Iterator, AsyncIterator, Tuple
+
+from .model_catalog import ModelCatalogCache
+from .client_pool import fingerprint
 
 
 class BaseModelManager(ABC):
@@ -34,6 +38,60 @@ class BaseModelManager(ABC):
             Dictionary containing model information
         """
         pass
+    
+    def get_cached_model_info(self, model_id: str) -> Dict[str, Any]:
+        """
+        Get information about a model without contacting the provider.
+        
+        Args:
+            model_id: The ID of the model to get info for
+            
+        Returns:
+            Dictionary containing model information, or an empty dictionary
+            if the model isn't known locally
+        """
+        return {}
+
+
+class CachedModelManager(BaseModelManager):
+    """Model manager that serves the catalog from a ModelCatalogCache."""
+    
+    def __init__(self, catalog: ModelCatalogCache):
+        self.catalog = catalog
+    
+    @abstractmethod
+    def fetch_models(self, validators: Dict[str, str]) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, str]]:
+        """
+        Fetch the model catalog from the provider.
+        
+        Args:
+            validators: 'etag' and/or 'last_modified' values from the cached copy
+            
+        Returns:
+            (models, validators) where models is None if the provider reported
+            that the cached copy is still current
+        """
+        pass
+    
+    def get_models(self, refresh: bool = False) -> List[Dict[str, Any]]:
+        """Get available models, fetching only when the cached catalog is stale."""
+        try:
+            return self.catalog.get(self.fetch_models, refresh=refresh)
+        except Exception as e:
+            print(f"Error fetching models: {e}")
+            return []
+    
+    def get_model_info(self, model_id: str) -> Dict[str, Any]:
+        """Look up a model in the cached catalog."""
+        model = self.catalog.lookup(model_id)
+        if model is None:
+            self.get_models()
+            model = self.catalog.lookup(model_id)
+        return model or {}
+    
+    def get_cached_model_info(self, model_id: str) -> Dict[str, Any]:
+        """Look up a model in the catalog already in memory or on disk, even if stale."""
+        return self.catalog.peek(model_id) or {}
 
 
 class BaseChat(ABC):
@@ -47,7 +105,8 @@ class BaseChat(ABC):
         Args:
             message: The user message to send
             history: Conversation history as list of message dictionaries
-            **kwargs: Additional parameters (temperature, max_tokens, etc.)
+            **kwargs: Additional parameters (temperature, max_tokens, etc.). A `usage`
+                dict, if given, is filled with the token counts the API reports.
             
         Returns:
             The assistant's response as a string
@@ -59,6 +118,68 @@ class BaseChat(ABC):
         """
         Send a message and get a streaming response.
         
+        Args:
+            message: The user message to send
+            history: Conversation history as list of message dictionaries
+            **kwargs: Additional parameters (temperature, max_tokens, etc.). A `usage`
+                dict, if given, is filled with the token counts the API reports.
+            
+        Yields:
+            Response chunks as strings
+        """
+        pass
+
+
+class AsyncBaseModelManager(ABC):
+    """Abstract base class for asynchronous model management operations."""
+    
+    @abstractmethod
+    async def get_models(self) -> List[Dict[str, Any]]:
+        """
+        Retrieve available models from the provider.
+        
+        Returns:
+            List of model dictionaries with at least 'id' and 'name' fields
+        """
+        pass
+    
+    @abstractmethod
+    async def get_model_info(self, model_id: str) -> Dict[str, Any]:
+        """
+        Get detailed information about a specific model.
+        
+        Args:
+            model_id: The ID of the model to get info for
+            
+        Returns:
+            Dictionary containing model information
+        """
+        pass
+
+
+class AsyncBaseChat(ABC):
+    """Abstract base class for asynchronous chat operations."""
+    
+    @abstractmethod
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        """
+        Send a message and get a response without blocking the event loop.
+        
+        Args:
+            message: The user message to send
+            history: Conversation history as list of message dictionaries
+            **kwargs: Additional parameters (temperature, max_tokens, etc.)
+            
+        Returns:
+            The assistant's response as a string
+        """
+        pass
+    
+    @abstractmethod
+    def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """
+        Send a message and get a streaming response as an async iterator.
+        
         Args:
             message: The user message to send
             history: Conversation history as list of message dictionaries
@@ -70,6 +191,231 @@ class BaseChat(ABC):
         pass
 
 
+def _running_loop():
+    """Get the running event loop; asyncio is only imported once something is awaited."""
+    import asyncio
+    return asyncio.get_running_loop()
+
+
+class ThreadedAsyncModelManager(AsyncBaseModelManager):
+    """Async adapter that runs a synchronous model manager in the default executor."""
+    
+    def __init__(self, model_manager: BaseModelManager):
+        self.model_manager = model_manager
+    
+    async def get_models(self) -> List[Dict[str, Any]]:
+        loop = _running_loop()
+        return await loop.run_in_executor(None, self.model_manager.get_models)
+    
+    async def get_model_info(self, model_id: str) -> Dict[str, Any]:
+        loop = _running_loop()
+        return await loop.run_in_executor(None, self.model_manager.get_model_info, model_id)
+
+
+class _ThreadedChunks:
+    """
+    Steps a synchronous chunk iterator in worker threads.
+    
+    close() may be called while a step is running in another thread; the
+    iterator is then closed by that step as soon as it returns.
+    """
+    
+    def __init__(self, chunks: Iterator[str]):
+        self.chunks = chunks
+        self._lock = threading.Lock()
+        self._running = False
+        self._closed = False
+    
+    def schedule(self, loop, done: object):
+        """Run one step in the default executor; resolves to the next chunk or done."""
+        with self._lock:
+            self._running = True
+        return loop.run_in_executor(None, self._step, done)
+    
+    def _step(self, done: object):
+        try:
+            chunk = next(self.chunks, done)
+        finally:
+            with self._lock:
+                self._running = False
+                closed = self._closed
+        if closed:
+            self._close_chunks()
+            return done
+        return chunk
+    
+    def close(self):
+        """Stop the iterator, now or once the running step returns."""
+        with self._lock:
+            self._closed = True
+            if self._running:
+                return
+        self._close_chunks()
+    
+    def _close_chunks(self):
+        close = getattr(self.chunks, 'close', None)
+        if close:
+            close()
+
+
+class ThreadedAsyncChat(AsyncBaseChat):
+    """Async adapter that runs a synchronous chat in the default executor."""
+    
+    def __init__(self, chat: BaseChat):
+        self.chat = chat
+    
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        loop = _running_loop()
+        return await loop.run_in_executor(None, lambda: self.chat.send_message(message, history, **kwargs))
+    
+    async def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        loop = _running_loop()
+        chunks = _ThreadedChunks(self.chat.send_message_stream(message, history, **kwargs))
+        done = object()
+        try:
+            while True:
+                chunk = await chunks.schedule(loop, done)
+                if chunk is done:
+                    break
+                yield chunk
+        finally:
+            # A consumer that stops early (cancelled, timed out, disconnected) must not leave the
+            # provider's stream and connection open until garbage collection
+            chunks.close()
+
+
+def build_chat_messages(message: str, history: List[Dict[str, Any]],
+                        system_prompt: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Build the message list for a request.
+    
+    History entries (dictionaries or Message objects, which the OpenAI client
+    reads as mappings) are passed through as they are rather than copied.
+    
+    Args:
+        message: The new user message
+        history: Conversation history (not modified)
+        system_prompt: Prepended when the history has no system message
+        
+    Returns:
+        New list of messages ending with the user message
+    """
+    has_system_message = getattr(history, 'has_system_message', None)
+    messages = []
+    if system_prompt and not (has_system_message() if has_system_message else
+                              any(msg.get('role') == 'system' for msg in history)):
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history)
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+def build_completion_params(config: Dict[str, Any], message: str, history: List[Dict[str, Any]],
+                            stream: bool, **kwargs) -> Dict[str, Any]:
+    """
+    Build the keyword arguments for an OpenAI-compatible chat completion request.
+    
+    Args:
+        config: Provider configuration (default_model, system_prompt)
+        message: The new user message
+        history: Conversation history
+        stream: Whether to request a streaming response
+        **kwargs: model, temperature, max_tokens and top_p overrides, and a
+            `usage` dict to be filled with reported token counts
+        
+    Returns:
+        Dictionary of request parameters
+    """
+    model = kwargs.get('model') or config.get('default_model')
+    if not model:
+        raise ValueError("No default model configured")
+    
+    params = {
+        'model': model,
+        'messages': build_chat_messages(message, history, config.get('system_prompt')),
+        'temperature': kwargs.get('temperature', 0.7),
+        'stream': stream
+    }
+    
+    # Add optional parameters if provided
+    if 'max_tokens' in kwargs:
+        params['max_tokens'] = kwargs['max_tokens']
+    if 'top_p' in kwargs:
+        params['top_p'] = kwargs['top_p']
+    if stream and kwargs.get('usage') is not None:
+        # Ask for token usage on the final chunk when the caller wants it
+        params['stream_options'] = {'include_usage': True}
+    return params
+
+
+def record_usage(kwargs: Dict[str, Any], usage: Any):
+    """
+    Copy token usage reported by the API into the caller's `usage` dict.
+    
+    Args:
+        kwargs: Keyword arguments of the send call (may hold a `usage` dict)
+        usage: Usage object from a completion or the final stream chunk
+    """
+    target = kwargs.get('usage')
+    if target is None or usage is None:
+        return
+    for key in ('prompt_tokens', 'completion_tokens'):
+        value = getattr(usage, key, None)
+        if value is not None:
+            target[key] = value
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """
+    Seconds a server asked us to wait before retrying, for rate-limit errors.
+    
+    Reads the `retry-after-ms` or `retry-after` (seconds or HTTP date) header of
+    a 429 or 503 response; a 429 without either means one second.
+    
+    Returns:
+        Delay in seconds, or None if the error is not a rate-limit response
+    """
+    response = getattr(error, 'response', None)
+    status = getattr(error, 'status_code', None) or getattr(response, 'status_code', None)
+    if status not in (429, 503):
+        return None
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return max(float(headers['retry-after-ms']) / 1000, 0.0)
+        value = headers.get('retry-after')
+        if value:
+            try:
+                return max(float(value), 0.0)
+            except ValueError:
+                from email.utils import parsedate_to_datetime
+                import time
+                return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        pass
+    return 1.0 if status == 429 else None
+
+
+def record_error(kwargs: Dict[str, Any], error: Exception) -> str:
+    """
+    Describe a failed request, telling the rate limiter about any Retry-After.
+    
+    Args:
+        kwargs: Keyword arguments of the send call (may hold a `rate_limit` dict,
+            which gets the requested delay as 'retry_after')
+        error: The exception raised by the request
+        
+    Returns:
+        The "Error: ..." reply
+    """
+    target = kwargs.get('rate_limit')
+    if target is not None:
+        delay = retry_after(error)
+        if delay is not None:
+            target['retry_after'] = delay
+    return f"Error: {str(error)}"
+
+
 class BaseProvider(ABC):
     """Abstract base class for AI providers."""
     
@@ -82,6 +428,8 @@ class BaseProvider(ABC):
         """
         self.config = config
         self.name = self.get_provider_name()
+        self._rate_limiter = None
+        self._rate_limits = None
     
     @abstractmethod
     def get_provider_name(self) -> str:
@@ -143,6 +491,30 @@ class BaseProvider(ABC):
         """
         pass
     
+    def create_async_model_manager(self) -> AsyncBaseModelManager:
+        """
+        Create an asynchronous model manager for this provider.
+        
+        Providers without a native async client get the synchronous model
+        manager run in the default executor.
+        
+        Returns:
+            AsyncBaseModelManager implementation for this provider
+        """
+        return ThreadedAsyncModelManager(self.create_model_manager())
+    
+    def create_async_chat(self) -> AsyncBaseChat:
+        """
+        Create an asynchronous chat instance for this provider.
+        
+        Providers without a native async client get the synchronous chat run
+        in the default executor.
+        
+        Returns:
+            AsyncBaseChat implementation for this provider
+        """
+        return ThreadedAsyncChat(self.create_chat())
+    
     @abstractmethod
     def test_connection(self) -> bool:
         """
@@ -153,6 +525,67 @@ class BaseProvider(ABC):
         """
         pass
     
+    def get_connection_config_keys(self) -> List[str]:
+        """
+        Get the configuration keys that select the endpoint and credentials.
+        
+        Providers whose connection keys match share one pooled instance and client.
+        
+        Returns:
+            List of configuration key names
+        """
+        return self.get_required_config_keys()
+    
+    def connection_fingerprint(self, config: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Get a digest of the connection-relevant configuration.
+        
+        Args:
+            config: Configuration to fingerprint (defaults to this provider's)
+            
+        Returns:
+            Fingerprint string
+        """
+        config = self.config if config is None else config
+        return fingerprint({key: config.get(key) for key in self.get_connection_config_keys()})
+    
+    @property
+    def rate_limiter(self):
+        """
+        The scheduler for this provider's requests, built from config['rate_limits'].
+        
+        Returns:
+            RateLimiter, or None when no limits are configured
+        """
+        limits = self.config.get('rate_limits')
+        if limits != self._rate_limits:
+            from .rate_limiter import RateLimiter
+            self._rate_limiter = RateLimiter.from_config(limits) if limits else None
+            self._rate_limits = limits
+        return self._rate_limiter
+    
+    def limit_chat(self, chat, caller: str = 'chat'):
+        """
+        Route a chat (sync or async) from this provider through its rate limiter.
+        
+        Args:
+            chat: BaseChat or AsyncBaseChat created by this provider
+            caller: Name the limiter queues the requests under; callers take turns
+            
+        Returns:
+            The wrapped chat, or chat itself when no limits are configured
+        """
+        limiter = self.rate_limiter
+        if limiter is None or chat is None:
+            return chat
+        from .rate_limiter import RateLimitedChat, RateLimitedAsyncChat
+        wrapper = RateLimitedAsyncChat if isinstance(chat, AsyncBaseChat) else RateLimitedChat
+        return wrapper(chat, limiter, caller)
+    
+    def close(self):
+        """Release any pooled clients held by this provider."""
+        pass
+    
     def get_config_value(self, key: str, default: Any = None) -> Any:
         """
         Get a configuration value.
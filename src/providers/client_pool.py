@@ -0,0 +1,108 @@
+"""
+Shared HTTP client pool for providers.
+
+Provider instances acquire their OpenAI clients and requests sessions from
+this pool instead of constructing their own, so every component that talks
+to the same endpoint with the same credentials reuses one keep-alive
+connection pool. Clients are reference counted and closed when the last
+provider holding them is closed.
+
+Async clients are bound to the event loop they were created on, so they are
+pooled per running loop and dropped together with it.
+"""
+
+import hashlib
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+def fingerprint(values: Dict[str, Any]) -> str:
+    """Stable digest of a set of configuration values."""
+    data = repr(sorted(values.items())).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+class ClientPool:
+    """Reference-counted registry of shared HTTP clients."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Hashable, List[Any]] = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def acquire(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Get the client stored under key, creating it with factory on first use."""
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                entry = self._clients[key] = [factory(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, key: Hashable):
+        """Drop one reference to a client, closing it when nobody holds it anymore."""
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._clients[key]
+        close = getattr(entry[0], 'close', None)
+        if close:
+            try:
+                close()
+            except Exception:
+                pass
+
+    def acquire_openai_client(self, base_url: str, api_key: str) -> Tuple[Hashable, Any]:
+        """Get a shared OpenAI client for an endpoint. Returns (key, client)."""
+        key = ('openai', base_url, fingerprint({'api_key': api_key}))
+
+        def create():
+            from openai import OpenAI
+            return OpenAI(base_url=base_url, api_key=api_key)
+
+        return key, self.acquire(key, create)
+
+    def get_async_openai_client(self, base_url: str, api_key: str) -> Any:
+        """Get the shared AsyncOpenAI client for an endpoint on the running event loop."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        key = ('openai-async', base_url, fingerprint({'api_key': api_key}))
+        with self._lock:
+            clients = self._async_clients.get(loop)
+            if clients is None:
+                clients = self._async_clients[loop] = {}
+            client = clients.get(key)
+            if client is None:
+                from openai import AsyncOpenAI
+                client = clients[key] = AsyncOpenAI(base_url=base_url, api_key=api_key)
+            return client
+
+    def acquire_session(self, name: str) -> Tuple[Hashable, Any]:
+        """Get a shared requests.Session for a host. Returns (key, session)."""
+        key = ('requests', name)
+
+        def create():
+            import requests
+            return requests.Session()
+
+        return key, self.acquire(key, create)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of live clients per kind."""
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for key in self._clients:
+                counts[key[0]] = counts.get(key[0], 0) + 1
+            for clients in self._async_clients.values():
+                for key in clients:
+                    counts[key[0]] = counts.get(key[0], 0) + 1
+            return counts
+
+
+# Global pool instance
+client_pool = ClientPool()
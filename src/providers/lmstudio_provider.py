@@ -5,42 +5,39 @@ This provider connects to LM Studio's local API server which provides
 an OpenAI-compatible interface.
 """
 
-from typing import List, Dict, Any, Iterator
-from openai import OpenAI
-from .base_provider import BaseProvider, BaseModelManager, BaseChat
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI
+from .base_provider import (
+    BaseProvider, BaseModelManager, BaseChat, CachedModelManager,
+    AsyncBaseChat, build_completion_params, record_usage, record_error
+)
+from .model_catalog import ModelCatalogCache, catalog_key
+from .client_pool import client_pool
 
+# LM Studio's model list changes whenever a model is loaded, so keep it short-lived
+DEFAULT_MODEL_CACHE_TTL = 30
 
-class LMStudioModelManager(BaseModelManager):
+
+class LMStudioModelManager(CachedModelManager):
     """Model manager for LM Studio."""
     
-    def __init__(self, client: OpenAI):
+    def __init__(self, client: OpenAI, catalog: ModelCatalogCache):
+        super().__init__(catalog)
         self.client = client
     
-    def get_models(self) -> List[Dict[str, Any]]:
-        """Get available models from LM Studio."""
-        try:
-            models_response = self.client.models.list()
-            models = []
-            for model in models_response.data:
-                models.append({
-                    'id': model.id,
-                    'name': model.id,  # LM Studio uses ID as display name
-                    'object': getattr(model, 'object', 'model'),
-                    'created': getattr(model, 'created', None),
-                    'owned_by': getattr(model, 'owned_by', 'lm-studio'),
-                })
-            return models
-        except Exception as e:
-            print(f"Error fetching models from LM Studio: {e}")
-            return []
-    
-    def get_model_info(self, model_id: str) -> Dict[str, Any]:
-        """Get information about a specific model."""
-        models = self.get_models()
-        for model in models:
-            if model['id'] == model_id:
-                return model
-        return {}
+    def fetch_models(self, validators: Dict[str, str]) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, str]]:
+        """Fetch the loaded models from LM Studio (the local server sends no validators)."""
+        models_response = self.client.models.list()
+        models = []
+        for model in models_response.data:
+            models.append({
+                'id': model.id,
+                'name': model.id,  # LM Studio uses ID as display name
+                'object': getattr(model, 'object', 'model'),
+                'created': getattr(model, 'created', None),
+                'owned_by': getattr(model, 'owned_by', 'lm-studio'),
+            })
+        return models, {}
 
 
 class LMStudioChat(BaseChat):
@@ -53,91 +50,96 @@ class LMStudioChat(BaseChat):
     def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
         """Send a message to LM Studio and get response."""
         try:
-            # Prepare the messages
-            messages = history.copy()
-            
-            # Add system message if not present and system_prompt is configured
-            if not any(msg.get('role') == 'system' for msg in messages):
-                system_prompt = self.config.get('system_prompt')
-                if system_prompt:
-                    messages.insert(0, {"role": "system", "content": system_prompt})
-            
-            # Add user message
-            messages.append({"role": "user", "content": message})
-            
-            # Get model from config
-            model = self.config.get('default_model')
-            if not model:
-                raise ValueError("No default model configured")
-            
-            # Prepare parameters
-            params = {
-                'model': model,
-                'messages': messages,
-                'temperature': kwargs.get('temperature', 0.7),
-                'stream': False
-            }
-            
-            # Add optional parameters if provided
-            if 'max_tokens' in kwargs:
-                params['max_tokens'] = kwargs['max_tokens']
-            if 'top_p' in kwargs:
-                params['top_p'] = kwargs['top_p']
-            
+            params = build_completion_params(self.config, message, history, stream=False, **kwargs)
             completion = self.client.chat.completions.create(**params)
+            record_usage(kwargs, completion.usage)
             return completion.choices[0].message.content
             
         except Exception as e:
-            return f"Error: {str(e)}"
+            return record_error(kwargs, e)
     
     def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
         """Send a message to LM Studio and get streaming response."""
         try:
-            # Prepare the messages
-            messages = history.copy()
-            
-            # Add system message if not present and system_prompt is configured
-            if not any(msg.get('role') == 'system' for msg in messages):
-                system_prompt = self.config.get('system_prompt')
-                if system_prompt:
-                    messages.insert(0, {"role": "system", "content": system_prompt})
-            
-            # Add user message
-            messages.append({"role": "user", "content": message})
-            
-            # Get model from config
-            model = self.config.get('default_model')
-            if not model:
-                raise ValueError("No default model configured")
-            
-            # Prepare parameters
-            params = {
-                'model': model,
-                'messages': messages,
-                'temperature': kwargs.get('temperature', 0.7),
-                'stream': True
-            }
-            
-            # Add optional parameters if provided
-            if 'max_tokens' in kwargs:
-                params['max_tokens'] = kwargs['max_tokens']
-            if 'top_p' in kwargs:
-                params['top_p'] = kwargs['top_p']
-            
+            params = build_completion_params(self.config, message, history, stream=True, **kwargs)
             completion = self.client.chat.completions.create(**params)
             
             for chunk in completion:
+                # The final chunk may carry only token usage and no choices
+                record_usage(kwargs, getattr(chunk, 'usage', None))
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
+                    
+        except Exception as e:
+            yield record_error(kwargs, e)
+
+
+class LMStudioAsyncChat(AsyncBaseChat):
+    """Asynchronous chat implementation for LM Studio."""
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+    
+    def _client(self) -> AsyncOpenAI:
+        return client_pool.get_async_openai_client(self.config['api_base'], self.config['api_key'])
+    
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        """Send a message to LM Studio and await the response."""
+        try:
+            params = build_completion_params(self.config, message, history, stream=False, **kwargs)
+            completion = await self._client().chat.completions.create(**params)
+            record_usage(kwargs, completion.usage)
+            return completion.choices[0].message.content
+            
+        except Exception as e:
+            return record_error(kwargs, e)
+    
+    async def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """Send a message to LM Studio and stream the response asynchronously."""
+        try:
+            params = build_completion_params(self.config, message, history, stream=True, **kwargs)
+            completion = await self._client().chat.completions.create(**params)
+            
+            async for chunk in completion:
+                # The final chunk may carry only token usage and no choices
+                record_usage(kwargs, getattr(chunk, 'usage', None))
+                if not chunk.choices:
+                    continue
                 content = chunk.choices[0].delta.content
                 if content:
                     yield content
                     
         except Exception as e:
-            yield f"Error: {str(e)}"
+            yield record_error(kwargs, e)
 
 
 class LMStudioProvider(BaseProvider):
     """LM Studio provider implementation."""
     
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self._client = None
+        self._client_key = None
+        self._catalog = None
+    
+    def _get_client(self) -> OpenAI:
+        """Get the pooled client for this provider's endpoint."""
+        if self._client is None:
+            self._client_key, self._client = client_pool.acquire_openai_client(
+                self.config['api_base'], self.config['api_key']
+            )
+        return self._client
+    
+    def close(self):
+        """Release the pooled client."""
+        if self._client is not None:
+            client_pool.release(self._client_key)
+            self._client = None
+            self._client_key = None
+    
     def get_provider_name(self) -> str:
         return "lmstudio"
     
@@ -145,7 +147,7 @@ class LMStudioProvider(BaseProvider):
         return ["api_base", "api_key"]
     
     def get_optional_config_keys(self) -> List[str]:
-        return ["default_model", "system_prompt", "stream", "temperature", "max_tokens", "top_p"]
+        return ["default_model", "system_prompt", "stream", "temperature", "max_tokens", "top_p", "model_cache_ttl", "context_budget", "context_turns", "response_cache", "rate_limits"]
     
     def validate_config(self) -> bool:
         """Validate LM Studio configuration."""
@@ -167,13 +169,8 @@ class LMStudioProvider(BaseProvider):
     def test_connection(self) -> bool:
         """Test connection to LM Studio."""
         try:
-            client = OpenAI(
-                base_url=self.config['api_base'],
-                api_key=self.config['api_key']
-            )
-            
             # Try to list models to test connection
-            models = client.models.list()
+            models = self._get_client().models.list()
             return len(models.data) > 0
             
         except Exception as e:
@@ -182,16 +179,17 @@ class LMStudioProvider(BaseProvider):
     
     def create_model_manager(self) -> BaseModelManager:
         """Create LM Studio model manager."""
-        client = OpenAI(
-            base_url=self.config['api_base'],
-            api_key=self.config['api_key']
-        )
-        return LMStudioModelManager(client)
+        if self._catalog is None:
+            self._catalog = ModelCatalogCache(
+                catalog_key(self.get_provider_name(), self.config['api_base']),
+                ttl=self.config.get('model_cache_ttl', DEFAULT_MODEL_CACHE_TTL)
+            )
+        return LMStudioModelManager(self._get_client(), self._catalog)
     
     def create_chat(self) -> BaseChat:
         """Create LM Studio chat."""
-        client = OpenAI(
-            base_url=self.config['api_base'],
-            api_key=self.config['api_key']
-        )
-        return LMStudioChat(client, self.config)
+        return LMStudioChat(self._get_client(), self.config)
+    
+    def create_async_chat(self) -> AsyncBaseChat:
+        """Create LM Studio async chat."""
+        return LMStudioAsyncChat(self.config)
@@ -0,0 +1,131 @@
+"""
+Model catalog cache for providers.
+
+Keeps a provider's model list in memory and on disk (shared across runs),
+revalidates it with ETag/Last-Modified once its TTL expires, and indexes the
+models by id so single-model lookups do not refetch the catalog.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+from src.utils.file_utils import atomic_write_text
+
+DEFAULT_CACHE_DIR = 'cache'
+DEFAULT_TTL = 3600
+
+# Returned by a fetch function when the server answered 304 Not Modified
+NOT_MODIFIED = None
+
+FetchFunction = Callable[[Dict[str, str]], Tuple[Optional[List[Dict[str, Any]]], Dict[str, str]]]
+
+
+def catalog_key(provider_name: str, endpoint: str) -> str:
+    """Build a filesystem-safe cache key for a provider endpoint."""
+    digest = hashlib.sha1(endpoint.encode('utf-8')).hexdigest()[:12]
+    return f"{provider_name}-{digest}"
+
+
+class ModelCatalogCache:
+    """TTL-bounded, disk-persisted cache of one provider's model catalog."""
+
+    def __init__(self, key: str, ttl: float = DEFAULT_TTL, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.key = key
+        self.ttl = ttl
+        self.path = os.path.join(cache_dir, f"models_{key}.json")
+        self._lock = threading.Lock()
+        self._models: Optional[List[Dict[str, Any]]] = None
+        self._by_id: Dict[str, Dict[str, Any]] = {}
+        self._validators: Dict[str, str] = {}
+        self._fetched_at = 0.0
+        self._disk_checked = False
+
+    def _is_fresh(self) -> bool:
+        return self._models is not None and time.time() - self._fetched_at < self.ttl
+
+    def _set_models(self, models: List[Dict[str, Any]]):
+        self._models = models
+        self._by_id = {model.get('id'): model for model in models}
+
+    def _load_from_disk(self):
+        self._disk_checked = True
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._set_models(data['models'])
+            self._validators = data.get('validators', {})
+            self._fetched_at = data.get('fetched_at', 0.0)
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def _save_to_disk(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            atomic_write_text(self.path, json.dumps({
+                'fetched_at': self._fetched_at,
+                'validators': self._validators,
+                'models': self._models,
+            }))
+        except OSError as e:
+            print(f"Could not write model cache {self.path}: {e}")
+
+    def get(self, fetch: FetchFunction, refresh: bool = False) -> List[Dict[str, Any]]:
+        """
+        Get the catalog, fetching or revalidating it when the cached copy is stale.
+
+        Args:
+            fetch: Called with the stored validators (ETag/Last-Modified); returns
+                (models, validators), or (NOT_MODIFIED, validators) for a 304
+            refresh: Ignore the TTL and revalidate now
+
+        Returns:
+            The list of model dictionaries
+        """
+        with self._lock:
+            if not self._disk_checked:
+                self._load_from_disk()
+            if self._is_fresh() and not refresh:
+                return self._models
+
+            try:
+                models, validators = fetch(dict(self._validators) if self._models is not None else {})
+            except Exception:
+                if self._models is not None:
+                    # Serve the stale catalog rather than nothing when the provider is unreachable
+                    return self._models
+                raise
+
+            if models is not NOT_MODIFIED:
+                self._set_models(models)
+            self._validators = validators or {}
+            self._fetched_at = time.time()
+            self._save_to_disk()
+            return self._models or []
+
+    def lookup(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Get one cached model by id."""
+        return self._by_id.get(model_id)
+
+    def peek(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """Get one model from the stored catalog (loading it from disk if needed) without fetching."""
+        with self._lock:
+            if not self._disk_checked:
+                self._load_from_disk()
+            return self._by_id.get(model_id)
+
+    def invalidate(self):
+        """Forget the cached catalog in memory and on disk."""
+        with self._lock:
+            self._models = None
+            self._by_id = {}
+            self._validators = {}
+            self._fetched_at = 0.0
+            self._disk_checked = True
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
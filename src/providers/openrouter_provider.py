@@ -5,67 +5,90 @@ This provider connects to OpenRouter's API which provides access to
 hundreds of AI models through a unified interface.
 """
 
-from typing import List, Dict, Any, Iterator
-from openai import OpenAI
-from .base_provider import BaseProvider, BaseModelManager, BaseChat
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple
+from openai import OpenAI, AsyncOpenAI
+from .base_provider import (
+    BaseProvider, BaseModelManager, BaseChat, CachedModelManager,
+    AsyncBaseChat, build_completion_params, record_usage, record_error
+)
+from .model_catalog import ModelCatalogCache, catalog_key, NOT_MODIFIED
+from .client_pool import client_pool
 import requests
 
+OPENROUTER_API_BASE = "https://openrouter.ai/api/v1"
+OPENROUTER_MODELS_URL = f"{OPENROUTER_API_BASE}/models"
+DEFAULT_MODEL_CACHE_TTL = 3600
 
-class OpenRouterModelManager(BaseModelManager):
+
+def prepare_openrouter_headers(config: Dict[str, Any]) -> Dict[str, str]:
+    """Prepare OpenRouter-specific request headers."""
+    headers = {}
+    
+    # Optional headers for OpenRouter leaderboards
+    if 'site_url' in config:
+        headers['HTTP-Referer'] = config['site_url']
+    if 'site_name' in config:
+        headers['X-Title'] = config['site_name']
+        
+    return headers
+
+
+class OpenRouterModelManager(CachedModelManager):
     """Model manager for OpenRouter."""
     
-    def __init__(self, client: OpenAI, api_key: str):
+    def __init__(self, client: OpenAI, api_key: str, catalog: ModelCatalogCache,
+                 session: requests.Session = None):
+        super().__init__(catalog)
         self.client = client
         self.api_key = api_key
+        self.session = session or requests.Session()
     
-    def get_models(self) -> List[Dict[str, Any]]:
-        """Get available models from OpenRouter."""
-        try:
-            # Use OpenRouter's models API endpoint
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-            
-            response = requests.get(
-                'https://openrouter.ai/api/v1/models',
-                headers=headers,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                models = []
-                
-                for model in data.get('data', []):
-                    models.append({
-                        'id': model.get('id', ''),
-                        'name': model.get('name', model.get('id', '')),
-                        'description': model.get('description', ''),
-                        'context_length': model.get('context_length', 0),
-                        'pricing': model.get('pricing', {}),
-                        'created': model.get('created'),
-                        'owned_by': 'openrouter',
-                        'architecture': model.get('architecture', {}),
-                        'top_provider': model.get('top_provider', {}),
-                    })
-                
-                return models
-            else:
-                print(f"Error fetching models from OpenRouter: HTTP {response.status_code}")
-                return []
-                
-        except Exception as e:
-            print(f"Error fetching models from OpenRouter: {e}")
-            return []
-    
-    def get_model_info(self, model_id: str) -> Dict[str, Any]:
-        """Get information about a specific model."""
-        models = self.get_models()
-        for model in models:
-            if model['id'] == model_id:
-                return model
-        return {}
+    def fetch_models(self, validators: Dict[str, str]) -> Tuple[Optional[List[Dict[str, Any]]], Dict[str, str]]:
+        """Fetch the model catalog from OpenRouter, revalidating the cached copy when possible."""
+        # Use OpenRouter's models API endpoint
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        if 'etag' in validators:
+            headers['If-None-Match'] = validators['etag']
+        if 'last_modified' in validators:
+            headers['If-Modified-Since'] = validators['last_modified']
+        
+        response = self.session.get(
+            OPENROUTER_MODELS_URL,
+            headers=headers,
+            timeout=30
+        )
+        
+        new_validators = {}
+        if response.headers.get('ETag'):
+            new_validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            new_validators['last_modified'] = response.headers['Last-Modified']
+        
+        if response.status_code == 304:
+            return NOT_MODIFIED, new_validators or validators
+        if response.status_code != 200:
+            raise RuntimeError(f"OpenRouter returned HTTP {response.status_code}")
+        
+        data = response.json()
+        models = []
+        
+        for model in data.get('data', []):
+            models.append({
+                'id': model.get('id', ''),
+                'name': model.get('name', model.get('id', '')),
+                'description': model.get('description', ''),
+                'context_length': model.get('context_length', 0),
+                'pricing': model.get('pricing', {}),
+                'created': model.get('created'),
+                'owned_by': 'openrouter',
+                'architecture': model.get('architecture', {}),
+                'top_provider': model.get('top_provider', {}),
+            })
+        
+        return models, new_validators
 
 
 class OpenRouterChat(BaseChat):
@@ -77,49 +100,12 @@ class OpenRouterChat(BaseChat):
     
     def _prepare_headers(self) -> Dict[str, str]:
         """Prepare OpenRouter-specific headers."""
-        headers = {}
-        
-        # Optional headers for OpenRouter leaderboards
-        if 'site_url' in self.config:
-            headers['HTTP-Referer'] = self.config['site_url']
-        if 'site_name' in self.config:
-            headers['X-Title'] = self.config['site_name']
-            
-        return headers
+        return prepare_openrouter_headers(self.config)
     
     def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
         """Send a message to OpenRouter and get response."""
         try:
-            # Prepare the messages
-            messages = history.copy()
-            
-            # Add system message if not present and system_prompt is configured
-            if not any(msg.get('role') == 'system' for msg in messages):
-                system_prompt = self.config.get('system_prompt')
-                if system_prompt:
-                    messages.insert(0, {"role": "system", "content": system_prompt})
-            
-            # Add user message
-            messages.append({"role": "user", "content": message})
-            
-            # Get model from config
-            model = self.config.get('default_model')
-            if not model:
-                raise ValueError("No default model configured")
-            
-            # Prepare parameters
-            params = {
-                'model': model,
-                'messages': messages,
-                'temperature': kwargs.get('temperature', 0.7),
-                'stream': False
-            }
-            
-            # Add optional parameters if provided
-            if 'max_tokens' in kwargs:
-                params['max_tokens'] = kwargs['max_tokens']
-            if 'top_p' in kwargs:
-                params['top_p'] = kwargs['top_p']
+            params = build_completion_params(self.config, message, history, stream=False, **kwargs)
             
             # Add OpenRouter-specific headers
             extra_headers = self._prepare_headers()
@@ -128,44 +114,16 @@ class OpenRouterChat(BaseChat):
                 extra_headers=extra_headers,
                 **params
             )
+            record_usage(kwargs, completion.usage)
             return completion.choices[0].message.content
             
         except Exception as e:
-            return f"Error: {str(e)}"
+            return record_error(kwargs, e)
     
     def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
         """Send a message to OpenRouter and get streaming response."""
         try:
-            # Prepare the messages
-            messages = history.copy()
-            
-            # Add system message if not present and system_prompt is configured
-            if not any(msg.get('role') == 'system' for msg in messages):
-                system_prompt = self.config.get('system_prompt')
-                if system_prompt:
-                    messages.insert(0, {"role": "system", "content": system_prompt})
-            
-            # Add user message
-            messages.append({"role": "user", "content": message})
-            
-            # Get model from config
-            model = self.config.get('default_model')
-            if not model:
-                raise ValueError("No default model configured")
-            
-            # Prepare parameters
-            params = {
-                'model': model,
-                'messages': messages,
-                'temperature': kwargs.get('temperature', 0.7),
-                'stream': True
-            }
-            
-            # Add optional parameters if provided
-            if 'max_tokens' in kwargs:
-                params['max_tokens'] = kwargs['max_tokens']
-            if 'top_p' in kwargs:
-                params['top_p'] = kwargs['top_p']
+            params = build_completion_params(self.config, message, history, stream=True, **kwargs)
             
             # Add OpenRouter-specific headers
             extra_headers = self._prepare_headers()
@@ -176,17 +134,97 @@ class OpenRouterChat(BaseChat):
             )
             
             for chunk in completion:
+                # The final chunk may carry only token usage and no choices
+                record_usage(kwargs, getattr(chunk, 'usage', None))
+                if not chunk.choices:
+                    continue
                 content = chunk.choices[0].delta.content
                 if content:
                     yield content
                     
         except Exception as e:
-            yield f"Error: {str(e)}"
+            yield record_error(kwargs, e)
+
+
+class OpenRouterAsyncChat(AsyncBaseChat):
+    """Asynchronous chat implementation for OpenRouter."""
+    
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+    
+    def _client(self) -> AsyncOpenAI:
+        return client_pool.get_async_openai_client(OPENROUTER_API_BASE, self.config['api_key'])
+    
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        """Send a message to OpenRouter and await the response."""
+        try:
+            params = build_completion_params(self.config, message, history, stream=False, **kwargs)
+            completion = await self._client().chat.completions.create(
+                extra_headers=prepare_openrouter_headers(self.config),
+                **params
+            )
+            record_usage(kwargs, completion.usage)
+            return completion.choices[0].message.content
+            
+        except Exception as e:
+            return record_error(kwargs, e)
+    
+    async def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """Send a message to OpenRouter and stream the response asynchronously."""
+        try:
+            params = build_completion_params(self.config, message, history, stream=True, **kwargs)
+            completion = await self._client().chat.completions.create(
+                extra_headers=prepare_openrouter_headers(self.config),
+                **params
+            )
+            
+            async for chunk in completion:
+                # The final chunk may carry only token usage and no choices
+                record_usage(kwargs, getattr(chunk, 'usage', None))
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
+                    
+        except Exception as e:
+            yield record_error(kwargs, e)
 
 
 class OpenRouterProvider(BaseProvider):
     """OpenRouter provider implementation."""
     
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self._client = None
+        self._client_key = None
+        self._session = None
+        self._session_key = None
+        self._catalog = None
+    
+    def _get_client(self) -> OpenAI:
+        """Get the pooled OpenAI client for OpenRouter."""
+        if self._client is None:
+            self._client_key, self._client = client_pool.acquire_openai_client(
+                OPENROUTER_API_BASE, self.config['api_key']
+            )
+        return self._client
+    
+    def _get_session(self) -> requests.Session:
+        """Get the pooled HTTP session used for OpenRouter's REST endpoints."""
+        if self._session is None:
+            self._session_key, self._session = client_pool.acquire_session(OPENROUTER_API_BASE)
+        return self._session
+    
+    def close(self):
+        """Release the pooled client and session."""
+        if self._client is not None:
+            client_pool.release(self._client_key)
+            self._client = None
+        if self._session is not None:
+            client_pool.release(self._session_key)
+            self._session = None
+    
     def get_provider_name(self) -> str:
         return "openrouter"
     
@@ -196,7 +234,8 @@ class OpenRouterProvider(BaseProvider):
     def get_optional_config_keys(self) -> List[str]:
         return [
             "default_model", "system_prompt", "stream", "temperature", 
-            "max_tokens", "top_p", "site_url", "site_name"
+            "max_tokens", "top_p", "site_url", "site_name", "model_cache_ttl",
+            "context_budget", "context_turns", "response_cache", "rate_limits"
         ]
     
     def validate_config(self) -> bool:
@@ -225,8 +264,8 @@ class OpenRouterProvider(BaseProvider):
             }
             
             # Test with a simple models request
-            response = requests.get(
-                'https://openrouter.ai/api/v1/models',
+            response = self._get_session().get(
+                OPENROUTER_MODELS_URL,
                 headers=headers,
                 timeout=10
             )
@@ -239,16 +278,18 @@ class OpenRouterProvider(BaseProvider):
     
     def create_model_manager(self) -> BaseModelManager:
         """Create OpenRouter model manager."""
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.config['api_key']
-        )
-        return OpenRouterModelManager(client, self.config['api_key'])
+        if self._catalog is None:
+            self._catalog = ModelCatalogCache(
+                catalog_key(self.get_provider_name(), OPENROUTER_API_BASE),
+                ttl=self.config.get('model_cache_ttl', DEFAULT_MODEL_CACHE_TTL)
+            )
+        return OpenRouterModelManager(self._get_client(), self.config['api_key'], self._catalog,
+                                      self._get_session())
     
     def create_chat(self) -> BaseChat:
         """Create OpenRouter chat."""
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=self.config['api_key']
-        )
-        return OpenRouterChat(client, self.config)
+        return OpenRouterChat(self._get_client(), self.config)
+    
+    def create_async_chat(self) -> AsyncBaseChat:
+        """Create OpenRouter async chat."""
+        return OpenRouterAsyncChat(self.config)
@@ -1,116 +1,201 @@
 """
 Provider discovery and management system.
 
-This module handles automatic discovery of provider implementations
-and provides a factory for creating provider instances.
+This module handles discovery of provider implementations and provides a
+factory for creating provider instances.
+
+Discovery never imports provider modules. Providers are found in:
+
+1. `manifest.json` next to this module (the built-in providers)
+2. Drop-in modules in this directory that are not in the manifest; their
+   source is parsed (not imported) for classes that extend BaseProvider, and
+   the name returned by their `get_provider_name` (helper modules define no
+   such class and are passed over)
+3. The `retrochat.providers` entry point group of installed packages, only
+   consulted when a name is not found above or when listing all providers
+
+A provider's module (and the SDKs it depends on) is imported the first time
+that provider is actually created.
 """
 
 import os
-import sys
+import ast
+import json
 import importlib
-import inspect
-from typing import Dict, List, Type, Optional, Any
+import threading
+from typing import Dict, List, Type, Optional, Any, Tuple
 from .base_provider import BaseProvider
 
+MANIFEST_FILENAME = 'manifest.json'
+ENTRY_POINT_GROUP = 'retrochat.providers'
+
+
+class ProviderSpec:
+    """Where to find a provider class, without importing it."""
+    
+    def __init__(self, name: str, module: str, class_name: str, source: str):
+        self.name = name
+        self.module = module
+        self.class_name = class_name
+        self.source = source
+    
+    def load(self) -> Type[BaseProvider]:
+        """Import the provider module and return the provider class."""
+        if self.source == 'entry_point' or '.' in self.module:
+            module = importlib.import_module(self.module)
+        else:
+            module = importlib.import_module(f'{__package__}.{self.module}')
+        provider_class = getattr(module, self.class_name)
+        if not (isinstance(provider_class, type) and issubclass(provider_class, BaseProvider)):
+            raise TypeError(f"{self.module}.{self.class_name} is not a BaseProvider")
+        return provider_class
+
+
+def _extends_base_provider(node: ast.ClassDef) -> bool:
+    """Whether a class statement lists BaseProvider (or module.BaseProvider) as a base."""
+    for base in node.bases:
+        name = base.attr if isinstance(base, ast.Attribute) else getattr(base, 'id', None)
+        if name == BaseProvider.__name__:
+            return True
+    return False
+
+
+def scan_provider_module(path: str) -> Dict[str, str]:
+    """
+    Find provider classes in a module's source without importing it.
+    
+    Returns:
+        Mapping of provider name to class name for every class that extends
+        BaseProvider and whose get_provider_name method returns a string literal
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), filename=path)
+    
+    providers = {}
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or not _extends_base_provider(node):
+            continue
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef) and item.name == 'get_provider_name':
+                for stmt in ast.walk(item):
+                    if (isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Constant)
+                            and isinstance(stmt.value.value, str)):
+                        providers[stmt.value.value] = node.name
+                        break
+    return providers
+
+
+def _load_entry_points() -> List[Any]:
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return []
+    eps = entry_points()
+    if hasattr(eps, 'select'):
+        return list(eps.select(group=ENTRY_POINT_GROUP))
+    return list(eps.get(ENTRY_POINT_GROUP, []))
+
 
 class ProviderRegistry:
     """Registry for managing available providers."""
     
     def __init__(self):
         self._providers: Dict[str, Type[BaseProvider]] = {}
-        self._discover_providers()
-    
-    def _discover_providers(self):
-        """Automatically discover provider implementations."""
-        # Check if we're running in a PyInstaller bundle
-        if getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS'):
-            # Running in PyInstaller bundle - manually import known providers
-            self._register_bundled_providers()
-        else:
-            # Running normally - discover from filesystem
-            self._discover_filesystem_providers()
+        self._specs: Dict[str, ProviderSpec] = {}
+        self._discovered = False
+        self._entry_points_loaded = False
+        self._lock = threading.RLock()
     
-    def _register_bundled_providers(self):
-        """Register providers when running in PyInstaller bundle."""
-        # Manually import known provider modules
-        known_providers = ['lmstudio_provider', 'openrouter_provider']
-        
-        for module_name in known_providers:
+    def _ensure_discovered(self):
+        """Build the provider specs from the manifest and drop-in modules on first use."""
+        with self._lock:
+            if self._discovered:
+                return
+            self._discovered = True
+            providers_dir = os.path.dirname(__file__)
+            self._load_manifest(providers_dir)
+            self._scan_drop_in_modules(providers_dir)
+    
+    def _load_manifest(self, providers_dir: str):
+        manifest_path = os.path.join(providers_dir, MANIFEST_FILENAME)
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read provider manifest {manifest_path}: {e}")
+            return
+        for name, entry in manifest.get('providers', {}).items():
+            self._specs[name] = ProviderSpec(name, entry['module'], entry['class'], 'manifest')
+    
+    def _scan_drop_in_modules(self, providers_dir: str):
+        listed_modules = {spec.module for spec in self._specs.values()}
+        try:
+            filenames = os.listdir(providers_dir)
+        except OSError:
+            return
+        for filename in filenames:
+            module_name, ext = os.path.splitext(filename)
+            if ext != '.py' or filename.startswith('_') or module_name in listed_modules:
+                continue
             try:
-                # Try different import paths for PyInstaller
-                module = None
-                import_paths = [
-                    f'src.providers.{module_name}',
-                    f'providers.{module_name}',
-                    module_name
-                ]
-                
-                for import_path in import_paths:
-                    try:
-                        module = importlib.import_module(import_path)
-                        break
-                    except ImportError:
-                        continue
-                
-                if not module:
-                    continue
-                
-                # Look for classes that inherit from BaseProvider
-                for name, obj in inspect.getmembers(module, inspect.isclass):
-                    if (issubclass(obj, BaseProvider) and 
-                        obj != BaseProvider and 
-                        hasattr(obj, 'get_provider_name')):
-                        
-                        # Create a temporary instance to get the provider name
-                        try:
-                            temp_instance = obj({})
-                            provider_name = temp_instance.get_provider_name()
-                            self._providers[provider_name] = obj
-                        except Exception as e:
-                            print(f"Error registering provider in {module_name}: {e}")
-                            
+                found = scan_provider_module(os.path.join(providers_dir, filename))
+            except (OSError, SyntaxError) as e:
+                print(f"Could not scan provider module {module_name}: {e}")
+                continue
+            for name, class_name in found.items():
+                self._specs.setdefault(name, ProviderSpec(name, module_name, class_name, 'module'))
+    
+    def _ensure_entry_points(self):
+        """Add providers registered by installed packages (scanned at most once)."""
+        with self._lock:
+            if self._entry_points_loaded:
+                return
+            self._entry_points_loaded = True
+            try:
+                entry_points = _load_entry_points()
             except Exception as e:
-                print(f"Error processing provider module {module_name}: {e}")
+                print(f"Could not read provider entry points: {e}")
+                return
+            for ep in entry_points:
+                module, _, class_name = ep.value.partition(':')
+                self._specs.setdefault(ep.name, ProviderSpec(ep.name, module, class_name, 'entry_point'))
     
-    def _discover_filesystem_providers(self):
-        """Discover providers from filesystem (normal execution)."""
-        providers_dir = os.path.dirname(__file__)
-        
-        # Look for Python files in the providers directory
-        for filename in os.listdir(providers_dir):
-            if filename.endswith('.py') and not filename.startswith('_') and filename != 'base_provider.py':
-                module_name = filename[:-3]  # Remove .py extension
-                
-                try:
-                    # Import the module
-                    module = importlib.import_module(f'providers.{module_name}')
-                    
-                    # Look for classes that inherit from BaseProvider
-                    for name, obj in inspect.getmembers(module, inspect.isclass):
-                        if (issubclass(obj, BaseProvider) and 
-                            obj != BaseProvider and 
-                            hasattr(obj, 'get_provider_name')):
-                            
-                            # Create a temporary instance to get the provider name
-                            try:
-                                temp_instance = obj({})
-                                provider_name = temp_instance.get_provider_name()
-                                self._providers[provider_name] = obj
-                            except Exception as e:
-                                print(f"Error discovering provider in {module_name}: {e}")
-                                
-                except ImportError as e:
-                    print(f"Could not import provider module {module_name}: {e}")
-                except Exception as e:
-                    print(f"Error processing provider module {module_name}: {e}")
+    def register_provider(self, provider_name: str, provider_class: Type[BaseProvider]):
+        """Register an already imported provider class."""
+        with self._lock:
+            self._providers[provider_name] = provider_class
     
     def get_available_providers(self) -> List[str]:
         """Get list of available provider names."""
-        return list(self._providers.keys())
+        self._ensure_discovered()
+        self._ensure_entry_points()
+        return list(dict.fromkeys(list(self._specs) + list(self._providers)))
     
     def get_provider_class(self, provider_name: str) -> Optional[Type[BaseProvider]]:
-        """Get provider class by name."""
-        return self._providers.get(provider_name)
+        """Get provider class by name, importing its module on first use."""
+        with self._lock:
+            provider_class = self._providers.get(provider_name)
+            if provider_class:
+                return provider_class
+            
+            self._ensure_discovered()
+            spec = self._specs.get(provider_name)
+            if spec is None:
+                self._ensure_entry_points()
+                spec = self._specs.get(provider_name)
+            if spec is None:
+                return None
+            
+            try:
+                provider_class = spec.load()
+            except ImportError as e:
+                print(f"Could not import provider module {spec.module}: {e}")
+                return None
+            except Exception as e:
+                print(f"Error loading provider {provider_name}: {e}")
+                return None
+            self._providers[provider_name] = provider_class
+            return provider_class
     
     def create_provider(self, provider_name: str, config: Dict[str, Any]) -> Optional[BaseProvider]:
         """Create a provider instance with the given configuration."""
@@ -146,17 +231,46 @@ class ProviderFactory:
     def __init__(self):
         self.registry = ProviderRegistry()
         self._current_provider: Optional[BaseProvider] = None
+        self._lock = threading.Lock()
+        # provider name -> (connection fingerprint at creation, pooled instance)
+        self._instances: Dict[str, Tuple[str, BaseProvider]] = {}
     
     def get_available_providers(self) -> List[str]:
         """Get list of available provider names."""
         return self.registry.get_available_providers()
     
     def create_provider(self, provider_name: str, config: Dict[str, Any]) -> Optional[BaseProvider]:
-        """Create and validate a provider instance."""
-        provider = self.registry.create_provider(provider_name, config)
-        if provider and provider.validate_config():
-            return provider
-        return None
+        """
+        Get a validated provider instance for the given configuration.
+        
+        Instances are pooled per provider name: callers asking for the same
+        endpoint and credentials share one instance (and its HTTP clients).
+        A changed connection configuration replaces and closes the old one.
+        """
+        with self._lock:
+            cached = self._instances.get(provider_name)
+            if cached is not None:
+                created_fingerprint, provider = cached
+                if provider.connection_fingerprint(config) == created_fingerprint:
+                    provider.config = config
+                    return provider
+                del self._instances[provider_name]
+                provider.close()
+            
+            provider = self.registry.create_provider(provider_name, config)
+            if provider and provider.validate_config():
+                self._instances[provider_name] = (provider.connection_fingerprint(), provider)
+                return provider
+            return None
+    
+    def invalidate(self, provider_name: Optional[str] = None):
+        """Close and forget pooled provider instances (all of them if no name is given)."""
+        with self._lock:
+            names = [provider_name] if provider_name else list(self._instances)
+            for name in names:
+                cached = self._instances.pop(name, None)
+                if cached is not None:
+                    cached[1].close()
     
     def set_current_provider(self, provider: BaseProvider):
         """Set the current active provider."""
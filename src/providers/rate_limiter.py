@@ -0,0 +1,372 @@
+"""
+Per-provider request scheduling.
+
+A provider with `rate_limits` in its configuration owns a RateLimiter that
+every chat created from it shares (the interactive chat, /compare and batch
+runs). A request starts only when:
+
+- the requests-per-minute and tokens-per-minute buckets hold enough (tokens
+  are estimated up front from the prompt and max_tokens, then corrected with
+  the usage the API reports),
+- fewer than max_in_flight requests are running, and
+- any Retry-After sent with a 429 has passed.
+
+Waiting requests are queued per caller and callers take turns, so a batch
+run with many workers cannot starve the interactive chat. A request that
+gets a 429 before producing any output is retried (up to max_retries) once
+the delay the server asked for has passed.
+
+Example provider configuration:
+    "rate_limits": {"requests_per_minute": 60, "tokens_per_minute": 100000, "max_in_flight": 4}
+"""
+
+import time
+import threading
+from collections import OrderedDict, deque
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional
+
+from .base_provider import BaseChat, AsyncBaseChat
+
+DEFAULT_MAX_RETRIES = 2
+# Same rough estimate as the context window (about 4 characters per token)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_prompt_tokens(message: str, history: List[Dict[str, Any]]) -> int:
+    """Rough token count of a request's messages."""
+    chars = len(message) + sum(len(str(msg.get('content', ''))) for msg in history)
+    return chars // CHARS_PER_TOKEN + 1
+
+
+class TokenBucket:
+    """Refills at `per_minute` units a minute, holding at most `capacity`."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity or per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (more than capacity waits for a full bucket)."""
+        self._refill()
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def adjust(self, amount: float):
+        """Add (or with a negative amount, take) units; the level may go below zero."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Waiter:
+    """A request waiting for its turn; can be woken from any thread."""
+
+    def __init__(self, caller: str, tokens: int, loop=None):
+        self.caller = caller
+        self.tokens = tokens
+        self.granted = False
+        self.queued_at = time.monotonic()
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            import asyncio
+            self.event = asyncio.Event()
+
+    def wake(self):
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+
+class Reservation:
+    """A granted request slot; release it when the request has finished."""
+
+    def __init__(self, limiter: 'RateLimiter', tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+        self.released = False
+
+    def release(self, used_tokens: Optional[int] = None):
+        """
+        Free the slot.
+
+        Args:
+            used_tokens: Tokens the request actually used, to correct the estimate
+        """
+        if not self.released:
+            self.released = True
+            self.limiter._release(self, used_tokens)
+
+
+class RateLimiter:
+    """Token buckets, an in-flight limit and a fair queue for one provider."""
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, burst: Optional[float] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES):
+        """
+        Args:
+            requests_per_minute: Request rate limit (None for no limit)
+            tokens_per_minute: Prompt plus completion token rate limit (None for no limit)
+            max_in_flight: Most requests running at once (None for no limit)
+            burst: Requests that may start back to back (default: requests_per_minute)
+            max_retries: Retries of a request answered with a 429
+        """
+        self.requests = TokenBucket(requests_per_minute, burst) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+        # Waiting requests per caller; the first caller is served next
+        self._queues: 'OrderedDict[str, deque]' = OrderedDict()
+        self._stats = {'requests': 0, 'waited': 0, 'wait_time': 0.0, 'deferrals': 0}
+
+    @classmethod
+    def from_config(cls, limits: Dict[str, Any]) -> 'RateLimiter':
+        """Build a limiter from a provider's `rate_limits` settings."""
+        return cls(limits.get('requests_per_minute'), limits.get('tokens_per_minute'),
+                   limits.get('max_in_flight'), limits.get('burst'),
+                   limits.get('max_retries', DEFAULT_MAX_RETRIES))
+
+    def _delay(self, tokens: int) -> float:
+        delay = self.blocked_until - time.monotonic()
+        if self.requests:
+            delay = max(delay, self.requests.delay(1))
+        if self.tokens:
+            delay = max(delay, self.tokens.delay(tokens))
+        return max(delay, 0.0)
+
+    def _dispatch(self, current: Optional[_Waiter] = None) -> Optional[float]:
+        """
+        Start waiting requests in turn while the limits allow (call with the lock held).
+
+        Returns:
+            Seconds `current` should sleep before trying again, or None to sleep until woken
+        """
+        while self._queues:
+            caller, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+            if self.max_in_flight and self.in_flight >= self.max_in_flight:
+                return None
+            delay = self._delay(waiter.tokens)
+            if delay > 0:
+                if waiter is not current:
+                    # Have the next request in line check again once the buckets refill
+                    waiter.wake()
+                    return None
+                return delay
+
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(caller)
+            else:
+                del self._queues[caller]
+            if self.requests:
+                self.requests.adjust(-1)
+            if self.tokens:
+                self.tokens.adjust(-waiter.tokens)
+            self.in_flight += 1
+            waited = time.monotonic() - waiter.queued_at
+            self._stats['requests'] += 1
+            if waited > 0.001:
+                self._stats['waited'] += 1
+                self._stats['wait_time'] += waited
+            waiter.granted = True
+            waiter.wake()
+        return None
+
+    def _enqueue(self, waiter: _Waiter) -> Optional[float]:
+        with self._lock:
+            self._queues.setdefault(waiter.caller, deque()).append(waiter)
+            return self._dispatch(waiter)
+
+    def _retry(self, waiter: _Waiter) -> Optional[float]:
+        waiter.event.clear()
+        with self._lock:
+            return None if waiter.granted else self._dispatch(waiter)
+
+    def _abandon(self, waiter: _Waiter):
+        """Take a cancelled request out of the queue (or give back its slot)."""
+        with self._lock:
+            if waiter.granted:
+                self.in_flight -= 1
+                if self.tokens:
+                    self.tokens.adjust(waiter.tokens)
+            else:
+                queue = self._queues.get(waiter.caller)
+                if queue is not None and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[waiter.caller]
+            self._dispatch()
+
+    def acquire(self, caller: str = 'default', tokens: int = 1) -> Reservation:
+        """
+        Wait (blocking) until a request may start.
+
+        Args:
+            caller: Queue to wait in; queues take turns
+            tokens: Estimated tokens of the request
+        """
+        waiter = _Waiter(caller, tokens)
+        try:
+            delay = self._enqueue(waiter)
+            while not waiter.granted:
+                waiter.event.wait(delay)
+                delay = self._retry(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return Reservation(self, tokens)
+
+    async def acquire_async(self, caller: str = 'default', tokens: int = 1) -> Reservation:
+        """Wait (without blocking the event loop) until a request may start."""
+        import asyncio
+        waiter = _Waiter(caller, tokens, asyncio.get_running_loop())
+        try:
+            delay = self._enqueue(waiter)
+            while not waiter.granted:
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = self._retry(waiter)
+        except BaseException:
+            self._abandon(waiter)
+            raise
+        return Reservation(self, tokens)
+
+    def _release(self, reservation: Reservation, used_tokens: Optional[int]):
+        with self._lock:
+            self.in_flight -= 1
+            if self.tokens and used_tokens is not None:
+                self.tokens.adjust(reservation.tokens - used_tokens)
+            self._dispatch()
+
+    def defer(self, seconds: float):
+        """Hold back every request for `seconds` (a server's Retry-After)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self._stats['deferrals'] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Requests started, how many had to wait and for how long, and Retry-After deferrals."""
+        with self._lock:
+            return dict(self._stats, in_flight=self.in_flight,
+                        queued=sum(len(queue) for queue in self._queues.values()))
+
+
+class _RateLimitedChatMixin:
+    """Token accounting and retry decisions shared by the sync and async wrappers."""
+
+    def __init__(self, chat, limiter: RateLimiter, caller: str = 'chat'):
+        self.chat = chat
+        self.limiter = limiter
+        self.caller = caller
+
+    def _start(self, message: str, history: List[Dict[str, Any]], kwargs: Dict[str, Any]):
+        """Estimate (prompt, reserved) tokens and make sure usage gets reported."""
+        prompt_tokens = estimate_prompt_tokens(message, history)
+        kwargs.setdefault('usage', {})
+        return prompt_tokens, prompt_tokens + int(kwargs.get('max_tokens') or 0)
+
+    def _used(self, prompt_tokens: int, usage: Dict[str, Any], chars: int) -> int:
+        """Tokens a request used: as reported, or estimated from the reply."""
+        if usage.get('prompt_tokens') is not None or usage.get('completion_tokens') is not None:
+            return (usage.get('prompt_tokens') or 0) + (usage.get('completion_tokens') or 0)
+        return prompt_tokens + chars // CHARS_PER_TOKEN
+
+    def _should_retry(self, signal: Dict[str, Any], attempt: int) -> bool:
+        """Apply a Retry-After the provider reported; True if the request should be retried."""
+        delay = signal.get('retry_after')
+        if delay is None:
+            return False
+        self.limiter.defer(delay)
+        return attempt < self.limiter.max_retries
+
+
+class RateLimitedChat(_RateLimitedChatMixin, BaseChat):
+    """BaseChat wrapper that schedules requests through a RateLimiter."""
+
+    def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        prompt_tokens, reserved = self._start(message, history, kwargs)
+        attempt = 0
+        while True:
+            signal = kwargs['rate_limit'] = {}
+            reservation = self.limiter.acquire(self.caller, reserved)
+            response = ''
+            try:
+                response = self.chat.send_message(message, history, **kwargs)
+            finally:
+                reservation.release(self._used(prompt_tokens, kwargs['usage'], len(response or '')))
+            if not self._should_retry(signal, attempt):
+                return response
+            attempt += 1
+
+    def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
+        prompt_tokens, reserved = self._start(message, history, kwargs)
+        attempt = 0
+        while True:
+            signal = kwargs['rate_limit'] = {}
+            reservation = self.limiter.acquire(self.caller, reserved)
+            chars = 0
+            try:
+                for chunk in self.chat.send_message_stream(message, history, **kwargs):
+                    if not chars and 'retry_after' in signal and attempt < self.limiter.max_retries:
+                        # Rejected before any output: retry instead of showing the error
+                        break
+                    chars += len(chunk)
+                    yield chunk
+            finally:
+                reservation.release(self._used(prompt_tokens, kwargs['usage'], chars))
+            if not self._should_retry(signal, attempt) or chars:
+                return
+            attempt += 1
+
+
+class RateLimitedAsyncChat(_RateLimitedChatMixin, AsyncBaseChat):
+    """AsyncBaseChat wrapper that schedules requests through a RateLimiter."""
+
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        prompt_tokens, reserved = self._start(message, history, kwargs)
+        attempt = 0
+        while True:
+            signal = kwargs['rate_limit'] = {}
+            reservation = await self.limiter.acquire_async(self.caller, reserved)
+            response = ''
+            try:
+                response = await self.chat.send_message(message, history, **kwargs)
+            finally:
+                reservation.release(self._used(prompt_tokens, kwargs['usage'], len(response or '')))
+            if not self._should_retry(signal, attempt):
+                return response
+            attempt += 1
+
+    async def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        prompt_tokens, reserved = self._start(message, history, kwargs)
+        attempt = 0
+        while True:
+            signal = kwargs['rate_limit'] = {}
+            reservation = await self.limiter.acquire_async(self.caller, reserved)
+            chars = 0
+            try:
+                async for chunk in self.chat.send_message_stream(message, history, **kwargs):
+                    if not chars and 'retry_after' in signal and attempt < self.limiter.max_retries:
+                        break
+                    chars += len(chunk)
+                    yield chunk
+            finally:
+                reservation.release(self._used(prompt_tokens, kwargs['usage'], chars))
+            if not self._should_retry(signal, attempt) or chars:
+                return
+            attempt += 1
@@ -0,0 +1,307 @@
+"""
+Replay provider implementation.
+
+This provider needs no server or network access: replies come from recorded
+transcripts (saved RetroChat chats) or from a synthetic generator, streamed
+at a configurable token rate with optional jitter and injected failures.
+Timings and failures are derived from a seed and the request itself, so the
+same conversation replays the same way every time. Use it to measure the
+overhead of the rest of the application, or to reproduce latency problems,
+independently of model speed.
+"""
+
+import os
+import re
+import json
+import time
+import random
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional, Tuple
+
+from .base_provider import BaseProvider, BaseModelManager, BaseChat, AsyncBaseChat
+
+DEFAULT_MODELS = ["replay"]
+DEFAULT_CONTEXT_LENGTH = 32768
+DEFAULT_REPLY_TOKENS = 64
+INJECTED_FAILURE = "Injected replay failure"
+# Same rough estimate as the context window (about 4 characters per token)
+CHARS_PER_TOKEN = 4
+
+SYNTHETIC_WORDS = (
+    "the quick brown fox jumps over a lazy dog while models stream tokens to "
+    "terminals and chats are saved to disk in small appended records"
+).split()
+TOKEN_PATTERN = re.compile(r'\S+\s*|\s+')
+
+
+class ReplayError(Exception):
+    """Failure injected by the replay provider (with failure_mode 'raise')."""
+
+
+def _split_tokens(text: str) -> List[str]:
+    """Split text into word-sized chunks that join back to the original."""
+    return TOKEN_PATTERN.findall(text)
+
+
+def _read_messages(path: str) -> List[Dict[str, Any]]:
+    """Read the messages of a saved chat (.json list or .jsonl journal)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            data = json.load(f)
+            return data.get('messages', []) if isinstance(data, dict) else data
+        messages = []
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'role' in record:
+                messages.append(record)
+            elif 'length' in record:
+                # Journal rewind record
+                del messages[record['length']:]
+        return messages
+
+
+def load_transcripts(path: str) -> List[Tuple[str, str]]:
+    """
+    Load (user message, assistant reply) pairs from a chat file or a directory of chats.
+
+    Args:
+        path: A .json/.jsonl chat file or a directory holding them
+
+    Returns:
+        The exchanges in file and conversation order
+    """
+    if os.path.isdir(path):
+        files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                       if name.endswith(('.json', '.jsonl')))
+    else:
+        files = [path]
+
+    pairs = []
+    for file_path in files:
+        messages = _read_messages(file_path)
+        for previous, current in zip(messages, messages[1:]):
+            if previous.get('role') == 'user' and current.get('role') == 'assistant':
+                pairs.append((str(previous.get('content', '')), str(current.get('content', ''))))
+    return pairs
+
+
+class ReplayModelManager(BaseModelManager):
+    """Model manager listing the configured replay models."""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+
+    def get_models(self) -> List[Dict[str, Any]]:
+        context_length = self.config.get('context_length', DEFAULT_CONTEXT_LENGTH)
+        return [{'id': model, 'name': model, 'context_length': context_length, 'owned_by': 'replay'}
+                for model in self.config.get('models') or DEFAULT_MODELS]
+
+    def get_model_info(self, model_id: str) -> Dict[str, Any]:
+        for model in self.get_models():
+            if model['id'] == model_id:
+                return model
+        return {}
+
+    def get_cached_model_info(self, model_id: str) -> Dict[str, Any]:
+        # The catalog comes from the configuration, so nothing is fetched
+        return self.get_model_info(model_id)
+
+
+class ReplayPlan:
+    """The tokens of one reply, the delay before each and where it fails (if it does)."""
+
+    def __init__(self, tokens: List[str], delays: List[float], fail_at: Optional[int], usage: Dict[str, int]):
+        self.tokens = tokens
+        self.delays = delays
+        self.fail_at = fail_at
+        self.usage = usage
+
+
+class ReplayChat(BaseChat):
+    """Chat implementation that replays transcripts or synthetic replies."""
+
+    def __init__(self, provider: 'ReplayProvider'):
+        self.provider = provider
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        return self.provider.config
+
+    def _plan(self, message: str, history: List[Dict[str, Any]], **kwargs) -> ReplayPlan:
+        """Work out the reply, its timing and any failure for a request."""
+        config = self.config
+        seed = config.get('seed', 0)
+        rng = random.Random(f"{seed}:{len(history)}:{message}")
+
+        pairs = self.provider.get_transcripts()
+        if pairs:
+            replies = [reply for prompt, reply in pairs if prompt == message]
+            reply = rng.choice(replies) if replies else pairs[rng.randrange(len(pairs))][1]
+            tokens = _split_tokens(reply)
+        else:
+            count = int(config.get('reply_tokens', DEFAULT_REPLY_TOKENS))
+            tokens = [rng.choice(SYNTHETIC_WORDS) + ' ' for _ in range(count)]
+        max_tokens = kwargs.get('max_tokens', config.get('max_tokens'))
+        if max_tokens:
+            tokens = tokens[:int(max_tokens)]
+
+        token_rate = float(config.get('token_rate', 0) or 0)
+        jitter = float(config.get('jitter', 0) or 0)
+
+        def jittered(delay):
+            return max(delay * (1 + rng.uniform(-jitter, jitter)), 0.0) if delay else 0.0
+
+        interval = 1.0 / token_rate if token_rate else 0.0
+        delays = [jittered(interval) for _ in tokens]
+        if delays:
+            delays[0] += jittered(float(config.get('latency', 0) or 0))
+
+        fail_at = None
+        if rng.random() < float(config.get('failure_rate', 0) or 0):
+            fail_at = rng.randrange(len(tokens) + 1)
+
+        prompt_chars = len(message) + sum(len(str(msg.get('content', ''))) for msg in history)
+        usage = {'prompt_tokens': prompt_chars // CHARS_PER_TOKEN + 1, 'completion_tokens': 0}
+        return ReplayPlan(tokens, delays, fail_at, usage)
+
+    def _fail(self, plan: ReplayPlan, kwargs: Dict[str, Any]) -> str:
+        """Raise or describe an injected failure, depending on failure_mode."""
+        self._report_usage(plan, kwargs)
+        if self.config.get('failure_mode', 'error') == 'raise':
+            raise ReplayError(INJECTED_FAILURE)
+        return f"Error: {INJECTED_FAILURE}"
+
+    def _report_usage(self, plan: ReplayPlan, kwargs: Dict[str, Any]):
+        target = kwargs.get('usage')
+        if target is not None:
+            target.update(plan.usage)
+
+    def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        """Replay a whole reply after the time streaming it would take."""
+        plan = self._plan(message, history, **kwargs)
+        end = plan.fail_at if plan.fail_at is not None else len(plan.tokens)
+        time.sleep(sum(plan.delays[:end]))
+        plan.usage['completion_tokens'] = end
+        if plan.fail_at is not None:
+            return self._fail(plan, kwargs)
+        self._report_usage(plan, kwargs)
+        return ''.join(plan.tokens)
+
+    def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
+        """Replay a reply token by token."""
+        plan = self._plan(message, history, **kwargs)
+        for i, (token, delay) in enumerate(zip(plan.tokens, plan.delays)):
+            if i == plan.fail_at:
+                yield self._fail(plan, kwargs)
+                return
+            if delay:
+                time.sleep(delay)
+            plan.usage['completion_tokens'] = i + 1
+            yield token
+        if plan.fail_at is not None:
+            yield self._fail(plan, kwargs)
+            return
+        self._report_usage(plan, kwargs)
+
+
+class ReplayAsyncChat(AsyncBaseChat):
+    """Asynchronous replay chat; delays are awaited instead of slept."""
+
+    def __init__(self, chat: ReplayChat):
+        self.chat = chat
+
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        """Replay a whole reply after the time streaming it would take."""
+        import asyncio
+        plan = self.chat._plan(message, history, **kwargs)
+        end = plan.fail_at if plan.fail_at is not None else len(plan.tokens)
+        await asyncio.sleep(sum(plan.delays[:end]))
+        plan.usage['completion_tokens'] = end
+        if plan.fail_at is not None:
+            return self.chat._fail(plan, kwargs)
+        self.chat._report_usage(plan, kwargs)
+        return ''.join(plan.tokens)
+
+    async def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        """Replay a reply token by token."""
+        import asyncio
+        plan = self.chat._plan(message, history, **kwargs)
+        for i, (token, delay) in enumerate(zip(plan.tokens, plan.delays)):
+            if i == plan.fail_at:
+                yield self.chat._fail(plan, kwargs)
+                return
+            # Always yield to the loop so concurrent replays interleave
+            await asyncio.sleep(delay)
+            plan.usage['completion_tokens'] = i + 1
+            yield token
+        if plan.fail_at is not None:
+            yield self.chat._fail(plan, kwargs)
+            return
+        self.chat._report_usage(plan, kwargs)
+
+
+class ReplayProvider(BaseProvider):
+    """Offline provider that replays transcripts or synthetic replies."""
+
+    def __init__(self, config: Dict[str, Any]):
+        super().__init__(config)
+        self._transcripts = None
+        self._transcripts_path = None
+
+    def get_provider_name(self) -> str:
+        return "replay"
+
+    def get_required_config_keys(self) -> List[str]:
+        return []
+
+    def get_optional_config_keys(self) -> List[str]:
+        return ["default_model", "system_prompt", "stream", "max_tokens", "context_budget", "context_turns",
+                "response_cache", "rate_limits", "transcripts", "models", "context_length", "reply_tokens",
+                "token_rate", "latency", "jitter", "failure_rate", "failure_mode", "seed"]
+
+    def get_connection_config_keys(self) -> List[str]:
+        return ["transcripts"]
+
+    def validate_config(self) -> bool:
+        """Validate replay configuration."""
+        transcripts = self.config.get('transcripts')
+        if transcripts and not os.path.exists(transcripts):
+            print(f"Replay transcripts not found: {transcripts}")
+            return False
+
+        failure_mode = self.config.get('failure_mode', 'error')
+        if failure_mode not in ('error', 'raise'):
+            print("failure_mode must be 'error' or 'raise'")
+            return False
+
+        return True
+
+    def get_transcripts(self) -> List[Tuple[str, str]]:
+        """The recorded exchanges, loaded on first use (empty when replies are synthetic)."""
+        path = self.config.get('transcripts')
+        if path != self._transcripts_path:
+            self._transcripts = load_transcripts(path) if path else []
+            self._transcripts_path = path
+        return self._transcripts
+
+    def test_connection(self) -> bool:
+        """Check that the transcripts (if any) can be read."""
+        try:
+            self.get_transcripts()
+            return True
+        except Exception as e:
+            print(f"Replay transcripts could not be read: {e}")
+            return False
+
+    def create_model_manager(self) -> BaseModelManager:
+        """Create replay model manager."""
+        return ReplayModelManager(self.config)
+
+    def create_chat(self) -> BaseChat:
+        """Create replay chat."""
+        return ReplayChat(self)
+
+    def create_async_chat(self) -> AsyncBaseChat:
+        """Create replay async chat."""
+        return ReplayAsyncChat(ReplayChat(self))
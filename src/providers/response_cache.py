@@ -0,0 +1,273 @@
+"""
+Opt-in response cache for provider chats.
+
+A reply is cached under a hash of the provider, model, sampling parameters
+(temperature, top_p, max_tokens) and the rolling fingerprint of the exact
+message list sent (see src/core/history.py), so asking the same thing of the
+same model with the same history is answered without a new generation.
+Entries live in an in-memory LRU and in `cache/responses/` on disk, which is
+trimmed (least recently used first) to a size limit. Streamed replies keep
+their chunks and are replayed as a stream.
+
+Enable it per provider with `"response_cache": true` in config.json.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional
+
+from src.utils.file_utils import atomic_write_text
+from src.core.history import ConversationHistory, fingerprint_messages
+from .base_provider import BaseChat, AsyncBaseChat, build_completion_params, build_chat_messages
+from .model_catalog import DEFAULT_CACHE_DIR
+
+DEFAULT_RESPONSE_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'responses')
+DEFAULT_MEMORY_ENTRIES = 128
+DEFAULT_MAX_DISK_BYTES = 64 * 1024 * 1024
+KEY_PARAMS = ('model', 'temperature', 'top_p', 'max_tokens')
+
+
+def response_key(provider_name: str, config: Dict[str, Any], message: str,
+                 history: List[Dict[str, Any]], **kwargs) -> str:
+    """
+    Hash of everything that determines a reply: provider, model, sampling parameters and messages.
+
+    The messages enter as their rolling fingerprint, which a ConversationHistory
+    provides in O(1); other lists are fingerprinted message by message.
+    """
+    kwargs.pop('usage', None)
+    params = build_completion_params(config, '', [], stream=False, **kwargs)
+    key = {name: params.get(name) for name in KEY_PARAMS}
+    system_prompt = config.get('system_prompt')
+    if isinstance(history, ConversationHistory):
+        messages = history.request_fingerprint(message, system_prompt)
+    else:
+        messages = fingerprint_messages(build_chat_messages(message, history, system_prompt))
+    key['messages'] = f"{len(history)}:{messages:016x}"
+    key['provider'] = provider_name
+    data = json.dumps(key, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier (memory LRU and size-bounded disk) store of replies."""
+
+    def __init__(self, cache_dir: str = DEFAULT_RESPONSE_CACHE_DIR, memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._disk_bytes = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a reply.
+
+        Returns:
+            Dictionary with the reply's chunks and usage, or None on a miss
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry
+
+            path = self._path(key)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                # The file's mtime is its last use, for LRU eviction on disk
+                os.utime(path)
+            except (OSError, ValueError):
+                self._stats['misses'] += 1
+                return None
+            self._remember(key, entry)
+            self._stats['hits'] += 1
+            self._stats['disk_hits'] += 1
+            return entry
+
+    def put(self, key: str, chunks: List[str], usage: Optional[Dict[str, Any]] = None):
+        """Store a finished reply in memory and on disk."""
+        entry = {'chunks': list(chunks), 'usage': dict(usage or {}), 'created': time.time()}
+        with self._lock:
+            self._remember(key, entry)
+            self._stats['stores'] += 1
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                path = self._path(key)
+                previous = os.path.getsize(path) if os.path.exists(path) else 0
+                text = json.dumps(entry)
+                atomic_write_text(path, text)
+                self._disk_usage()
+                self._disk_bytes += len(text.encode('utf-8')) - previous
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict(keep=key)
+            except OSError as e:
+                print(f"Could not write response cache entry: {e}")
+
+    def _disk_usage(self) -> int:
+        """Total size of the disk tier, measured once and then tracked."""
+        if self._disk_bytes is None:
+            self._disk_bytes = sum(entry.stat().st_size for entry in self._entries())
+        return self._disk_bytes
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self.cache_dir) if entry.name.endswith('.json')]
+        except FileNotFoundError:
+            return []
+
+    def _evict(self, keep: str):
+        """Remove least recently used files until the disk tier fits its size limit again."""
+        entries = sorted(self._entries(), key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._disk_bytes <= self.max_disk_bytes:
+                break
+            if entry.name == f"{keep}.json":
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._disk_bytes -= size
+            self._stats['evictions'] += 1
+
+    def clear(self):
+        """Remove every cached reply."""
+        with self._lock:
+            self._memory.clear()
+            for entry in self._entries():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Cache metrics.
+
+        Returns:
+            Dictionary with hits, disk_hits, misses, stores, evictions,
+            memory_entries and disk_bytes
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['disk_bytes'] = self._disk_usage()
+        return stats
+
+
+def _is_error(chunks: List[str]) -> bool:
+    return bool(chunks) and chunks[-1].startswith('Error:')
+
+
+class _CachingChatMixin:
+    """Key computation and lookup shared by the sync and async wrappers."""
+
+    def __init__(self, chat, cache: ResponseCache, provider_name: str, config: Dict[str, Any]):
+        self.chat = chat
+        self.cache = cache
+        self.provider_name = provider_name
+        self.config = config
+
+    def _key(self, message: str, history: List[Dict[str, Any]], kwargs: Dict[str, Any]) -> Optional[str]:
+        try:
+            return response_key(self.provider_name, self.config, message, history, **kwargs)
+        except ValueError:
+            # No model configured: let the provider report it
+            return None
+
+    def _lookup(self, key: Optional[str], kwargs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Cached entry for key, copying its token usage into the caller's usage dict."""
+        entry = self.cache.get(key) if key else None
+        if entry is not None and kwargs.get('usage') is not None:
+            kwargs['usage'].update(entry.get('usage', {}))
+        return entry
+
+    def _store(self, key: Optional[str], chunks: List[str], usage: Dict[str, Any]):
+        # Only complete, successful replies are cached
+        if key and chunks and not _is_error(chunks):
+            self.cache.put(key, chunks, usage)
+
+
+class CachingChat(_CachingChatMixin, BaseChat):
+    """BaseChat wrapper that answers repeated requests from a ResponseCache."""
+
+    def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        key = self._key(message, history, kwargs)
+        entry = self._lookup(key, kwargs)
+        if entry is not None:
+            return ''.join(entry['chunks'])
+
+        usage = kwargs.setdefault('usage', {})
+        response = self.chat.send_message(message, history, **kwargs)
+        self._store(key, [response] if response else [], usage)
+        return response
+
+    def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> Iterator[str]:
+        key = self._key(message, history, kwargs)
+        entry = self._lookup(key, kwargs)
+        if entry is not None:
+            yield from entry['chunks']
+            return
+
+        usage = kwargs.setdefault('usage', {})
+        chunks = []
+        for chunk in self.chat.send_message_stream(message, history, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        # Not reached when the consumer stops early, so cut-off replies are not cached
+        self._store(key, chunks, usage)
+
+
+class CachingAsyncChat(_CachingChatMixin, AsyncBaseChat):
+    """AsyncBaseChat wrapper that answers repeated requests from a ResponseCache."""
+
+    async def send_message(self, message: str, history: List[Dict[str, Any]], **kwargs) -> str:
+        key = self._key(message, history, kwargs)
+        entry = self._lookup(key, kwargs)
+        if entry is not None:
+            return ''.join(entry['chunks'])
+
+        usage = kwargs.setdefault('usage', {})
+        response = await self.chat.send_message(message, history, **kwargs)
+        self._store(key, [response] if response else [], usage)
+        return response
+
+    async def send_message_stream(self, message: str, history: List[Dict[str, Any]], **kwargs) -> AsyncIterator[str]:
+        key = self._key(message, history, kwargs)
+        entry = self._lookup(key, kwargs)
+        if entry is not None:
+            for chunk in entry['chunks']:
+                yield chunk
+            return
+
+        usage = kwargs.setdefault('usage', {})
+        chunks = []
+        async for chunk in self.chat.send_message_stream(message, history, **kwargs):
+            chunks.append(chunk)
+            yield chunk
+        self._store(key, chunks, usage)
+
+
+# Global cache shared by every provider that enables it
+response_cache = ResponseCache()
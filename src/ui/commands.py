@@ -2,18 +2,23 @@
 Command handlers for RetroChat slash commands.
 """
 import os
-import re
 import sys
 from typing import List
 
-# Add parent directories to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+# Add the project root to the path so the src package resolves when imported directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
-from core.config_manager import ConfigManager
-from core.model_manager import ModelManager
-from core.chat import Chat
-from core.chat_manager import ChatManager
-from utils.terminal_colors import yellow_text
+# Imported through src like main.py does, so these are the same modules (and
+# singletons) the rest of the application uses rather than second copies
+from src.core.config_manager import ConfigManager
+from src.core.model_manager import ModelManager
+from src.core.chat import Chat
+from src.core.chat_manager import ChatManager
+from src.core.telemetry import format_stats
+from src.core.history import ConversationHistory
+from src.core.session_manager import SessionManager
+from src.providers.response_cache import response_cache
+from src.utils.terminal_colors import yellow_text
 
 def display_chat_history(history, show_all=True, max_recent=10):
     """Display chat history with proper formatting."""
@@ -41,24 +46,6 @@ def display_chat_history(history, show_all=True, max_recent=10):
             print(f"[{i}] [{role}] {content}")
     print("---------------------------")
 
-def generate_chat_id():
-    """Generate a unique chat ID."""
-    chats_dir = 'chats'
-    if not os.path.exists(chats_dir):
-        os.makedirs(chats_dir)
-    existing = set()
-    pattern = re.compile(r'^chat_(\d+)$')
-    for fname in os.listdir(chats_dir):
-        if fname.endswith('.json'):
-            base = fname[:-5]
-            m = pattern.match(base)
-            if m:
-                existing.add(int(m.group(1)))
-    n = 1
-    while n in existing:
-        n += 1
-    return f'chat_{n}'
-
 class CommandHandlers:
     """Collection of command handler functions."""
     
@@ -68,9 +55,23 @@ class CommandHandlers:
         self.model_manager = model_manager
         self.chat = chat
         self.chat_manager = chat_manager
+        # Recently used chats stay in memory, so switching back to one doesn't reload it
+        self.sessions = SessionManager.from_config(chat_manager, config_manager)
         self.current_chat = None
         self.history = []
     
+    @property
+    def history(self) -> ConversationHistory:
+        """The current chat's messages, kept as a ConversationHistory for O(1) fingerprints."""
+        return self._history
+    
+    @history.setter
+    def history(self, messages: List):
+        if self.current_chat is not None:
+            self._history = self.sessions.put(self.current_chat, messages)
+        else:
+            self._history = messages if isinstance(messages, ConversationHistory) else ConversationHistory(messages)
+    
     def set_current_chat(self, chat_name: str, history: List):
         """Set the current chat and history."""
         self.current_chat = chat_name
@@ -136,7 +137,7 @@ class CommandHandlers:
     
     def cmd_chat_new(self):
         """Start a new chat session"""
-        self.current_chat = generate_chat_id()
+        self.current_chat = self.chat_manager.generate_chat_id()
         self.history = []
         print(f"Started new chat: {self.current_chat}")
         return True
@@ -147,8 +148,10 @@ class CommandHandlers:
             if ' ' in chat_name:
                 print("Chat name cannot contain spaces.")
             else:
-                self.chat_manager.save_chat(chat_name, self.history)
+                if self.current_chat is not None:
+                    self.sessions.rename(self.current_chat, chat_name)
                 self.current_chat = chat_name
+                self.sessions.save(chat_name, self.history)
                 print(f"Chat saved as {chat_name}")
         except Exception:
             print("Invalid command. Use /chat save <chat_name>")
@@ -157,10 +160,9 @@ class CommandHandlers:
     def cmd_chat_load(self, chat_name):
         """Load a previously saved chat"""
         try:
-            loaded_history = self.chat_manager.load_chat(chat_name)
+            loaded_history = self.sessions.get(chat_name)
             if loaded_history:
-                self.history = loaded_history
-                self.current_chat = chat_name
+                self.set_current_chat(chat_name, loaded_history)
                 print(f"Chat {chat_name} loaded.")
                 display_chat_history(self.history, show_all=True)
             else:
@@ -172,11 +174,11 @@ class CommandHandlers:
     def cmd_chat_delete(self, chat_name):
         """Delete a saved chat"""
         try:
+            self.sessions.discard(chat_name)
             if self.chat_manager.delete_chat(chat_name):
                 print(f"Chat {chat_name} deleted.")
                 if self.current_chat == chat_name:
-                    self.current_chat = generate_chat_id()
-                    self.history = []
+                    self.set_current_chat(self.chat_manager.generate_chat_id(), [])
             else:
                 print("Chat not found.")
         except Exception:
@@ -194,12 +196,136 @@ class CommandHandlers:
             print("No chats found.")
         return True
     
+    def cmd_chat_search(self, query):
+        """Search the messages of all saved chats"""
+        try:
+            hits = self.chat_manager.search_chats(query)
+            if not hits:
+                print(f"No messages found matching '{query}'.")
+                return True
+            print(f"Top {len(hits)} matches for '{query}':")
+            for hit in hits:
+                print(f"  {hit['chat_name']} [#{hit['position'] + 1} {hit['role']}] {hit['snippet']}")
+            print("Use /chat load <chat_name> to open a chat.")
+        except Exception as e:
+            print(f"Error searching chats: {e}")
+        return True
+    
+    def cmd_chat_cache(self):
+        """Show the chats held in memory and what they cost"""
+        stats = self.sessions.stats()
+        print(f"Chat cache: {stats['sessions']} chats, {stats['messages']} of {stats['max_messages']} messages, "
+              f"{stats['bytes'] / 1024:.0f} of {stats['max_bytes'] / 1024:.0f} KB")
+        print(f"{stats['hits']} hits, {stats['misses']} loaded from storage, {stats['evictions']} evicted "
+              f"({stats['writebacks']} saved on the way out)")
+        for session in self.sessions.sessions():
+            marker = "*" if session['name'] == self.current_chat else " "
+            unsaved = ", unsaved" if session['dirty'] else ""
+            print(f"{marker} {session['name']}: {session['messages']} messages, "
+                  f"{session['bytes'] / 1024:.1f} KB{unsaved}")
+        return True
+    
     def cmd_chat_reset(self):
         """Clear the current chat's conversation history"""
         self.history = []
         print("Current chat history cleared.")
         return True
     
+    def recover_interrupted_replies(self):
+        """Offer to show, resume, keep or discard replies cut off by a crash or interrupt"""
+        for reply in self.chat_manager.interrupted_replies():
+            chat_name = reply['chat_name']
+            print(f"Interrupted reply in chat {chat_name} ({reply['model']}, started {reply['started']}): "
+                  f"{len(reply['text'])} characters received.")
+            while True:
+                choice = input("[s]how, [r]esume, [k]eep as is or [d]iscard? ").strip().lower()
+                if choice in ("s", "show"):
+                    display_chat_history([{"role": "user", "content": reply['message']},
+                                          {"role": "assistant", "content": reply['text']}])
+                elif choice in ("r", "resume"):
+                    if chat_name != self.current_chat:
+                        self.set_current_chat(chat_name, self.sessions.get(chat_name) or [])
+                        print(f"Switched to chat {chat_name}.")
+                    self.chat.resume_reply(reply['message'], reply['text'], self.history)
+                    self.sessions.save(self.current_chat)
+                    break
+                elif choice in ("k", "keep"):
+                    history = self.sessions.put(chat_name, self.chat_manager.keep_partial_reply(reply), saved=True)
+                    if chat_name == self.current_chat:
+                        self.history = history
+                    print(f"Partial reply added to chat {chat_name}.")
+                    break
+                elif choice in ("d", "discard"):
+                    self.chat_manager.discard_partial_reply(chat_name)
+                    print("Partial reply discarded.")
+                    break
+                else:
+                    print("Invalid selection.")
+        return True
+    
+    def cmd_compare(self, args):
+        """Send one prompt to several models at once and compare their latency"""
+        try:
+            models_spec, prompt = args.split(" ", 1)
+        except ValueError:
+            print("Invalid command. Use /compare <model1,model2,...> <prompt>")
+            return True
+        
+        # Imported here so asyncio is not loaded at startup
+        from src.core.compare import ModelComparison, parse_targets, format_summary
+        targets = parse_targets(models_spec, self.config_manager)
+        if not targets:
+            print("Invalid command. Use /compare <model1,model2,...> <prompt>")
+            return True
+        
+        print(f"Comparing {len(targets)} models...")
+        comparison = ModelComparison(self.config_manager)
+        try:
+            results = self.chat.run_async(comparison.run(targets, prompt, self.history))
+        except Exception as e:
+            print(f"Error running comparison: {e}")
+            return True
+        
+        wall_time = max((r['total'] or 0.0) for r in results)
+        print()
+        print(format_summary(results, wall_time))
+        return True
+    
+    def cmd_stats(self):
+        """Show latency, throughput and error statistics of recent requests"""
+        telemetry = self.chat.telemetry
+        if telemetry is None:
+            print("Telemetry is disabled. Set \"telemetry\": true in config.json to enable it.")
+        else:
+            summary = telemetry.summary()
+            if summary:
+                print(f"Last {sum(entry['requests'] for entry in summary)} requests:")
+                print(format_stats(summary))
+            else:
+                print("No requests recorded yet.")
+        
+        if self.config_manager.get_current_provider_config().get('response_cache'):
+            cache = response_cache.stats()
+            print(f"Response cache: {cache['hits']} hits ({cache['disk_hits']} from disk), {cache['misses']} misses, "
+                  f"{cache['memory_entries']} in memory, {cache['disk_bytes'] / 1024:.0f} KB on disk")
+
+        if self.config_manager.get_current_provider_config().get('rate_limits'):
+            provider = self.chat.provider
+            limiter = provider.rate_limiter if provider else None
+            if limiter:
+                limits = limiter.stats()
+                avg_wait = limits['wait_time'] / limits['waited'] if limits['waited'] else 0.0
+                print(f"Rate limits: {limits['requests']} requests started, {limits['waited']} waited "
+                      f"(avg {avg_wait:.2f}s), {limits['deferrals']} Retry-After deferrals, "
+                      f"{limits['in_flight']} in flight, {limits['queued']} queued")
+
+        write_stats = self.chat_manager.write_stats()
+        if write_stats:
+            print(f"Chat saves: {write_stats['writes']} written, {write_stats['coalesced']} coalesced, "
+                  f"{write_stats['errors']} failed, queue depth {write_stats['queue_depth']}, "
+                  f"avg {write_stats['avg_latency_ms']:.1f}ms, max {write_stats['max_latency_ms']:.1f}ms")
+        return True
+    
     def cmd_help(self, cmd_registry):
         """Show this help message with all available commands"""
         print("Available commands:")
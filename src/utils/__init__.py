@@ -5,10 +5,16 @@ This package contains utility functions used throughout the application.
 """
 
 from .terminal_colors import yellow_text, colored_text, Colors, save_config
+from .file_utils import atomic_write_text
+from .startup_profile import StartupProfiler
+from .stream_renderer import StreamRenderer
 
 __all__ = [
     'yellow_text',
     'colored_text', 
     'Colors',
-    'save_config'
+    'save_config',
+    'atomic_write_text',
+    'StartupProfiler',
+    'StreamRenderer'
 ]
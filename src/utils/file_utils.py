@@ -0,0 +1,23 @@
+"""
+File helpers shared by the persistence layers.
+"""
+import os
+import tempfile
+
+
+def atomic_write_text(path, text, encoding='utf-8'):
+    """Write text to path atomically (temp file in the same directory + rename)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix=os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding) as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,41 @@
+"""
+Startup timing for `rchat --startup-profile`.
+"""
+import sys
+import time
+from contextlib import contextmanager
+
+# Heavy modules that should only be loaded once a provider is actually used
+DEFERRED_MODULES = ('openai', 'requests', 'asyncio')
+
+
+class StartupProfiler:
+    """Records the wall time and number of newly imported modules of each startup phase."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as one named phase."""
+        modules_before = len(sys.modules)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start, len(sys.modules) - modules_before))
+
+    def format_phase(self, name, seconds, modules):
+        """Format one phase as a table row."""
+        return f"  {name:<30} {seconds * 1000:>8.1f}ms {modules:>8}"
+
+    def report(self):
+        """Breakdown of all recorded phases and the total time to the prompt."""
+        lines = ["Startup profile:", f"  {'Phase':<30} {'Time':>10} {'Modules':>8}"]
+        for name, seconds, modules in self.phases:
+            lines.append(self.format_phase(name, seconds, modules))
+        lines.append(self.format_phase("Total to prompt", time.perf_counter() - self.started, len(sys.modules)))
+        loaded = [module for module in DEFERRED_MODULES if module in sys.modules]
+        lines.append(f"  Deferred modules already loaded: {', '.join(loaded) or 'none'}")
+        return '\n'.join(lines)
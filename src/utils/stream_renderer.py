@@ -0,0 +1,74 @@
+"""
+Terminal output for streamed responses.
+
+Writing every chunk separately costs a color check, an escape sequence and a
+flush per token. StreamRenderer uses the color support detected once per
+stream and coalesces chunks into frames, writing when a line completes or
+when at least one frame interval has passed since the last write.
+"""
+import sys
+import time
+
+from .terminal_colors import Colors
+
+# Minimum time between writes (about 60 frames per second)
+FRAME_INTERVAL = 0.016
+# Write anyway once this much text is pending
+MAX_PENDING_CHARS = 4096
+
+
+class StreamRenderer:
+    """Coalescing, optionally colored writer for one streamed response."""
+
+    def __init__(self, stream=None, color=None, interval=FRAME_INTERVAL):
+        """
+        Args:
+            stream: Output stream (defaults to sys.stdout)
+            color: ANSI color code, False for plain output, or None to use
+                yellow when the stream is a color terminal
+            interval: Minimum seconds between writes
+        """
+        self.stream = stream or sys.stdout
+        if color is None:
+            color = Colors.YELLOW if Colors.supports_color(self.stream) else False
+        self.color = color or ''
+        self.interval = interval
+        self._pending = []
+        self._pending_chars = 0
+        self._last_write = 0.0
+
+    def write(self, chunk):
+        """Queue a chunk, writing the pending text if a frame is due."""
+        if not chunk:
+            return
+        self._pending.append(chunk)
+        self._pending_chars += len(chunk)
+        now = time.monotonic()
+        if ('\n' in chunk or now - self._last_write >= self.interval
+                or self._pending_chars >= MAX_PENDING_CHARS):
+            self.flush(now)
+
+    def flush(self, now=None):
+        """Write all pending text to the stream."""
+        if not self._pending:
+            return
+        text = ''.join(self._pending)
+        self._pending = []
+        self._pending_chars = 0
+        if self.color:
+            text = f"{self.color}{text}{Colors.RESET}"
+        self.stream.write(text)
+        self.stream.flush()
+        self._last_write = now if now is not None else time.monotonic()
+
+    def finish(self, end='\n'):
+        """Write the remaining text followed by end."""
+        self.flush()
+        if end:
+            self.stream.write(end)
+            self.stream.flush()
+
+    def render(self, text, end='\n'):
+        """Write a complete (non-streamed) response."""
+        self.write(text)
+        self.finish(end)
@@ -1,24 +1,46 @@
 import json
 import sys
 import os
+import weakref
+
+from .file_utils import atomic_write_text
+
+# Color support of every stream checked so far, so per-chunk calls don't repeat the checks
+_color_support = weakref.WeakKeyDictionary()
 
 # ANSI color codes
 class Colors:
     YELLOW = '\033[93m'
     RESET = '\033[0m'
     
+    _windows_ansi_enabled = None
+    
     @staticmethod
-    def supports_color():
-        """Check if the terminal supports ANSI color codes"""
+    def supports_color(stream=None):
+        """Check if the terminal supports ANSI color codes (cached per output stream)"""
+        stream = stream or sys.stdout
+        try:
+            return _color_support[stream]
+        except (KeyError, TypeError):
+            pass
         # Check if we're on Windows and enable color support
         if os.name == 'nt':
-            try:
-                # Enable ANSI escape sequences on Windows 10+
-                os.system('color')
-                return True
-            except:
-                return False
-        return hasattr(sys.stdout, 'isatty') and sys.stdout.isatty()
+            if Colors._windows_ansi_enabled is None:
+                try:
+                    # Enable ANSI escape sequences on Windows 10+
+                    os.system('color')
+                    Colors._windows_ansi_enabled = True
+                except:
+                    Colors._windows_ansi_enabled = False
+            result = Colors._windows_ansi_enabled
+        else:
+            result = hasattr(stream, 'isatty') and stream.isatty()
+        try:
+            _color_support[stream] = result
+        except TypeError:
+            # Streams that can't be weakly referenced are checked every time
+            pass
+        return result
 
 def colored_text(text, color):
     """Return colored text if terminal supports it, otherwise plain text"""
@@ -30,6 +52,5 @@ def yellow_text(text):
     """Return yellow colored text"""
     return colored_text(text, Colors.YELLOW)
 
-def save_config(config):
-    with open("config.json", "w") as f:
-        json.dump(config, f, indent=2)
+def save_config(config, config_path="config.json"):
+    atomic_write_text(config_path, json.dumps(config, indent=2))
@@ -0,0 +1,97 @@
+"""
+Tests for batch mode.
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.config_manager import ConfigManager
+from src.core.batch import BatchRunner, load_prompts, completed_indexes
+
+
+def make_config(tmp_path, **replay):
+    path = tmp_path / "config.json"
+    settings = {'default_model': 'replay', 'stream': True, 'reply_tokens': 5, 'token_rate': 200, 'seed': 3}
+    settings.update(replay)
+    path.write_text(json.dumps({'current_provider': 'replay', 'providers': {'replay': settings}}))
+    return ConfigManager(str(path))
+
+
+def write_prompts(path, items):
+    path.write_text(''.join((item if isinstance(item, str) else json.dumps(item)) + '\n' for item in items))
+
+
+def read_results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_runs_prompts_concurrently_into_indexed_results(tmp_path):
+    config = make_config(tmp_path)
+    prompts = tmp_path / "prompts.jsonl"
+    write_prompts(prompts, [
+        {'id': 'a', 'prompt': 'first', 'max_tokens': 2},
+        {'id': 'b', 'prompt': 'second', 'model': 'other', 'system_prompt': 'Be brief.',
+         'history': [{'role': 'user', 'content': 'q'}, {'role': 'assistant', 'content': 'a'}]},
+        'not json',
+        {'id': 'd'},
+    ])
+    output = tmp_path / "out" / "results.jsonl"
+
+    runner = BatchRunner(config, concurrency=3, echo=False)
+    summary = asyncio.run(runner.run(load_prompts(str(prompts)), str(output)))
+    assert (summary['succeeded'], summary['failed']) == (2, 2)
+
+    results = {record['index']: record for record in read_results(output)}
+    assert sorted(results) == [0, 1, 2, 3]
+    assert results[0]['id'] == 'a' and len(results[0]['response'].split()) == 2
+    assert results[0]['usage']['completion_tokens'] == 2 and results[0]['ttft'] is not None
+    assert results[1]['model'] == 'other' and len(results[1]['response'].split()) == 5
+    assert results[2]['error'].startswith('Invalid JSON')
+    assert results[3]['error'] and results[3]['response'] is None
+
+
+def test_rerun_resumes_failed_and_missing_prompts(tmp_path):
+    config = make_config(tmp_path)
+    prompts = tmp_path / "prompts.jsonl"
+    write_prompts(prompts, [{'prompt': f'question {i}'} for i in range(5)])
+    output = tmp_path / "results.jsonl"
+    # An interrupted run: 0 succeeded, 1 failed, 2 was cut off mid-line
+    output.write_text(json.dumps({'index': 0, 'error': None, 'response': 'kept'}) + '\n' +
+                      json.dumps({'index': 1, 'error': 'timeout'}) + '\n' + '{"index": 2, "resp')
+
+    assert completed_indexes(str(output)) == {0: True, 1: False}
+    summary = asyncio.run(BatchRunner(config, echo=False).run(load_prompts(str(prompts)), str(output)))
+    assert (summary['skipped'], summary['succeeded']) == (1, 4)
+
+    records = read_results(output)
+    assert records[0]['response'] == 'kept'
+    assert sorted(record['index'] for record in records[2:]) == [1, 2, 3, 4]
+    assert all(value for value in completed_indexes(str(output)).values())
+
+
+def test_bad_history_fails_only_its_own_item(tmp_path):
+    config = make_config(tmp_path)
+    prompts = tmp_path / "prompts.jsonl"
+    write_prompts(prompts, [
+        {'id': 'a', 'prompt': 'x', 'history': 'abc'},
+        {'id': 'b', 'prompt': 'x', 'history': [{'role': 'user'}]},
+        {'id': 'c', 'prompt': 'x', 'provider': ['not', 'a', 'name']},
+        {'id': 'd', 'prompt': 'fine'},
+    ])
+    items = load_prompts(str(prompts))
+    assert items[0][1]['error'].startswith('"history" must be') and items[0][1]['id'] == 'a'
+    assert items[1][1]['error'].startswith('"history" must be')
+
+    output = tmp_path / "results.jsonl"
+    summary = asyncio.run(BatchRunner(config, echo=False).run(items, str(output)))
+    assert (summary['succeeded'], summary['failed']) == (1, 3)
+    results = {record['id']: record for record in read_results(output)}
+    assert results['c']['error'] and results['d']['error'] is None
@@ -0,0 +1,51 @@
+"""
+Tests for the benchmark stand-in server and runner.
+"""
+
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from benchmarks.mock_server import MockOpenAIServer
+from benchmarks.run_benchmarks import run_benchmarks, compare
+from benchmarks.load_gateway import run_load_test
+from src.providers.lmstudio_provider import LMStudioProvider
+
+
+def test_lmstudio_provider_against_mock_server(tmp_path, monkeypatch):
+    # The model catalog is cached relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    with MockOpenAIServer(models=['m1', 'm2'], tokens=5) as server:
+        provider = LMStudioProvider({'api_base': server.base_url, 'api_key': 'x', 'default_model': 'm1'})
+        models = provider.create_model_manager().get_models()
+        assert [model['id'] for model in models] == ['m1', 'm2']
+
+        chat = provider.create_chat()
+        usage = {}
+        chunks = list(chat.send_message_stream("hi", [], usage=usage))
+        assert ''.join(chunks) == 'tok0 tok1 tok2 tok3 tok4 '
+        assert usage == {'prompt_tokens': 1, 'completion_tokens': 5}
+
+        assert chat.send_message("hi", [], max_tokens=2) == 'tok0 tok1 '
+
+
+def test_run_benchmarks_reports_each_size(capsys):
+    report = run_benchmarks([10, 20], turns=2, tokens=8, token_rate=0, latency=0, formats=['jsonl'])
+    assert [r['history_size'] for r in report['results']] == [10, 20]
+    result = report['results'][0]
+    assert result['chunks_per_turn'] == 8
+    assert result['turn_ms']['p50'] > 0
+    assert set(result['save_ms']) == {'jsonl'}
+    assert len(compare(report, report)) == 6
+
+
+def test_gateway_load_test_compares_direct_and_gateway(capsys):
+    report = run_load_test(requests=20, concurrency=4, tokens=4, token_rate=0, latency=0, in_process=True)
+    assert report['direct']['errors'] == 0 and report['gateway']['errors'] == 0
+    assert report['gateway']['requests_per_sec'] > 0
+    assert set(report['added_ms']) == {'ttft_ms', 'latency_ms'}
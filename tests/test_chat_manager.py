@@ -0,0 +1,234 @@
+"""
+Tests for chat persistence.
+"""
+
+import sys
+import os
+import json
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.chat_manager import ChatManager
+
+
+def _turn(i):
+    return [{"role": "user", "content": f"question {i}"},
+            {"role": "assistant", "content": f"answer {i}"}]
+
+
+def test_journal_appends_only_new_messages(tmp_path):
+    manager = ChatManager(str(tmp_path), storage_format='jsonl')
+    history = []
+    for i in range(3):
+        history.extend(_turn(i))
+        manager.save_chat("chat_1", history)
+
+    with open(tmp_path / "chat_1.jsonl") as f:
+        assert len(f.readlines()) == 6
+    assert ChatManager(str(tmp_path), storage_format='jsonl').load_chat("chat_1") == history
+
+
+def test_journal_rewinds_after_reset_and_compacts(tmp_path):
+    manager = ChatManager(str(tmp_path), storage_format='jsonl')
+    history = _turn(0) + _turn(1)
+    manager.save_chat("chat_1", history)
+    history = _turn(2)
+    manager.save_chat("chat_1", history)
+
+    assert ChatManager(str(tmp_path), storage_format='jsonl').load_chat("chat_1") == history
+    manager.compact_chat("chat_1")
+    with open(tmp_path / "chat_1.jsonl") as f:
+        assert [json.loads(line) for line in f] == history
+
+
+def test_journal_recovers_from_torn_tail(tmp_path):
+    manager = ChatManager(str(tmp_path), storage_format='jsonl')
+    manager.save_chat("chat_1", _turn(0))
+    with open(tmp_path / "chat_1.jsonl", "a") as f:
+        f.write('{"role": "user", "cont')
+
+    history = ChatManager(str(tmp_path), storage_format='jsonl').load_chat("chat_1")
+    assert history == _turn(0)
+    history.extend(_turn(1))
+    manager = ChatManager(str(tmp_path), storage_format='jsonl')
+    manager.save_chat("chat_1", history)
+    assert ChatManager(str(tmp_path), storage_format='jsonl').load_chat("chat_1") == history
+
+
+def test_legacy_json_chats_are_still_readable(tmp_path):
+    with open(tmp_path / "old.json", "w") as f:
+        json.dump(_turn(0), f)
+
+    manager = ChatManager(str(tmp_path), storage_format='jsonl')
+    assert manager.list_chats() == ["old"]
+    history = manager.load_chat("old")
+    history.extend(_turn(1))
+    manager.save_chat("old", history)
+    assert ChatManager(str(tmp_path), storage_format='jsonl').load_chat("old") == history
+
+    # The legacy file goes once the compacted journal holds the whole chat
+    manager.compact_chat("old")
+    assert not (tmp_path / "old.json").exists()
+    assert ChatManager(str(tmp_path), storage_format='jsonl').load_chat("old") == history
+    assert manager.delete_chat("old")
+    assert manager.list_chats() == []
+
+
+def test_json_is_the_default_format(tmp_path):
+    manager = ChatManager(str(tmp_path))
+    manager.save_chat("chat_1", _turn(0))
+    assert (tmp_path / "chat_1.json").exists() and not (tmp_path / "chat_1.jsonl").exists()
+    assert ChatManager(str(tmp_path)).load_chat("chat_1") == _turn(0)
+
+
+def test_sqlite_storage_round_trip_and_listing(tmp_path):
+    manager = ChatManager(str(tmp_path), storage_format='sqlite')
+    assert manager.generate_chat_id() == "chat_1"
+
+    history = _turn(0)
+    manager.save_chat("chat_1", history)
+    manager.save_chat("notes", _turn(5))
+    history.extend(_turn(1))
+    manager.save_chat("chat_1", history)
+
+    assert manager.most_recent_chat() == "chat_1"
+    assert manager.list_chats() == ["chat_1", "notes"]
+    assert manager.generate_chat_id() == "chat_2"
+
+    manager.save_chat("chat_1", _turn(2))
+    assert manager.load_chat("chat_1") == _turn(2)
+    assert manager.load_chat("missing") is None
+    assert manager.delete_chat("notes")
+    assert manager.list_chats() == ["chat_1"]
+    manager.close()
+
+
+def test_migrate_json_chats_to_sqlite(tmp_path):
+    from scripts.migrate_chats import migrate_chats
+
+    with open(tmp_path / "old.json", "w") as f:
+        json.dump(_turn(0), f)
+    ChatManager(str(tmp_path)).save_chat("newer", _turn(1))
+    os.utime(tmp_path / "old.json", (1, 1))
+
+    assert migrate_chats(str(tmp_path)) == 2
+    manager = ChatManager(str(tmp_path), storage_format='sqlite')
+    assert manager.list_chats() == ["newer", "old"]
+    assert manager.load_chat("old") == _turn(0)
+    manager.close()
+
+
+def test_search_index_updates_incrementally_and_ranks_hits(tmp_path):
+    manager = ChatManager(str(tmp_path))
+    history = [{"role": "system", "content": "You are helpful."},
+               {"role": "user", "content": "How do I configure the sqlite backend?"},
+               {"role": "assistant", "content": "Set chat_format to sqlite in config.json."}]
+    manager.save_chat("storage", history)
+    manager.save_chat("weather", [{"role": "user", "content": "Is it going to rain tomorrow?"}])
+
+    hits = manager.search_chats("sqlite config")
+    assert [(hit['chat_name'], hit['position']) for hit in hits] == [("storage", 2), ("storage", 1)]
+    assert "sqlite" in hits[0]['snippet']
+    assert manager.search_chats("helpful") == []
+
+    manager.save_chat("storage", [{"role": "user", "content": "Start over"}])
+    assert manager.search_chats("sqlite") == []
+    manager.delete_chat("weather")
+    assert manager.search_chats("rain") == []
+
+
+def test_search_indexes_chats_saved_before_the_index(tmp_path):
+    with open(tmp_path / "old.json", "w") as f:
+        json.dump([{"role": "user", "content": "legacy bananas"}], f)
+
+    hits = ChatManager(str(tmp_path)).search_chats("bananas")
+    assert [hit['chat_name'] for hit in hits] == ["old"]
+
+
+def test_interrupted_reply_is_checkpointed_and_recoverable(tmp_path):
+    from src.core.stream_pipeline import StreamPipeline, PersistStage
+
+    manager = ChatManager(str(tmp_path))
+    request = {'message': 'tell me a story', 'provider': 'test', 'model': 'm1'}
+
+    def dropped_stream():
+        yield "Once upon "
+        yield "a time"
+        raise ConnectionError("connection lost")
+
+    pipeline = StreamPipeline([PersistStage(manager, "chat_1", interval=0)])
+    try:
+        pipeline.run(dropped_stream(), request)
+    except ConnectionError:
+        pass
+
+    # A fresh manager (as after a restart) finds the interrupted reply
+    manager = ChatManager(str(tmp_path))
+    [reply] = manager.interrupted_replies()
+    assert reply['chat_name'] == "chat_1"
+    assert reply['message'] == "tell me a story"
+    assert reply['text'] == "Once upon a time"
+
+    history = manager.keep_partial_reply(reply)
+    assert history[-1] == {"role": "assistant", "content": "Once upon a time"}
+    assert manager.load_chat("chat_1") == history
+    assert manager.interrupted_replies() == []
+
+
+def test_finished_reply_checkpoint_is_removed_on_save(tmp_path):
+    from src.core.stream_pipeline import StreamPipeline, PersistStage
+
+    manager = ChatManager(str(tmp_path))
+    pipeline = StreamPipeline([PersistStage(manager, "chat_1")])
+    response = pipeline.run(iter(["Hi", "!"]), {'message': 'hello'})
+    assert os.path.exists(tmp_path / "chat_1.partial")
+    assert manager.interrupted_replies() == []
+
+    manager.save_chat("chat_1", [{"role": "user", "content": "hello"},
+                                 {"role": "assistant", "content": response}])
+    assert not os.path.exists(tmp_path / "chat_1.partial")
+    assert manager.list_chats() == ["chat_1"]
+
+
+def test_write_behind_coalesces_saves_and_flushes_on_close(tmp_path):
+    import threading
+    from src.core.storage import JsonlChatStorage
+
+    class GatedStorage(JsonlChatStorage):
+        """Blocks the first save until released, so later saves queue up."""
+
+        def __init__(self, chats_dir):
+            super().__init__(chats_dir)
+            self.gate = threading.Event()
+            self.saves = []
+
+        def save_chat(self, chat_name, history):
+            self.gate.wait(5)
+            self.saves.append((chat_name, len(history)))
+            super().save_chat(chat_name, history)
+
+    storage = GatedStorage(str(tmp_path))
+    manager = ChatManager(str(tmp_path), storage=storage, write_behind=True)
+    history = []
+    for i in range(5):
+        history.extend(_turn(i))
+        manager.save_chat("chat_1", history)
+    history_2 = _turn(9)
+    manager.save_chat("chat_2", history_2)
+
+    # Reads see queued saves before they reach the disk
+    assert manager.load_chat("chat_1") == history
+    assert manager.write_stats()['queue_depth'] >= 2
+
+    storage.gate.set()
+    manager.close()
+    assert storage.saves[-2:] == [("chat_1", 10), ("chat_2", 2)]
+    assert len(storage.saves) <= 3
+
+    reopened = ChatManager(str(tmp_path), storage_format='jsonl')
+    assert reopened.load_chat("chat_1") == history
+    assert reopened.load_chat("chat_2") == history_2
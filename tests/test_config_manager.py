@@ -0,0 +1,97 @@
+"""
+Tests for configuration persistence.
+"""
+
+import sys
+import os
+import json
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+import src.core.config_manager as config_module
+from src.core.config_manager import ConfigManager
+
+
+def _count_writes(monkeypatch):
+    writes = []
+    original = config_module.atomic_write_text
+
+    def counting(path, text):
+        writes.append(path)
+        original(path, text)
+
+    monkeypatch.setattr(config_module, 'atomic_write_text', counting)
+    return writes
+
+
+def test_batch_writes_once_and_skips_unchanged_values(tmp_path, monkeypatch):
+    path = str(tmp_path / "config.json")
+    config = ConfigManager(path)
+    writes = _count_writes(monkeypatch)
+    changed = []
+    config.add_listener(changed.append)
+
+    with config.batch():
+        config.set_provider_value('lmstudio', 'stream', False)
+        config.set_provider_value('lmstudio', 'system_prompt', 'Be brief.')
+        config.set('chat_format', 'sqlite')
+        assert changed == []
+    assert len(writes) == 1
+    assert changed == ['lmstudio']
+
+    config.set_provider_value('lmstudio', 'stream', False)
+    assert len(writes) == 1
+    with open(path) as f:
+        saved = json.load(f)
+    assert saved['chat_format'] == 'sqlite'
+    assert saved['providers']['lmstudio']['system_prompt'] == 'Be brief.'
+
+
+def test_failed_batch_is_rolled_back(tmp_path):
+    config = ConfigManager(str(tmp_path / "config.json"))
+    try:
+        with config.batch():
+            config.set_current_provider('openrouter')
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert config.get_current_provider() == 'lmstudio'
+    assert not os.path.exists(tmp_path / "config.json")
+
+
+def test_external_edits_are_picked_up(tmp_path):
+    path = str(tmp_path / "config.json")
+    config = ConfigManager(path)
+    config.set('chat_format', 'jsonl')
+    changed = []
+    config.add_listener(changed.append)
+
+    other = ConfigManager(path)
+    other.set_provider_value('lmstudio', 'default_model', 'qwen')
+    other.set('chat_format', 'sqlite')
+
+    assert config.get_provider_value('lmstudio', 'default_model') == 'qwen'
+    assert config.get('chat_format') == 'sqlite'
+    assert changed == ['lmstudio']
+
+
+def test_missing_or_partial_file_keeps_the_loaded_settings(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({'current_provider': 'openrouter', 'providers': {'openrouter': {'api_key': 'key'}}}))
+    config = ConfigManager(str(path))
+
+    os.remove(path)
+    assert config.get_current_provider() == 'openrouter'
+    config.set('foo', 1)
+    saved = json.loads(path.read_text())
+    assert saved['current_provider'] == 'openrouter' and saved['foo'] == 1
+
+    # A half-written file is not remembered as read
+    stat = config._file_stat
+    with open(path, 'w') as f:
+        f.write('{"current_provider": ')
+    assert config.get_current_provider() == 'openrouter' and config._file_stat == stat
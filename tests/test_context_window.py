@@ -0,0 +1,55 @@
+"""
+Tests for the token-budgeted context window.
+"""
+
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.context_window import ContextWindow, resolve_budget, message_tokens
+
+
+def make_history(turns, size=400):
+    history = [{"role": "system", "content": "Be brief."}]
+    for i in range(turns):
+        history.append({"role": "user", "content": f"question {i} " + "x" * size})
+        history.append({"role": "assistant", "content": f"answer {i} " + "y" * size})
+    return history
+
+
+def test_everything_is_sent_when_it_fits():
+    history = make_history(3)
+    window = ContextWindow(budget=10000)
+    assert window.fit("hi", history) == history
+    assert window.last_decision['dropped'] == 0
+
+
+def test_middle_is_elided_and_recent_turns_kept():
+    history = make_history(20)
+    window = ContextWindow(budget=1000)
+    sent = window.fit("next question", history)
+
+    assert sent[0]['role'] == 'system'
+    assert sent[0]['content'].startswith("Be brief.")
+    assert "omitted" in sent[0]['content']
+    assert sent[1]['role'] == 'user'
+    assert sent[-1] == history[-1]
+    assert sum(message_tokens(msg) for msg in sent) <= 1000
+    assert window.last_decision['dropped'] == len(history) - len(sent)
+    # The stored history is untouched
+    assert len(history) == 41
+
+
+def test_turn_limit_and_budget_from_context_length():
+    history = make_history(5, size=10)
+    sent = ContextWindow(max_turns=2, elide=False).fit("hi", history)
+    assert sent == [history[0]] + history[-4:]
+
+    assert resolve_budget({'context_budget': 500}, context_length=8000) == 500
+    assert resolve_budget({'max_tokens': 1000}, context_length=8000) == 7000
+    assert resolve_budget({}) is None
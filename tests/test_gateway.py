@@ -0,0 +1,114 @@
+"""
+Tests for the OpenAI-compatible gateway.
+"""
+
+import http.client
+import json
+import time
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.config_manager import ConfigManager
+from src.core.chat_manager import ChatManager
+from src.core.gateway import Gateway
+
+
+@pytest.fixture
+def gateway(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {'current_provider': 'replay', 'providers': {'replay': {
+        'default_model': 'replay', 'models': ['replay', 'other'], 'reply_tokens': 4, 'token_rate': 40, 'seed': 1}}}
+    (tmp_path / 'config.json').write_text(json.dumps(config))
+    chat_manager = ChatManager(str(tmp_path / 'chats'))
+    with Gateway(ConfigManager(str(tmp_path / 'config.json')), port=0, chat_manager=chat_manager) as server:
+        yield server
+    chat_manager.close()
+
+
+def request(server, method, path, payload=None, headers=None):
+    connection = http.client.HTTPConnection(server.host, server.port, timeout=10)
+    connection.request(method, path, json.dumps(payload) if payload is not None else None, headers or {})
+    response = connection.getresponse()
+    body = response.read().decode('utf-8')
+    connection.close()
+    return response, body
+
+
+def events(body):
+    return [line[len('data: '):] for line in body.splitlines() if line.startswith('data: ')]
+
+
+def test_models_and_completions(gateway):
+    response, body = request(gateway, 'GET', '/v1/models')
+    assert [model['id'] for model in json.loads(body)['data']] == ['replay:replay', 'replay:other']
+
+    response, body = request(gateway, 'POST', '/v1/chat/completions',
+                             {'model': 'replay:other', 'messages': [{'role': 'user', 'content': 'hi'}]})
+    completion = json.loads(body)
+    assert response.status == 200 and completion['model'] == 'replay:other'
+    assert len(completion['choices'][0]['message']['content'].split()) == 4
+    assert completion['usage']['completion_tokens'] == 4
+
+    response, body = request(gateway, 'POST', '/v1/chat/completions', {
+        'messages': [{'role': 'user', 'content': 'hi'}], 'max_tokens': 2, 'stream': True,
+        'stream_options': {'include_usage': True}})
+    assert response.getheader('Content-Type') == 'text/event-stream'
+    data = events(body)
+    assert data[-1] == '[DONE]'
+    chunks = [json.loads(event) for event in data[:-1]]
+    text = ''.join(chunk['choices'][0]['delta'].get('content', '') for chunk in chunks if chunk['choices'])
+    assert len(text.split()) == 2
+    assert chunks[-1]['usage']['completion_tokens'] == 2
+
+
+def test_invalid_requests_get_openai_errors(gateway):
+    response, body = request(gateway, 'POST', '/v1/chat/completions', {'messages': []})
+    assert response.status == 400 and 'messages' in json.loads(body)['error']['message']
+    response, body = request(gateway, 'POST', '/v1/chat/completions',
+                             {'messages': [{'role': 'assistant', 'content': 'x'}]})
+    assert response.status == 400
+    response, _ = request(gateway, 'POST', '/v1/chat/completions',
+                          {'model': 'missing:m', 'messages': [{'role': 'user', 'content': 'x'}]})
+    assert response.status == 200  # Unknown prefixes are model ids of the current provider
+    response, _ = request(gateway, 'GET', '/v1/unknown')
+    assert response.status == 404
+
+
+def test_requests_run_concurrently(gateway):
+    payload = {'messages': [{'role': 'user', 'content': 'hi'}], 'stream': True}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda _: request(gateway, 'POST', '/v1/chat/completions', payload), range(6)))
+    # Each reply streams for about 0.1s
+    assert time.perf_counter() - started < 0.4
+    assert all(response.status == 200 for response, _ in results)
+
+
+def test_sessions_keep_history_in_saved_chats(gateway):
+    headers = {'X-Session-Id': 'tool-session'}
+    for prompt in ('first', 'second'):
+        response, _ = request(gateway, 'POST', '/v1/chat/completions',
+                              {'messages': [{'role': 'user', 'content': prompt}]}, headers)
+        assert response.status == 200
+    # The turn is saved after the response is sent
+    deadline = time.monotonic() + 5
+    while True:
+        history = gateway.chat_manager.load_chat('tool-session') or []
+        if len(history) == 4 or time.monotonic() > deadline:
+            break
+        time.sleep(0.01)
+    assert [msg['role'] for msg in history] == ['user', 'assistant', 'user', 'assistant']
+    assert history[2]['content'] == 'second'
+
+    response, _ = request(gateway, 'POST', '/v1/chat/completions',
+                          {'messages': [{'role': 'user', 'content': 'x'}]}, {'X-Session-Id': '../etc'})
+    assert response.status == 400
@@ -0,0 +1,88 @@
+"""
+Tests for the rolling-hash conversation history.
+"""
+
+import json
+import pickle
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.history import ConversationHistory, fingerprint_messages
+from src.core.context_window import ContextWindow
+from src.providers.base_provider import build_chat_messages
+from src.providers.response_cache import response_key
+
+
+def message(role, content):
+    return {"role": role, "content": content}
+
+
+def assert_consistent(history):
+    for length in range(len(history) + 1):
+        assert history.fingerprint(length) == fingerprint_messages(history[:length])
+
+
+def test_prefix_fingerprints_follow_every_change():
+    history = ConversationHistory([message("system", "sys")])
+    for i in range(5):
+        history.append(message("user", f"q{i}"))
+        history.append(message("assistant", f"a{i}"))
+    assert_consistent(history)
+    before = history.fingerprint(5)
+
+    history.insert(1, message("user", "inserted"))
+    assert_consistent(history)
+    del history[1]
+    assert history.fingerprint(5) == before
+    history[3] = message("assistant", "edited")
+    history.pop()
+    history.extend([message("user", "x"), message("assistant", "y")])
+    history += [message("user", "z")]
+    del history[-3:]
+    assert_consistent(history)
+
+    history.clear()
+    assert history.fingerprint() == fingerprint_messages([])
+    assert not history.has_system_message()
+
+
+def test_fingerprints_distinguish_order_and_content():
+    a = ConversationHistory([message("user", "hi"), message("assistant", "hello")])
+    b = ConversationHistory([message("assistant", "hello"), message("user", "hi")])
+    c = ConversationHistory([message("user", "hi"), message("assistant", "hello!")])
+    assert len({a.fingerprint(), b.fingerprint(), c.fingerprint()}) == 3
+
+
+def test_request_fingerprint_matches_provider_messages():
+    history = ConversationHistory([message("user", "q"), message("assistant", "a")])
+    for length in range(len(history) + 1):
+        for system_prompt in (None, "be brief"):
+            expected = fingerprint_messages(build_chat_messages("next", history[:length], system_prompt))
+            assert history.request_fingerprint("next", system_prompt, length) == expected
+
+    # An existing system message is not doubled
+    history.insert(0, message("system", "sys"))
+    expected = fingerprint_messages(build_chat_messages("next", history, "ignored"))
+    assert history.request_fingerprint("next", "ignored") == expected
+
+
+def test_history_serializes_like_a_list():
+    history = ConversationHistory([message("user", "q"), message("assistant", "a")])
+    assert json.loads(json.dumps(history)) == list(history)
+    copy = pickle.loads(pickle.dumps(history))
+    assert isinstance(copy, ConversationHistory) and copy.fingerprint() == history.fingerprint()
+
+
+def test_untrimmed_history_keeps_its_fingerprint_through_the_window():
+    history = ConversationHistory([message("system", "sys"), message("user", "q"), message("assistant", "a")])
+    assert ContextWindow().fit("next", history) is history
+
+    config = {'default_model': 'm', 'system_prompt': 'sys'}
+    assert response_key('p', config, 'next', history) == response_key('p', config, 'next', list(history))
+    assert response_key('p', config, 'next', history) != response_key('p', config, 'other', history)
@@ -0,0 +1,93 @@
+"""
+Tests for the interactive entry point.
+"""
+
+import json
+import sys
+import os
+
+import pytest
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+import main as retrochat
+from src.core.chat_manager import ChatManager
+
+
+@pytest.fixture
+def replay_config(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = {'current_provider': 'replay', 'telemetry': False, 'chat_format': 'jsonl', 'providers': {'replay': {
+        'default_model': 'replay', 'models': ['replay', 'other'], 'reply_tokens': 3, 'seed': 1}}}
+    (tmp_path / 'config.json').write_text(json.dumps(config))
+    return tmp_path
+
+
+def run_session(monkeypatch, lines, argv=()):
+    """Run main() with `lines` typed at the prompt, ending with /exit."""
+    inputs = iter(list(lines) + ['/exit'])
+    monkeypatch.setattr('builtins.input', lambda prompt='': next(inputs))
+    retrochat.main(list(argv))
+
+
+def test_message_after_compare(replay_config, monkeypatch, capsys):
+    run_session(monkeypatch, ['/compare replay:replay,replay:other Hello', 'Hello again'])
+    out = capsys.readouterr().out
+    assert 'Comparing 2 models...' in out
+    assert 'Error' not in out
+    chat_manager = ChatManager(str(replay_config / 'chats'), storage_format='jsonl')
+    saved = chat_manager.load_chat(chat_manager.most_recent_chat())
+    assert [msg['content'] for msg in saved if msg['role'] == 'user'] == ['Hello again']
+    assert saved[-1]['role'] == 'assistant'
+    chat_manager.close()
+
+
+def test_compare_streams_models_concurrently_and_prints_a_summary(replay_config, monkeypatch, capsys):
+    config = json.loads((replay_config / 'config.json').read_text())
+    config['providers']['replay']['latency'] = 0.5
+    (replay_config / 'config.json').write_text(json.dumps(config))
+
+    run_session(monkeypatch, ['/compare replay:replay,replay:other Hello'])
+    lines = capsys.readouterr().out.splitlines()
+    assert any(line.startswith('[replay:replay] ') for line in lines)
+    assert any(line.startswith('[replay:other] ') for line in lines)
+    header = next(i for i, line in enumerate(lines) if line.startswith('Model'))
+    assert lines[header].split()[:3] == ['Model', 'TTFT', 'Total']
+    rows = {line.split()[0]: line.split() for line in lines[header + 1:header + 3]}
+    assert set(rows) == {'replay:replay', 'replay:other'}
+    for label, ttft, total, chars, status in rows.values():
+        # Run one after the other, the second model's first token would come after a second
+        assert 0.5 <= float(ttft[:-1]) < 0.9 and float(total[:-1]) >= float(ttft[:-1])
+        assert int(chars) > 0 and status == 'ok'
+    assert lines[header + 3].startswith('Wall time: ')
+
+
+def test_provider_is_built_on_the_first_message_and_profiled(replay_config, monkeypatch, capsys):
+    from src.providers import provider_factory
+
+    created = []
+    create_provider = provider_factory.create_provider
+    monkeypatch.setattr(provider_factory, 'create_provider',
+                        lambda name, config: created.append(name) or create_provider(name, config))
+    at_prompt = []
+    inputs = iter(['Hello', '/exit'])
+
+    def prompt(text=''):
+        at_prompt.append(len(created))
+        return next(inputs)
+
+    monkeypatch.setattr('builtins.input', prompt)
+    retrochat.main(['--startup-profile'])
+    out = capsys.readouterr().out
+
+    # Nothing built the provider before the first message was sent
+    assert at_prompt[0] == 0 and created[0] == 'replay'
+    report = out[out.index('Startup profile:'):]
+    for phase in ('Import core', 'Config manager', 'Model manager and chat', 'Chat manager', 'Total to prompt'):
+        assert f"  {phase} " in report
+    assert 'Deferred modules already loaded:' in report
+    assert out.index('Provider (first message)') > out.index('Total to prompt')
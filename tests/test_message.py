@@ -0,0 +1,59 @@
+"""
+Tests for the compact Message type.
+"""
+
+import json
+import pickle
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.context_window import message_tokens, MESSAGE_OVERHEAD_TOKENS
+from src.core.history import ConversationHistory, fingerprint_messages
+from src.core.message import Message, message_to_json
+from src.providers.base_provider import build_chat_messages
+
+
+def test_message_round_trips_the_stored_json_shape():
+    stored = {'role': 'assistant', 'content': 'Hi', 'name': 'bot', 'timestamp': 1.5, 'token_count': 1,
+              'model': 'm'}
+    message = Message.from_dict(stored)
+    assert message.to_dict() == stored
+    assert json.loads(json.dumps([message], default=message_to_json)) == [stored]
+    assert pickle.loads(pickle.dumps(message)).to_dict() == stored
+    # A Message from another copy of the module keeps its metadata
+    other = type('Message', (), {'to_dict': lambda self: dict(stored), 'items': lambda self: {}.items()})()
+    assert Message.from_dict(other).to_dict() == stored
+    # Roles are shared between messages
+    assert Message.from_dict(json.loads('{"role": "assistant", "content": ""}')).role is message.role
+
+
+def test_message_reads_like_the_request_dictionary():
+    message = Message('user', 'Hello', timestamp=2.0, model='m')
+    assert message == {'role': 'user', 'content': 'Hello'}
+    assert dict(message) == {'role': 'user', 'content': 'Hello'}
+    assert message['role'] == 'user' and message.get('timestamp') is None and 'model' not in message
+    history = ConversationHistory([message])
+    assert history.fingerprint() == fingerprint_messages([{'role': 'user', 'content': 'Hello'}])
+    # Providers send the message itself, not a copy
+    assert build_chat_messages('Next', history, 'Be brief')[1] is message
+
+
+def test_reported_token_count_is_used_for_the_context_window():
+    assert message_tokens(Message('assistant', 'x' * 400, token_count=7)) == 7 + MESSAGE_OVERHEAD_TOKENS
+    assert message_tokens(Message('assistant', 'x' * 400)) == 100 + MESSAGE_OVERHEAD_TOKENS
+
+
+def test_estimate_is_kept_on_the_message_and_not_stored():
+    message = Message('user', 'x' * 400)
+    assert message_tokens(message) == 100 + MESSAGE_OVERHEAD_TOKENS
+    assert message.estimated_tokens == 100
+    message.estimated_tokens = 3
+    assert message_tokens(message) == 3 + MESSAGE_OVERHEAD_TOKENS
+    assert message.to_dict() == {'role': 'user', 'content': 'x' * 400}
+    assert message_tokens({'role': 'user', 'content': 'x' * 400}) == 100 + MESSAGE_OVERHEAD_TOKENS
@@ -0,0 +1,81 @@
+"""
+Tests for the provider model catalog cache.
+"""
+
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.providers.model_catalog import ModelCatalogCache, NOT_MODIFIED
+
+MODELS = [{'id': 'a', 'name': 'Model A'}, {'id': 'b', 'name': 'Model B'}]
+
+
+class FakeEndpoint:
+    """Serves MODELS once, then answers 304 to requests carrying the ETag."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, validators):
+        self.calls.append(validators)
+        if validators.get('etag') == '"v1"':
+            return NOT_MODIFIED, validators
+        return MODELS, {'etag': '"v1"'}
+
+
+def test_catalog_is_served_from_memory_and_disk_within_ttl(tmp_path):
+    fetch = FakeEndpoint()
+    catalog = ModelCatalogCache('test', ttl=60, cache_dir=str(tmp_path))
+    assert catalog.get(fetch) == MODELS
+    assert catalog.get(fetch) == MODELS
+    assert catalog.lookup('b') == MODELS[1]
+
+    # A new process reuses the on-disk copy
+    other = ModelCatalogCache('test', ttl=60, cache_dir=str(tmp_path))
+    assert other.get(fetch) == MODELS
+    assert len(fetch.calls) == 1
+
+
+def test_stale_catalog_is_revalidated_with_etag(tmp_path):
+    fetch = FakeEndpoint()
+    catalog = ModelCatalogCache('test', ttl=0, cache_dir=str(tmp_path))
+    catalog.get(fetch)
+    assert catalog.get(fetch) == MODELS
+    assert fetch.calls == [{}, {'etag': '"v1"'}]
+
+
+def test_stale_catalog_is_served_when_provider_is_unreachable(tmp_path):
+    catalog = ModelCatalogCache('test', ttl=0, cache_dir=str(tmp_path))
+    catalog.get(FakeEndpoint())
+
+    def unreachable(validators):
+        raise ConnectionError("offline")
+
+    assert catalog.get(unreachable) == MODELS
+    catalog.invalidate()
+    assert catalog.lookup('a') is None
+
+
+def test_sending_a_message_uses_only_the_cached_catalog(tmp_path, monkeypatch):
+    from src.core.chat import Chat
+    from src.core.config_manager import ConfigManager
+    from src.providers.lmstudio_provider import LMStudioModelManager
+
+    monkeypatch.chdir(tmp_path)
+    fetches = []
+    monkeypatch.setattr(LMStudioModelManager, 'fetch_models',
+                        lambda self, validators: fetches.append(validators) or
+                        ([{'id': 'local', 'context_length': 4096}], {}))
+    config = ConfigManager(str(tmp_path / 'config.json'))
+    config.update_provider_config('lmstudio', {'api_base': 'http://127.0.0.1:9/v1', 'default_model': 'local'})
+    chat = Chat(config)
+
+    assert chat._get_context_length('local') is None and fetches == []
+    chat.provider.create_model_manager().get_models()
+    assert chat._get_context_length('local') == 4096 and len(fetches) == 1
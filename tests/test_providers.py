@@ -2,9 +2,13 @@
 Test script for the provider system.
 """
 
+import asyncio
+import json
 import sys
 import os
 
+import pytest
+
 # Add the project root and src to the Python path
 project_root = os.path.dirname(os.path.dirname(__file__))
 src_path = os.path.join(project_root, 'src')
@@ -61,5 +65,213 @@ def test_provider_system():
     
     print("\n=== Test Complete ===")
 
+
+def test_provider_discovery_reads_sources_without_importing(tmp_path):
+    from src.providers.provider_factory import scan_provider_module
+
+    module = tmp_path / "custom_provider.py"
+    module.write_text(
+        "import some_sdk_that_is_not_installed\n"
+        "class CustomProvider(BaseProvider):\n"
+        "    def get_provider_name(self) -> str:\n"
+        "        return 'custom'\n"
+    )
+    assert scan_provider_module(str(module)) == {'custom': 'CustomProvider'}
+    # Helper modules in the providers package are not mistaken for providers
+    helper = tmp_path / "helper.py"
+    helper.write_text(
+        "class Helper:\n"
+        "    def get_provider_name(self) -> str:\n"
+        "        return 'helper'\n"
+    )
+    assert scan_provider_module(str(helper)) == {}
+
+    available = provider_factory.get_available_providers()
+    assert 'lmstudio' in available and 'openrouter' in available and 'replay' in available
+
+
+def test_replay_provider_is_deterministic():
+    provider = provider_factory.registry.create_provider('replay', {'reply_tokens': 6, 'seed': 7})
+    assert provider.validate_config()
+    chat = provider.create_chat()
+
+    usage = {}
+    chunks = list(chat.send_message_stream("hello", [], usage=usage))
+    assert len(chunks) == 6
+    assert usage['completion_tokens'] == 6 and usage['prompt_tokens'] > 0
+    assert chat.send_message("hello", []) == ''.join(chunks)
+    assert chat.send_message("hello", [], max_tokens=2) == ''.join(chunks[:2])
+
+    async_chat = provider.create_async_chat()
+
+    async def collect():
+        return [chunk async for chunk in async_chat.send_message_stream("hello", [])]
+
+    assert asyncio.run(collect()) == chunks
+    assert provider.create_model_manager().get_model_info('replay')['context_length'] > 0
+
+
+def test_replay_provider_transcripts_and_failures(tmp_path):
+    transcript = tmp_path / "recorded.jsonl"
+    transcript.write_text('\n'.join(json.dumps(msg) for msg in [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "ping"},
+        {"role": "assistant", "content": "pong and more"},
+    ]))
+    provider = provider_factory.registry.create_provider('replay', {'transcripts': str(transcript)})
+    chat = provider.create_chat()
+    assert list(chat.send_message_stream("ping", [])) == ['pong ', 'and ', 'more']
+    # Unknown prompts get one of the recorded replies
+    assert chat.send_message("something else", []) == 'pong and more'
+
+    provider.config.update({'failure_rate': 1.0, 'token_rate': 1000, 'jitter': 0.5})
+    assert list(chat.send_message_stream("ping", []))[-1] == 'Error: Injected replay failure'
+    provider.config['failure_mode'] = 'raise'
+    with pytest.raises(Exception, match='Injected replay failure'):
+        chat.send_message("ping", [])
+
+
+def test_pool_shares_clients_until_the_last_release():
+    from src.providers.client_pool import ClientPool
+
+    pool = ClientPool()
+    closed = []
+    client = type('Client', (), {'close': lambda self: closed.append(self)})
+    first = pool.acquire(('test', 'a'), client)
+    assert pool.acquire(('test', 'a'), client) is first
+    assert pool.stats() == {'test': 1}
+    pool.release(('test', 'a'))
+    assert closed == []
+    pool.release(('test', 'a'))
+    assert closed == [first] and pool.stats() == {}
+    assert pool.acquire(('test', 'a'), client) is not first
+
+
+def test_provider_instances_are_pooled_per_connection_config():
+    from src.providers.client_pool import client_pool
+    from src.providers.provider_factory import ProviderFactory
+
+    factory = ProviderFactory()
+    live = client_pool.stats().get('openai', 0)
+    config = {'api_base': 'http://localhost:1234/v1', 'api_key': 'one', 'temperature': 0.5}
+    provider = factory.create_provider('lmstudio', config)
+    # Settings that don't change the connection reuse the instance and its client
+    assert factory.create_provider('lmstudio', dict(config, temperature=0.9)) is provider
+    assert provider.config['temperature'] == 0.9
+    client = provider._get_client()
+    other = factory.registry.create_provider('lmstudio', dict(config))
+    assert other._get_client() is client
+    other.close()
+
+    # New credentials close the old instance and give a new client
+    replacement = factory.create_provider('lmstudio', dict(config, api_key='two'))
+    assert replacement is not provider and provider._client is None
+    assert replacement._get_client() is not client
+    factory.invalidate()
+    assert replacement._client is None and client_pool.stats().get('openai', 0) == live
+
+
+def test_threaded_adapters_run_sync_implementations_off_the_loop():
+    import threading
+    from src.providers.base_provider import (BaseChat, BaseModelManager, ThreadedAsyncChat,
+                                             ThreadedAsyncModelManager)
+
+    # Both sends must be in flight at once to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+    threads = set()
+
+    class BlockingChat(BaseChat):
+        def send_message(self, message, history, **kwargs):
+            barrier.wait()
+            threads.add(threading.get_ident())
+            return f"{message} at {kwargs['temperature']}"
+
+        def send_message_stream(self, message, history, **kwargs):
+            for word in message.split():
+                threads.add(threading.get_ident())
+                yield word
+
+    class Models(BaseModelManager):
+        def get_models(self):
+            threads.add(threading.get_ident())
+            return [{'id': 'm'}]
+
+        def get_model_info(self, model_id):
+            return {'id': model_id}
+
+    chat = ThreadedAsyncChat(BlockingChat())
+    models = ThreadedAsyncModelManager(Models())
+
+    async def run():
+        replies = await asyncio.gather(chat.send_message('a', [], temperature=0.1),
+                                       chat.send_message('b', [], temperature=0.2))
+        chunks = [chunk async for chunk in chat.send_message_stream('one two three', [])]
+        return replies, chunks, await models.get_models(), await models.get_model_info('m')
+
+    replies, chunks, listed, info = asyncio.run(run())
+    assert replies == ['a at 0.1', 'b at 0.2']
+    assert chunks == ['one', 'two', 'three']
+    assert listed == [{'id': 'm'}] and info == {'id': 'm'}
+    assert threads and threading.get_ident() not in threads
+
+
+def test_threaded_stream_is_closed_when_the_consumer_stops_early():
+    import threading
+    from src.providers.base_provider import BaseChat, ThreadedAsyncChat
+
+    release = threading.Event()
+    closed = threading.Event()
+    streams = []
+
+    class SlowChat(BaseChat):
+        def send_message(self, message, history, **kwargs):
+            return message
+
+        def send_message_stream(self, message, history, **kwargs):
+            # Held like a client holds its open responses, so only closing it ends it
+            stream = self._stream(message)
+            streams.append(stream)
+            return stream
+
+        def _stream(self, message):
+            try:
+                yield 'first'
+                if message == 'block':
+                    release.wait(5)
+                yield 'second'
+            finally:
+                closed.set()
+
+    chat = ThreadedAsyncChat(SlowChat())
+
+    async def take_one(message):
+        stream = chat.send_message_stream(message, [])
+        async for chunk in stream:
+            await stream.aclose()
+            return chunk
+
+    # Stopped between chunks: closed right away
+    assert asyncio.run(take_one('hello')) == 'first'
+    assert closed.is_set()
+
+    # Cancelled while a worker is inside the provider's stream: closed when that step returns
+    closed.clear()
+
+    async def cancel_mid_chunk():
+        task = asyncio.ensure_future(take_two())
+        await asyncio.sleep(0.1)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert not closed.is_set()
+        release.set()
+
+    async def take_two():
+        return [chunk async for chunk in chat.send_message_stream('block', [])]
+
+    asyncio.run(cancel_mid_chunk())
+    assert closed.wait(5)
+
+
 if __name__ == "__main__":
     test_provider_system()
@@ -0,0 +1,145 @@
+"""
+Tests for the per-provider rate limiter.
+"""
+
+import asyncio
+import threading
+import time
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.providers.base_provider import BaseChat, ThreadedAsyncChat, retry_after
+from src.providers.rate_limiter import RateLimiter, RateLimitedChat, RateLimitedAsyncChat
+from src.providers.replay_provider import ReplayProvider
+
+
+class SlowChat(BaseChat):
+    """Replies after a delay, tracking how many requests run at once."""
+
+    def __init__(self, delay=0.05, rejections=0):
+        self.delay = delay
+        self.rejections = rejections
+        self.active = 0
+        self.peak = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send_message(self, message, history, **kwargs):
+        return ''.join(self.send_message_stream(message, history, **kwargs))
+
+    def send_message_stream(self, message, history, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.rejections:
+                self.rejections -= 1
+                kwargs['rate_limit']['retry_after'] = 0.05
+                yield "Error: 429 Too Many Requests"
+                return
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        kwargs['usage'].update({'prompt_tokens': 2, 'completion_tokens': 1})
+        yield f"re: {message}"
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers):
+        self.status_code = status_code
+        self.headers = headers
+
+
+class FakeError(Exception):
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.response = FakeResponse(status_code, headers or {})
+
+
+def test_max_in_flight_holds_across_threads():
+    inner = SlowChat()
+    chat = RateLimitedChat(inner, RateLimiter(max_in_flight=2))
+    results = []
+    threads = [threading.Thread(target=lambda i=i: results.append(chat.send_message(f"q{i}", [])))
+               for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(results) == sorted(f"re: q{i}" for i in range(6))
+    assert inner.peak == 2
+    assert chat.limiter.stats()['in_flight'] == 0
+
+
+def test_request_bucket_paces_requests():
+    limiter = RateLimiter(requests_per_minute=1200, burst=1)
+    started = time.perf_counter()
+    for _ in range(5):
+        limiter.acquire().release()
+    # One immediately, then one every 50ms
+    assert time.perf_counter() - started >= 0.18
+    assert limiter.stats()['waited'] == 4
+
+
+def test_callers_take_turns():
+    limiter = RateLimiter(max_in_flight=1)
+    order = []
+
+    async def request(caller, name):
+        reservation = await limiter.acquire_async(caller)
+        order.append(name)
+        await asyncio.sleep(0.01)
+        reservation.release()
+
+    async def run():
+        held = await limiter.acquire_async('batch')
+        tasks = [asyncio.create_task(request('batch', f"batch{i}")) for i in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(request('chat', 'chat')))
+        await asyncio.sleep(0)
+        held.release()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order == ['batch0', 'chat', 'batch1', 'batch2']
+
+
+def test_rejected_requests_are_retried_after_the_delay():
+    inner = SlowChat(delay=0, rejections=1)
+    chat = RateLimitedChat(inner, RateLimiter(max_in_flight=4))
+    started = time.perf_counter()
+    assert list(chat.send_message_stream('hi', [])) == ['re: hi']
+    assert time.perf_counter() - started >= 0.04
+    assert inner.calls == 2 and chat.limiter.stats()['deferrals'] == 1
+
+    # Once retries run out the error reaches the caller
+    inner.rejections = 5
+    async_chat = RateLimitedAsyncChat(ThreadedAsyncChat(inner), RateLimiter(max_retries=1))
+    assert asyncio.run(async_chat.send_message('hi', [])).startswith('Error: 429')
+
+
+def test_retry_after_parsing():
+    assert retry_after(FakeError(429, {'retry-after': '2'})) == 2.0
+    assert retry_after(FakeError(429, {'retry-after-ms': '250'})) == 0.25
+    assert retry_after(FakeError(429)) == 1.0
+    assert retry_after(FakeError(503, {'retry-after': 'Wed, 21 Oct 2015 07:28:00 GMT'})) == 0.0
+    assert retry_after(FakeError(500, {'retry-after': '2'})) is None
+    assert retry_after(ValueError("no response")) is None
+
+
+def test_provider_owns_a_limiter_built_from_config():
+    provider = ReplayProvider({'default_model': 'replay'})
+    chat = provider.create_chat()
+    assert provider.rate_limiter is None and provider.limit_chat(chat) is chat
+
+    provider.config = {'default_model': 'replay', 'rate_limits': {'max_in_flight': 1}}
+    limiter = provider.rate_limiter
+    assert limiter.max_in_flight == 1 and provider.rate_limiter is limiter
+    assert isinstance(provider.limit_chat(chat), RateLimitedChat)
+    assert isinstance(provider.limit_chat(provider.create_async_chat()), RateLimitedAsyncChat)
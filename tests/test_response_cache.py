@@ -0,0 +1,110 @@
+"""
+Tests for the response cache.
+"""
+
+import asyncio
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.providers.base_provider import BaseChat, ThreadedAsyncChat
+from src.providers.response_cache import ResponseCache, CachingChat, CachingAsyncChat, response_key
+
+CONFIG = {'default_model': 'm1', 'system_prompt': 'sys'}
+
+
+class CountingChat(BaseChat):
+    """Streams a fixed reply and counts the requests it served."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.calls = 0
+
+    def send_message(self, message, history, **kwargs):
+        self.calls += 1
+        kwargs['usage'].update({'prompt_tokens': 3, 'completion_tokens': len(self.chunks)})
+        return ''.join(self.chunks)
+
+    def send_message_stream(self, message, history, **kwargs):
+        self.calls += 1
+        yield from self.chunks
+        kwargs['usage'].update({'prompt_tokens': 3, 'completion_tokens': len(self.chunks)})
+
+
+def test_key_covers_model_parameters_and_messages():
+    history = [{'role': 'user', 'content': 'a'}, {'role': 'assistant', 'content': 'b'}]
+    key = response_key('p', CONFIG, 'hi', history)
+    assert key == response_key('p', CONFIG, 'hi', list(history), usage={})
+    assert key != response_key('p', CONFIG, 'hi', history[:1])
+    assert key != response_key('p', CONFIG, 'hello', history)
+    assert key != response_key('p', CONFIG, 'hi', history, temperature=0.1)
+    assert key != response_key('p', CONFIG, 'hi', history, max_tokens=5)
+    assert key != response_key('p', dict(CONFIG, default_model='m2'), 'hi', history)
+    assert key != response_key('other', CONFIG, 'hi', history)
+
+
+def test_stream_is_cached_and_replayed(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    inner = CountingChat(['Hel', 'lo', '!'])
+    chat = CachingChat(inner, cache, 'p', CONFIG)
+
+    assert list(chat.send_message_stream('hi', [])) == ['Hel', 'lo', '!']
+    usage = {}
+    assert list(chat.send_message_stream('hi', [], usage=usage)) == ['Hel', 'lo', '!']
+    assert chat.send_message('hi', []) == 'Hello!'
+    assert inner.calls == 1
+    assert usage == {'prompt_tokens': 3, 'completion_tokens': 3}
+
+    # A new process finds the reply on disk
+    reloaded = CachingChat(inner, ResponseCache(str(tmp_path)), 'p', CONFIG)
+    assert list(reloaded.send_message_stream('hi', [])) == ['Hel', 'lo', '!']
+    assert inner.calls == 1
+    assert reloaded.cache.stats()['disk_hits'] == 1
+
+
+def test_errors_and_cut_off_streams_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    failing = CachingChat(CountingChat(['Error: boom']), cache, 'p', CONFIG)
+    failing.send_message('hi', [])
+    failing.send_message('hi', [])
+    assert failing.chat.calls == 2
+
+    inner = CountingChat(['a', 'b', 'c'])
+    chat = CachingChat(inner, cache, 'p', CONFIG)
+    stream = chat.send_message_stream('other', [])
+    next(stream)
+    stream.close()
+    assert list(chat.send_message_stream('other', [])) == ['a', 'b', 'c']
+    assert inner.calls == 2
+
+
+def test_memory_lru_and_disk_size_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path), memory_entries=2, max_disk_bytes=400)
+    for i in range(6):
+        cache.put(f"key{i}", ['x' * 50])
+        os.utime(os.path.join(str(tmp_path), f"key{i}.json"), (i, i))
+
+    assert cache.stats()['memory_entries'] == 2
+    assert cache.stats()['disk_bytes'] <= 400
+    assert cache.stats()['evictions'] > 0
+    assert not os.path.exists(os.path.join(str(tmp_path), 'key0.json'))
+    assert cache.get('key5')['chunks'] == ['x' * 50]
+
+
+def test_async_chat_uses_the_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    inner = CountingChat(['a', 'b'])
+    chat = CachingAsyncChat(ThreadedAsyncChat(inner), cache, 'p', CONFIG)
+
+    async def collect():
+        return [chunk async for chunk in chat.send_message_stream('hi', [])]
+
+    assert asyncio.run(collect()) == ['a', 'b']
+    assert asyncio.run(collect()) == ['a', 'b']
+    assert asyncio.run(chat.send_message('hi', [])) == 'ab'
+    assert inner.calls == 1
@@ -0,0 +1,71 @@
+"""
+Tests for the in-memory chat session cache.
+"""
+
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.chat_manager import ChatManager
+from src.core.history import ConversationHistory
+from src.core.session_manager import SessionManager, message_bytes
+
+
+def turn(n):
+    return [{'role': 'user', 'content': f'question {n}'}, {'role': 'assistant', 'content': f'answer {n}'}]
+
+
+def test_switching_back_is_served_from_memory(tmp_path):
+    chat_manager = ChatManager(str(tmp_path))
+    chat_manager.save_chat('a', turn(1))
+    chat_manager.save_chat('b', turn(2))
+    sessions = SessionManager(chat_manager)
+
+    first = sessions.get('a')
+    assert isinstance(first, ConversationHistory) and first == turn(1)
+    sessions.get('b')
+    assert sessions.get('a') is first
+    assert sessions.get('missing') is None
+    stats = sessions.stats()
+    assert (stats['hits'], stats['misses'], stats['sessions']) == (1, 3, 2)
+    assert stats['bytes'] == sum(message_bytes(msg) for name in 'ab' for msg in chat_manager.load_chat(name))
+    assert [session['name'] for session in sessions.sessions()] == ['a', 'b']
+
+
+def test_byte_accounting_follows_appends_and_rewrites(tmp_path):
+    sessions = SessionManager(ChatManager(str(tmp_path)))
+    history = sessions.put('a', turn(1))
+    history.extend(turn(2))
+    assert sessions.stats()['bytes'] == sum(message_bytes(msg) for msg in turn(1) + turn(2))
+    history[0] = {'role': 'user', 'content': 'a much longer question than before'}
+    assert sessions.stats()['bytes'] == sum(message_bytes(msg) for msg in history)
+    sessions.discard('a')
+    assert sessions.stats()['bytes'] == 0
+
+
+def test_least_recently_used_chats_are_saved_and_evicted(tmp_path):
+    chat_manager = ChatManager(str(tmp_path))
+    sessions = SessionManager(chat_manager, max_messages=5)
+    sessions.put('a', turn(1))
+    sessions.put('b', turn(2))
+    sessions.get('a')
+    sessions.put('c', turn(3))
+
+    # 'b' was least recently used; its unsaved messages were written on the way out
+    assert 'b' not in sessions and 'a' in sessions and 'c' in sessions
+    assert chat_manager.load_chat('b') == turn(2)
+    assert sessions.stats()['evictions'] == 1 and sessions.stats()['writebacks'] == 1
+    assert chat_manager.load_chat('a') is None
+
+    sessions.flush()
+    assert chat_manager.load_chat('a') == turn(1)
+    assert not any(session['dirty'] for session in sessions.sessions())
+
+    # The most recently used chat stays even when it alone is over budget
+    sessions.put('big', turn(4) * 3)
+    assert [session['name'] for session in sessions.sessions()] == ['big']
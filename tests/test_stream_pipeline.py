@@ -0,0 +1,70 @@
+"""
+Tests for the response stream pipeline.
+"""
+
+import asyncio
+import io
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.core.stream_pipeline import StreamPipeline, StreamStage, RenderStage, MetricsStage
+
+REQUEST = {'message': 'hi', 'provider': 'test', 'model': 'm1', 'stream': True}
+
+
+class RecordingStage(StreamStage):
+    """Records which hooks were called."""
+
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, request):
+        self.events.append('start')
+
+    def on_end(self, response):
+        self.events.append(('end', response))
+
+    def on_error(self, error):
+        self.events.append(('error', str(error)))
+
+
+def test_stages_see_every_chunk_and_the_full_response():
+    out = io.StringIO()
+    metrics = MetricsStage()
+    recorder = RecordingStage()
+    pipeline = StreamPipeline([RenderStage(out, color=False), metrics, recorder])
+
+    assert pipeline.run(iter(["Hel", "lo"]), REQUEST) == "Hello"
+    assert out.getvalue() == "Hello\n"
+    assert metrics.metrics['chunks'] == 2 and metrics.metrics['chars'] == 5
+    assert metrics.metrics['model'] == 'm1' and metrics.metrics['ttft'] is not None
+    assert recorder.events == ['start', ('end', 'Hello')]
+    # Stages that don't override on_chunk are not called per chunk
+    assert len(pipeline._chunk_handlers()) == 3
+
+
+def test_errors_reach_stages_and_async_streams_are_supported():
+    def failing():
+        yield "partial"
+        raise ConnectionError("dropped")
+
+    recorder = RecordingStage()
+    pipeline = StreamPipeline([recorder])
+    try:
+        pipeline.run(failing(), REQUEST)
+    except ConnectionError:
+        pass
+    assert recorder.events == ['start', ('error', 'dropped')]
+    assert pipeline.accumulator.text == "partial"
+
+    async def chunks():
+        for chunk in ["a", "b", "c"]:
+            yield chunk
+
+    assert asyncio.run(StreamPipeline().run_async(chunks(), REQUEST)) == "abc"
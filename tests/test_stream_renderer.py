@@ -0,0 +1,68 @@
+"""
+Tests for the streaming terminal renderer.
+"""
+
+import io
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+from src.utils.stream_renderer import StreamRenderer
+from src.utils.terminal_colors import Colors
+
+
+class CountingStream(io.StringIO):
+    """StringIO that counts write calls."""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+def test_chunks_are_coalesced_into_frames():
+    stream = CountingStream()
+    renderer = StreamRenderer(stream, interval=60)
+    for _ in range(500):
+        renderer.write("tok ")
+    renderer.finish()
+    assert stream.getvalue() == "tok " * 500 + "\n"
+    assert stream.writes <= 3
+
+
+def test_newline_flushes_and_pipes_get_plain_text():
+    stream = CountingStream()
+    renderer = StreamRenderer(stream, interval=60)
+    assert not Colors.supports_color(stream)
+    renderer.write("first")
+    renderer.write(" line\n")
+    assert stream.getvalue() == "first line\n"
+
+    colored = io.StringIO()
+    StreamRenderer(colored, color=Colors.YELLOW).render("hi")
+    assert colored.getvalue() == f"{Colors.YELLOW}hi{Colors.RESET}\n"
+
+
+def test_color_support_is_detected_once_per_stream():
+    checks = []
+
+    class Terminal(io.StringIO):
+        def isatty(self):
+            checks.append(self)
+            return True
+
+    terminal, pipe = Terminal(), CountingStream()
+    for _ in range(3):
+        StreamRenderer(terminal).render("a")
+        StreamRenderer(pipe).render("b")
+    assert checks == [terminal]
+    assert terminal.getvalue() == f"{Colors.YELLOW}a{Colors.RESET}\n" * 3
+    assert pipe.getvalue() == "b\n" * 3
@@ -0,0 +1,125 @@
+"""
+Tests for request telemetry.
+"""
+
+import json
+import sys
+import os
+
+# Add the project root and src to the Python path
+project_root = os.path.dirname(os.path.dirname(__file__))
+src_path = os.path.join(project_root, 'src')
+sys.path.insert(0, project_root)
+sys.path.insert(0, src_path)
+
+import pytest
+
+from src.core.stream_pipeline import StreamPipeline
+from src.core.telemetry import TelemetryStage, TelemetryStore, percentile, format_stats
+
+REQUEST = {'message': 'hi', 'provider': 'test', 'model': 'm1', 'stream': True}
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([3.0], 99) == 3.0
+    assert percentile([], 50) is None
+
+
+def test_stage_records_gaps_and_usage():
+    stage = TelemetryStage()
+    pipeline = StreamPipeline([stage])
+    response = pipeline.run(iter(['a', 'b', 'c']), REQUEST)
+
+    record = stage.build_record(response, 12, {'prompt_tokens': 20, 'completion_tokens': 3})
+    assert record['provider'] == 'test' and record['model'] == 'm1'
+    assert record['chunks'] == 3
+    assert record['gap_max'] >= record['gap_avg'] >= 0
+    assert record['prompt_tokens'] == 20 and record['completion_tokens'] == 3
+    assert not record['tokens_estimated']
+    assert record['error'] is None
+
+    estimated = stage.build_record(response, 12)
+    assert estimated['prompt_tokens'] == 12
+    assert estimated['tokens_estimated']
+
+
+def test_stage_records_errors():
+    def failing():
+        yield 'a'
+        raise KeyboardInterrupt
+
+    stage = TelemetryStage()
+    with pytest.raises(KeyboardInterrupt):
+        StreamPipeline([stage]).run(failing(), REQUEST)
+    assert stage.build_record('', 0)['error'] == 'KeyboardInterrupt'
+
+    stage = TelemetryStage()
+    response = StreamPipeline([stage]).run(iter(['Error: connection refused']), REQUEST)
+    assert stage.build_record(response, 0)['error'] == 'connection refused'
+
+
+def test_store_rolls_and_summarizes(tmp_path):
+    path = str(tmp_path / 'stats' / 'requests.jsonl')
+    store = TelemetryStore(path, max_records=5)
+    for i in range(12):
+        store.record({'provider': 'p', 'model': 'a' if i % 2 else 'b', 'ttft': i * 0.1,
+                      'duration': i, 'tokens_per_sec': 10.0, 'error': 'boom' if i == 11 else None})
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) < 10
+    assert [r['duration'] for r in lines[-5:]] == [7, 8, 9, 10, 11]
+
+    reloaded = TelemetryStore(path, max_records=5)
+    assert [r['duration'] for r in reloaded.records()] == [7, 8, 9, 10, 11]
+
+    summary = {entry['model']: entry for entry in reloaded.summary()}
+    assert summary['a']['requests'] == 3 and summary['a']['errors'] == 1
+    assert summary['a']['duration'][50] == 7
+    assert summary['b']['duration'][99] == 10
+    assert 'p:a' in format_stats(reloaded.summary())
+
+    reloaded.record({'provider': None, 'model': 'c', 'duration': 1})
+    assert '?:c' in format_stats(reloaded.summary())
+
+
+def test_concurrent_requests_record_their_own_prompt_size(tmp_path, monkeypatch):
+    import asyncio
+    from src.core.chat import Chat
+    from src.core.config_manager import ConfigManager
+    from src.core.context_window import estimate_tokens, MESSAGE_OVERHEAD_TOKENS
+
+    config_path = tmp_path / 'config.json'
+    config_path.write_text(json.dumps({'current_provider': 'replay', 'providers': {'replay': {
+        'default_model': 'replay', 'stream': True, 'reply_tokens': 3, 'token_rate': 100, 'seed': 1}}}))
+    chat = Chat(ConfigManager(str(config_path)))
+    chat.telemetry = TelemetryStore(str(tmp_path / 'requests.jsonl'))
+
+    estimates = []
+    original_start, original_build = TelemetryStage.on_start, TelemetryStage.build_record
+
+    def on_start(self, request):
+        self.message = request['message']
+        original_start(self, request)
+
+    def build_record(self, response, prompt_tokens, usage=None):
+        estimates.append((self.message, prompt_tokens))
+        return original_build(self, response, prompt_tokens, usage)
+
+    monkeypatch.setattr(TelemetryStage, 'on_start', on_start)
+    monkeypatch.setattr(TelemetryStage, 'build_record', build_record)
+
+    long_history = [{'role': 'user', 'content': 'x' * 4000}, {'role': 'assistant', 'content': 'ok'}]
+
+    async def both():
+        # The short request is fitted first and finishes after the long one was fitted
+        await asyncio.gather(chat.send_message_async('short', [], echo=False),
+                             chat.send_message_async('long', list(long_history), echo=False))
+
+    asyncio.run(both())
+    assert dict(estimates)['short'] == estimate_tokens('short') + MESSAGE_OVERHEAD_TOKENS
+    assert dict(estimates)['long'] > 1000